@@ -1,9 +1,26 @@
 """Main analysis module for Polymarket trades."""
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+import asyncio
+import copy
 import pandas as pd
 import logging
-from config import TRADER_RATINGS, SHOW_INDIVIDUAL_RATINGS
+from config import (
+    SHOW_INDIVIDUAL_RATINGS, MAX_RECENT_TRADES,
+    FETCH_CONCURRENCY, PIPELINE_DEADLINE_SECONDS, TRADES_PAGE_SIZE,
+    MAX_TRADES_PER_WALLET, USE_COMPUTED_RATINGS, RATINGS_STATE_PATH, ARCHIVE_PATH,
+    FILTER_VERDICTS_PATH,
+)
+from archive import ArchiveWriter
+from pipeline import TradePipeline
+from checkpoint import save_checkpoint, load_checkpoint
+from profiling import profile_phase
+from tracing import trace_span
+from scoring import score_markets
+from filter_profiles import FilterProfile
+from latency import get_latency_tracker
+from notifier import format_market_body
+from ratings import get_rating_engine, get_trader_rating, fetch_market_winners
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -52,9 +69,41 @@ def format_outcome_with_individual_ratings(traders_detailed: Dict[str, Dict[str,
 class PolymarketAnalyzer:
     """Main analyzer class that orchestrates the analysis."""
     
-    def __init__(self, api, processor):
+    def __init__(self, api, processor, profiles: Optional[List[FilterProfile]] = None):
         self.api = api
         self.processor = processor
+        # Extra filter profiles evaluated over each run's grouped markets
+        self.profiles = profiles or []
+        self.profile_results: Dict[str, pd.DataFrame] = {}
+        # What the last run had to go without when it hit its deadline
+        self.missing_wallets = []
+        self.partial_wallets = []
+        self.failed_wallets = []
+        self.stale_markets: Dict[str, str] = {}
+        # channel -> {market_id: message body last notified}, for --serve
+        self.notified: Dict[str, Dict[str, str]] = {}
+        # StreamingIngest or AdaptivePoller keeping the pipeline current; when
+        # set, analyze() filters its state instead of fetching
+        self.stream = None
+        # Computed trader ratings, fed every folded trade
+        self.ratings = None
+        if USE_COMPUTED_RATINGS:
+            self.ratings = get_rating_engine()
+            self.ratings.load(RATINGS_STATE_PATH)
+        # Append-only archive of every folded trade
+        self.archive = ArchiveWriter(ARCHIVE_PATH) if ARCHIVE_PATH else None
+        self._archived_before = 0
+        self.pipeline = TradePipeline(
+            api,
+            processor,
+            max_recent_trades=MAX_RECENT_TRADES,
+            concurrency=FETCH_CONCURRENCY,
+            deadline_seconds=PIPELINE_DEADLINE_SECONDS,
+            page_size=TRADES_PAGE_SIZE,
+            max_trades_per_wallet=MAX_TRADES_PER_WALLET,
+            rating_engine=self.ratings,
+            archive=self.archive,
+        )
     
     def analyze(self, wallets: List[str]) -> pd.DataFrame:
         """
@@ -68,38 +117,202 @@ class PolymarketAnalyzer:
         """
         logger.info(f"Starting analysis for {len(wallets)} wallets")
         
-        # Step 1: Fetch trades for all wallets
-        wallet_trades = {}
-        total_trades = 0
-        all_trades_list = []
-        
-        for wallet in wallets:
-            trades = self.api.fetch_trades(wallet)
-            wallet_trades[wallet] = trades
-            total_trades += len(trades)
-            all_trades_list.extend(trades)
-        
-        logger.info(f"Fetched {total_trades} total trades from {len(wallets)} wallets")
+        # Steps 1-2: Fetch trades for all wallets and fold each wallet into the
+        # market aggregates as it arrives, keeping only markets among the
+        # MAX_RECENT_TRADES most recent trades, then run the filters
+        self.processor.stale_markets = {}
+        self.processor.filter_chain.verdicts = None
+        if self.stream is not None:
+            market_data = self.stream.finalize(self.profiles)
+        else:
+            market_data = asyncio.run(self.pipeline.run(wallets, self.profiles))
+        self.missing_wallets = self.pipeline.missing_wallets
+        self.partial_wallets = self.pipeline.partial_wallets
+        self.failed_wallets = self.pipeline.failed_wallets
+        self.stale_markets = dict(self.processor.stale_markets)
+        if self.stale_markets:
+            logger.warning(
+                f"Deadline reached before {len(self.stale_markets)} live status checks: "
+                + ", ".join(f"{mid} ({reason})" for mid, reason in self.stale_markets.items())
+            )
+        self.update_ratings()
+        self.flush_archive()
+        self.save_verdicts()
         
-        if total_trades == 0:
+        if self.pipeline.total_trades == 0:
             logger.warning("No trades found for any wallet")
+            self.profile_results = {profile.name: pd.DataFrame() for profile in self.profiles}
             return pd.DataFrame()
         
-        # Filter to only top 600 most recent trades
-        all_trades_sorted = sorted(all_trades_list, key=lambda x: x.get("timestamp", 0), reverse=True)
-        recent_trades = all_trades_sorted[:600]
+        # Signals published this run start their detection-latency clock
+        tracker = get_latency_tracker()
+        tracker.record_decisions(market_data.values())
+        for profile_data in self.pipeline.profile_results.values():
+            tracker.record_decisions(profile_data.values())
         
-        if len(recent_trades) < len(all_trades_sorted):
-            logger.info(f"Filtering to 600 most recent trades (out of {len(all_trades_sorted)} total)")
+        with profile_phase("render"), trace_span("build_results", "render", markets=len(market_data)):
+            self.build_profile_results()
+            return self.build_results(market_data)
+
+    def run_status(self) -> Dict[str, Any]:
+        """
+        Completeness of the last run.
+
+        Returns:
+            Dict with partial (True if anything is missing or stale),
+            missing_wallets, partial_wallets, failed_wallets (whose fetch
+            raised; also in one of the first two) and stale_markets
+            ({market_id: reason})
+        """
+        return {
+            "partial": bool(self.missing_wallets or self.partial_wallets or self.stale_markets),
+            "missing_wallets": list(self.missing_wallets),
+            "partial_wallets": list(self.partial_wallets),
+            "failed_wallets": list(self.failed_wallets),
+            "stale_markets": dict(self.stale_markets),
+        }
+
+    def changed_markets(self, channel: str, results_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Rows whose market is new to a notification channel or whose notified
+        lines (outcomes, trader count) changed since mark_notified.
+
+        Markets that left the results are forgotten, so they count as new
+        when they come back.
+
+        Args:
+            channel: Notification target ("default" or a profile name)
+            results_df: Full results of the current cycle
+
+        Returns:
+            Subset of results_df
+        """
+        if len(results_df) == 0 or "Market ID" not in results_df.columns:
+            self.notified[channel] = {}
+            return results_df
+        current = set(results_df["Market ID"])
+        notified = {mid: body for mid, body in self.notified.get(channel, {}).items() if mid in current}
+        self.notified[channel] = notified
+        changed = [
+            notified.get(row["Market ID"]) != format_market_body(row)
+            for row in results_df.to_dict(orient="records")
+        ]
+        return results_df[changed]
+
+    def mark_notified(self, channel: str, df: pd.DataFrame):
+        """
+        Remember the markets just sent to a channel (see changed_markets).
+
+        Args:
+            channel: Notification target
+            df: Rows that were sent
+        """
+        notified = self.notified.setdefault(channel, {})
+        for row in df.to_dict(orient="records"):
+            notified[row["Market ID"]] = format_market_body(row)
+
+    def update_ratings(self):
+        """Settle newly resolved markets into the computed ratings and persist them."""
+        if self.ratings is None:
+            return
+        try:
+            with trace_span("update_ratings", "ratings"):
+                self.ratings.refresh_resolutions(fetch_market_winners)
+                self.ratings.save(RATINGS_STATE_PATH)
+        except Exception as e:
+            logger.error(f"Updating trader ratings failed: {e}")
+
+    def flush_archive(self):
+        """Make trades archived so far durable and log how many were added."""
+        if self.archive is None:
+            return
+        appended = self.archive.appended - self._archived_before
+        self._archived_before = self.archive.appended
+        try:
+            self.archive.flush()
+        except OSError as e:
+            logger.error(f"Flushing trade archive failed: {e}")
+            return
+        logger.info(f"Archived {appended} new trades ({self.archive.rows} in {ARCHIVE_PATH})")
+
+    def save_verdicts(self):
+        """Write the default filter chain's verdicts of this run to FILTER_VERDICTS_PATH."""
+        verdicts = self.processor.filter_chain.verdicts
+        if not FILTER_VERDICTS_PATH or verdicts is None:
+            return
+        try:
+            verdicts.save(FILTER_VERDICTS_PATH)
+        except OSError as e:
+            logger.error(f"Writing filter verdicts failed: {e}")
+
+    def close(self):
+        """Release the trade archive."""
+        if self.archive is not None:
+            self.archive.close()
+            self.archive = None
+
+    def build_profile_results(self):
+        """Turn the pipeline's per-profile market data into result DataFrames."""
+        self.profile_results = {
+            profile.name: self.build_results(self.pipeline.profile_results.get(profile.name, {}))
+            for profile in self.profiles
+        }
+
+    def save_checkpoint(self, path: str):
+        """
+        Checkpoint the folded market aggregates and status cache.
         
-        # Reconstruct wallet_trades with only recent trades
-        recent_condition_ids = set(t.get("conditionId") for t in recent_trades)
-        wallet_trades_filtered = {}
-        for wallet, trades in wallet_trades.items():
-            wallet_trades_filtered[wallet] = [t for t in trades if t.get("conditionId") in recent_condition_ids]
+        Args:
+            path: Checkpoint file path
+        """
+        if self.stream is not None:
+            with self.stream.lock:
+                state = copy.deepcopy(self.pipeline.export_state())
+        else:
+            state = self.pipeline.export_state()
+        save_checkpoint(path, {
+            "pipeline": state,
+            "live_status_cache": self.processor.live_status_cache,
+        })
+
+    def warm_start(self, path: str, max_age_seconds: Optional[float] = None) -> Optional[pd.DataFrame]:
+        """
+        Restore state from a checkpoint and rerun the filter stage on it.
+
+        The restored aggregates only serve these results: the next analyze()
+        fetches and folds everything again.
         
-        # Step 2: Process trades (extract markets, filter LIVE, group by market)
-        market_data = self.processor.process(wallet_trades_filtered)
+        Args:
+            path: Checkpoint file path
+            max_age_seconds: Ignore checkpoints older than this
+            
+        Returns:
+            DataFrame with analysis results, or None if no usable checkpoint
+        """
+        state = load_checkpoint(path, max_age_seconds=max_age_seconds)
+        if state is None:
+            return None
+        
+        self.pipeline.restore_state(state.get("pipeline", {}))
+        self.processor.live_status_cache.update(state.get("live_status_cache", {}))
+        if self.pipeline.total_trades == 0:
+            return pd.DataFrame()
+        
+        logger.info("Warm start: filtering checkpointed market state")
+        market_data = self.pipeline.finalize(self.profiles)
+        self.build_profile_results()
+        return self.build_results(market_data)
+
+    def build_results(self, market_data: Dict[str, Dict[str, Any]]) -> pd.DataFrame:
+        """
+        Turn filtered market data into the results DataFrame.
+        
+        Args:
+            market_data: Filtered market data from the processor
+            
+        Returns:
+            DataFrame with analysis results
+        """
         trader_stats = self.processor.trader_stats
         
         # Step 3: Create trader summary with ratings
@@ -107,7 +320,7 @@ class PolymarketAnalyzer:
         if trader_stats:
             trader_results = []
             for trader_name, stats in sorted(trader_stats.items(), key=lambda x: x[1]["total_size"], reverse=True):
-                rating = TRADER_RATINGS.get(trader_name, "-")
+                rating = get_trader_rating(trader_name, "-")
                 trader_results.append({
                     "Trader": trader_name,
                     "Rating": rating,
@@ -118,7 +331,10 @@ class PolymarketAnalyzer:
             trader_df = pd.DataFrame(trader_results)
             logger.info(f"Trader summary: {len(trader_df)} traders with bets >= $10")
         
-        # Step 4: Convert markets to DataFrame
+        # Step 4: Score all markets in one vectorized pass
+        scores = score_markets(market_data)
+
+        # Step 5: Convert markets to DataFrame
         results = []
         for condition_id, data in market_data.items():
             outcome_traders_detailed = data.get("outcome_traders_detailed", {})
@@ -164,11 +380,20 @@ class PolymarketAnalyzer:
                 else:
                     outcomes_display = outcomes_list[0] if outcomes_list else ""
 
+            ratings = [
+                info.get("rating")
+                for traders_info in outcome_traders_detailed.values()
+                for info in traders_info.values()
+                if isinstance(info.get("rating"), int)
+            ]
+
             results.append({
                 "Market Title": data["market_title"],
                 "Market ID": data["market_id"],
                 "Outcomes": outcomes_display,
                 "Total Wallets": data["total_wallets"],
+                "Max Rating": max(ratings) if ratings else None,
+                "Score": round(scores[condition_id], 4),
                 "Latest Trade": data.get("latest_timestamp", 0),
             })
 
@@ -1,8 +1,11 @@
 """API module for fetching Polymarket data."""
 
 import requests
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import logging
+from cache import shared_fetch
+from http_client import HttpClient, get_http_client
+from metadata import MarketMetadataClient, get_metadata_client
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -11,17 +14,31 @@ logger = logging.getLogger(__name__)
 class PolymarketAPI:
     """Handles API calls to Polymarket."""
     
-    def __init__(self, base_url: str = "https://data-api.polymarket.com"):
+    def __init__(
+        self,
+        base_url: str = "https://data-api.polymarket.com",
+        http: Optional[HttpClient] = None,
+        metadata: Optional[MarketMetadataClient] = None,
+    ):
         self.base_url = base_url
-        self.session = requests.Session()
-        self.session.timeout = 10
+        self.http = http or get_http_client()
+        self.metadata = metadata or get_metadata_client()
     
-    def fetch_trades(self, wallet_address: str) -> List[Dict[str, Any]]:
+    def fetch_trades(
+        self,
+        wallet_address: str,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        raise_errors: bool = False,
+    ) -> List[Dict[str, Any]]:
         """
-        Fetch all trades for a specific wallet.
+        Fetch trades for a specific wallet, newest first.
         
         Args:
             wallet_address: Ethereum wallet address
+            limit: Page size (None = API default)
+            offset: Number of newer trades to skip (for paging)
+            raise_errors: Re-raise request errors instead of returning []
             
         Returns:
             List of trade dictionaries
@@ -29,23 +46,31 @@ class PolymarketAPI:
         try:
             url = f"{self.base_url}/trades"
             params = {"user": wallet_address}
+            if limit is not None:
+                params["limit"] = limit
+            if offset:
+                params["offset"] = offset
             
-            logger.info(f"Fetching trades for wallet: {wallet_address}")
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
+            def fetch():
+                logger.info(f"Fetching trades for wallet: {wallet_address}" + (f" (offset {offset})" if offset else ""))
+                response = self.http.get(url, params=params, timeout=10, hedge=True)
+                response.raise_for_status()
+                return response.json()
             
-            trades = response.json()
+            trades = shared_fetch("trades", f"{url}?user={wallet_address}&limit={limit}&offset={offset or 0}", fetch)
             logger.info(f"Retrieved {len(trades)} trades for {wallet_address}")
             return trades
         
         except requests.exceptions.RequestException as e:
             logger.error(f"Error fetching trades for {wallet_address}: {e}")
+            if raise_errors:
+                raise
             return []
     
     def fetch_market_metadata(self, condition_ids: List[str]) -> Dict[str, Dict[str, Any]]:
         """
-        Fetch market metadata by querying the markets endpoint.
-        Note: The trades API already includes market metadata, so this is a fallback.
+        Fetch market metadata (end date, categories, status flags) in
+        batches, reusing cached entries (see MarketMetadataClient).
         
         Args:
             condition_ids: List of market condition IDs
@@ -53,30 +78,47 @@ class PolymarketAPI:
         Returns:
             Dictionary mapping condition_id to market metadata
         """
-        # Markets endpoint doesn't work well with large batch queries
-        # We'll use market info from trades instead
-        return {}
+        return self.metadata.fetch(condition_ids)
     
-    def fetch_current_market_price(self, condition_id: str) -> Dict[str, float]:
+    def fetch_market_trades(self, condition_id: str, limit: int = 100) -> List[Dict[str, Any]]:
         """
-        Fetch current market prices by getting recent trades for a market.
+        Fetch the most recent trades in a market, across all wallets.
         
         Args:
             condition_id: Market condition ID
+            limit: Number of trades
             
         Returns:
-            Dict with outcome prices, e.g. {outcome: price}
+            List of trade dictionaries, newest first
         """
         try:
-            # Fetch recent trades for this specific market to get current prices
-            # We'll use the trades data to infer current prices
             url = f"{self.base_url}/trades"
-            params = {"condition_id": condition_id, "limit": 100}  # Get recent trades
+            params = {"condition_id": condition_id, "limit": limit}
             
-            response = self.session.get(url, params=params, timeout=5)
-            response.raise_for_status()
+            def fetch():
+                response = self.http.get(url, params=params, timeout=5)
+                response.raise_for_status()
+                return response.json()
+            
+            return shared_fetch("market_trades", f"{url}?condition_id={condition_id}&limit={limit}", fetch)
+        
+        except requests.exceptions.RequestException as e:
+            logger.debug(f"Error fetching trades for market {condition_id}: {e}")
+            return []
+    
+    def fetch_current_market_price(self, condition_id: str) -> Dict[str, float]:
+        """
+        Fetch current market prices by getting recent trades for a market.
+        
+        Args:
+            condition_id: Market condition ID
             
-            trades = response.json()
+        Returns:
+            Dict with outcome prices, e.g. {outcome: price}
+        """
+        try:
+            # Infer current prices from the market's recent trades
+            trades = self.fetch_market_trades(condition_id, limit=100)
             if trades and len(trades) > 0:
                 # Group by outcome and get the most recent price for each
                 outcome_prices = {}
@@ -97,5 +139,5 @@ class PolymarketAPI:
             return {}
     
     def close(self):
-        """Close the session."""
-        self.session.close()
+        """Close pooled connections."""
+        self.http.close()
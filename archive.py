@@ -0,0 +1,459 @@
+"""Append-only, memory-mapped columnar archive of raw trades."""
+
+import glob
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from config import ARCHIVE_SEGMENT_ROWS
+from pipeline import trade_key
+
+logger = logging.getLogger(__name__)
+
+# Segment layout: a 64-byte header, then one fixed-width block per column
+# sized for the segment's full capacity, widest types first so every block
+# stays aligned. Header: magic, format version, capacity, committed rows,
+# min and max timestamp of the committed rows.
+ARCHIVE_MAGIC = b"PMTA"
+ARCHIVE_VERSION = 1
+_HEADER = struct.Struct("<4sHxxIIqq")
+_HEADER_SIZE = 64
+_ROWS_OFFSET = struct.calcsize("<4sHxxI")
+_RANGE_OFFSET = _ROWS_OFFSET + 8
+
+COLUMNS = (
+    ("timestamp", np.dtype("<i8")),
+    ("price", np.dtype("<f8")),
+    ("size", np.dtype("<f8")),
+    ("key", np.dtype("<u8")),       # 64-bit hash of the trade identity
+    ("wallet", np.dtype("<u4")),    # ids into wallets.txt
+    ("market", np.dtype("<u4")),    # ids into markets.txt
+    ("outcome", np.dtype("<u4")),   # ids into outcomes.txt
+    ("side", np.dtype("u1")),       # index into SIDES
+)
+COLUMN_TYPES = dict(COLUMNS)
+SIDES = ("BUY", "SELL")
+
+# Sidecar string dictionaries: column -> file name
+DICTIONARIES = {"wallet": "wallets.txt", "market": "markets.txt", "outcome": "outcomes.txt"}
+
+
+def trade_hash(trade: Dict[str, Any]) -> int:
+    """64-bit hash of a trade's identity (see pipeline.trade_key)."""
+    digest = hashlib.blake2b(repr(trade_key(trade)).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _column_offsets(capacity: int) -> Dict[str, int]:
+    offsets, position = {}, _HEADER_SIZE
+    for name, dtype in COLUMNS:
+        offsets[name] = position
+        position += capacity * dtype.itemsize
+    offsets["_end"] = position
+    return offsets
+
+
+class Segment:
+    """
+    One segment file, memory-mapped.
+
+    Column arrays are views on the mapping, so reads are zero-copy. The
+    writer fills column slots first and bumps the committed row count in
+    the header last; readers only look at committed rows.
+    """
+
+    def __init__(self, path: str, writable: bool = False):
+        self.path = path
+        self._file = open(path, "r+b" if writable else "rb")
+        try:
+            access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+            self._map = mmap.mmap(self._file.fileno(), 0, access=access)
+        except Exception:
+            self._file.close()
+            raise
+        magic, version, capacity, _, _, _ = _HEADER.unpack_from(self._map, 0)
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+            self.close()
+            raise ValueError(f"{path}: not a version {ARCHIVE_VERSION} trade archive segment")
+        self.capacity = capacity
+        offsets = _column_offsets(capacity)
+        if len(self._map) < offsets["_end"]:
+            self.close()
+            raise ValueError(f"{path}: truncated segment")
+        self._columns = {
+            name: np.frombuffer(self._map, dtype=dtype, count=capacity, offset=offsets[name])
+            for name, dtype in COLUMNS
+        }
+
+    @classmethod
+    def create(cls, path: str, capacity: int) -> "Segment":
+        """Create an empty segment of `capacity` rows (appears atomically)."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.truncate(_column_offsets(capacity)["_end"])
+            f.write(_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, capacity, 0, 0, 0))
+        os.replace(tmp_path, path)
+        return cls(path, writable=True)
+
+    def header(self):
+        """(committed rows, min timestamp, max timestamp)."""
+        rows = struct.unpack_from("<I", self._map, _ROWS_OFFSET)[0]
+        low, high = struct.unpack_from("<qq", self._map, _RANGE_OFFSET)
+        return rows, low, high
+
+    @property
+    def rows(self) -> int:
+        return self.header()[0]
+
+    def column(self, name: str, rows: Optional[int] = None) -> np.ndarray:
+        """Committed values of a column (read-only view on the mapping)."""
+        return self._columns[name][:self.rows if rows is None else rows]
+
+    def write(self, start: int, values: Dict[str, np.ndarray]):
+        """Fill rows from `start` and commit them (writer only)."""
+        count = len(values["timestamp"])
+        for name, column in self._columns.items():
+            column[start:start + count] = values[name]
+        rows, low, high = self.header()
+        new_low, new_high = int(values["timestamp"].min()), int(values["timestamp"].max())
+        if rows:
+            new_low, new_high = min(low, new_low), max(high, new_high)
+        # Range first, row count last: a reader that sees the new count also
+        # sees a range covering the new rows
+        struct.pack_into("<qq", self._map, _RANGE_OFFSET, new_low, new_high)
+        struct.pack_into("<I", self._map, _ROWS_OFFSET, start + count)
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        self._columns = {}
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # Views handed out by column() still reference the mapping
+        self._file.close()
+
+
+class TradeArchive:
+    """
+    Read side of a trade archive directory.
+
+    Can be opened while a writer appends: refresh() picks up new segments
+    and dictionary entries, and committed row counts are read from the
+    segment headers on every scan.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open an archive.
+
+        Args:
+            path: Archive directory
+        """
+        self.path = path
+        self.segments: List[Segment] = []
+        self.dictionaries: Dict[str, List[str]] = {column: [] for column in DICTIONARIES}
+        self._dictionary_offsets = {column: 0 for column in DICTIONARIES}
+        self.refresh()
+
+    def refresh(self):
+        """Map segments and read dictionary entries added since the last call."""
+        known = {segment.path for segment in self.segments}
+        for path in sorted(glob.glob(os.path.join(self.path, "seg-*.col"))):
+            if path in known:
+                continue
+            try:
+                self.segments.append(Segment(path))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping archive segment {path}: {e}")
+        for column, filename in DICTIONARIES.items():
+            self._read_dictionary(column, os.path.join(self.path, filename))
+
+    def _read_dictionary(self, column: str, path: str):
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            f.seek(self._dictionary_offsets[column])
+            data = f.read()
+        # Only complete lines; a partial last line is picked up next time
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            self.dictionaries[column].append(json.loads(line))
+        self._dictionary_offsets[column] += end
+
+    def __len__(self) -> int:
+        return sum(segment.rows for segment in self.segments)
+
+    def time_range(self):
+        """(min, max) timestamp over all committed rows, or None if empty."""
+        ranges = [(low, high) for rows, low, high in (s.header() for s in self.segments) if rows]
+        if not ranges:
+            return None
+        return min(low for low, _ in ranges), max(high for _, high in ranges)
+
+    def ids(self, column: str, values: Iterable[str]) -> np.ndarray:
+        """Dictionary ids of the given strings (unknown ones are left out)."""
+        lookup = {value: index for index, value in enumerate(self.dictionaries[column])}
+        return np.array([lookup[v] for v in values if v in lookup], dtype=COLUMN_TYPES[column])
+
+    def decode(self, column: str, ids: np.ndarray) -> np.ndarray:
+        """Strings for dictionary ids of a column (or side names)."""
+        if column == "side":
+            return np.asarray(SIDES, dtype=object)[ids]
+        if len(ids) and int(ids.max()) >= len(self.dictionaries[column]):
+            self.refresh()
+        return np.asarray(self.dictionaries[column], dtype=object)[ids]
+
+    def scan(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        columns: Sequence[str] = tuple(COLUMN_TYPES),
+    ) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Columns of each segment with trades in [start, end).
+
+        Segments outside the range are skipped using their header min/max
+        timestamps. Segments entirely inside it are yielded as read-only
+        views on the mapping (no copy); others are masked.
+
+        Args:
+            start: Earliest timestamp (None = unbounded)
+            end: Timestamp bound, exclusive (None = unbounded)
+            columns: Columns to return
+
+        Yields:
+            Dict mapping column name to array, one per segment
+        """
+        for segment in self.segments:
+            rows, low, high = segment.header()
+            if not rows or (start is not None and high < start) or (end is not None and low >= end):
+                continue
+            views = {name: segment.column(name, rows) for name in columns}
+            if (start is None or low >= start) and (end is None or high < end):
+                yield views
+                continue
+            timestamps = segment.column("timestamp", rows)
+            mask = np.ones(rows, dtype=bool)
+            if start is not None:
+                mask &= timestamps >= start
+            if end is not None:
+                mask &= timestamps < end
+            yield {name: values[mask] for name, values in views.items()}
+
+    def query(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        wallets: Optional[Iterable[str]] = None,
+        markets: Optional[Iterable[str]] = None,
+        columns: Sequence[str] = tuple(COLUMN_TYPES),
+    ) -> Dict[str, np.ndarray]:
+        """
+        Trades in [start, end), optionally only for some wallets or markets.
+
+        Returns:
+            Dict mapping column name to one array over all matching trades
+            (string columns as dictionary ids; see decode)
+        """
+        wallet_ids = None if wallets is None else self.ids("wallet", [w.lower() for w in wallets])
+        market_ids = None if markets is None else self.ids("market", markets)
+        needed = list(dict.fromkeys(list(columns) + [
+            name for name, ids in (("wallet", wallet_ids), ("market", market_ids)) if ids is not None
+        ]))
+        parts: Dict[str, list] = {name: [] for name in columns}
+        for chunk in self.scan(start, end, needed):
+            mask = None
+            if wallet_ids is not None:
+                mask = np.isin(chunk["wallet"], wallet_ids)
+            if market_ids is not None:
+                in_markets = np.isin(chunk["market"], market_ids)
+                mask = in_markets if mask is None else mask & in_markets
+            for name in columns:
+                parts[name].append(chunk[name] if mask is None else chunk[name][mask])
+        return {
+            name: np.concatenate(arrays) if arrays else np.empty(0, dtype=COLUMN_TYPES[name])
+            for name, arrays in parts.items()
+        }
+
+    def to_frame(self, start: Optional[float] = None, end: Optional[float] = None, **filters) -> pd.DataFrame:
+        """
+        Matching trades as a DataFrame with strings decoded (see query).
+        """
+        columns = self.query(start, end, **filters)
+        frame = pd.DataFrame({name: values for name, values in columns.items() if name != "key"})
+        for name in list(DICTIONARIES) + ["side"]:
+            frame[name] = self.decode(name, columns[name])
+        return frame
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+
+
+class ArchiveWriter:
+    """
+    Appends trades to an archive directory.
+
+    Trades already archived (same identity as pipeline.trade_key) are
+    skipped, so the same trades can be offered every run. Only one writer
+    may have an archive open; readers (TradeArchive) can open it any time.
+    """
+
+    def __init__(self, path: str, segment_rows: int = ARCHIVE_SEGMENT_ROWS):
+        """
+        Open (or create) an archive for appending.
+
+        Args:
+            path: Archive directory (created if missing)
+            segment_rows: Row capacity of new segment files
+
+        Raises:
+            RuntimeError: Another writer has the archive open
+        """
+        self.path = path
+        self.segment_rows = segment_rows
+        os.makedirs(path, exist_ok=True)
+        self._lock_file = open(os.path.join(path, "writer.lock"), "a")
+        try:
+            import fcntl
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except ImportError:
+            pass  # No advisory locking on this platform
+        except OSError:
+            self._lock_file.close()
+            raise RuntimeError(f"Trade archive {path} is already open for writing")
+
+        self._lock = threading.Lock()
+        reader = TradeArchive(path)
+        self.ids: Dict[str, Dict[str, int]] = {
+            column: {value: index for index, value in enumerate(values)}
+            for column, values in reader.dictionaries.items()
+        }
+        self._dictionary_files = {
+            column: open(os.path.join(path, filename), "a", encoding="utf-8")
+            for column, filename in DICTIONARIES.items()
+        }
+        # Known trade hashes: sorted array for the archived ones plus a set
+        # for hashes added since, merged in from time to time
+        keys = [segment.column("key").copy() for segment in reader.segments]
+        self._keys = np.unique(np.concatenate(keys)) if keys else np.empty(0, dtype="<u8")
+        self._new_keys: set = set()
+        self.rows = len(reader)
+        reader.close()
+
+        segments = sorted(glob.glob(os.path.join(path, "seg-*.col")))
+        self.segment = Segment(segments[-1], writable=True) if segments else None
+        self._segment_count = len(segments)
+        self.appended = 0
+        self.skipped = 0
+
+    def _archived(self, keys: List[int]) -> np.ndarray:
+        """Which of the hashes are in the sorted array of archived ones."""
+        if not len(self._keys):
+            return np.zeros(len(keys), dtype=bool)
+        wanted = np.array(keys, dtype="<u8")
+        index = np.minimum(np.searchsorted(self._keys, wanted), len(self._keys) - 1)
+        return self._keys[index] == wanted
+
+    def _id(self, column: str, value: str) -> int:
+        ids = self.ids[column]
+        index = ids.get(value)
+        if index is None:
+            index = ids[value] = len(ids)
+            self._dictionary_files[column].write(json.dumps(value) + "\n")
+        return index
+
+    def append(self, trades: Iterable[Dict[str, Any]]) -> int:
+        """
+        Append trades not archived yet.
+
+        Args:
+            trades: Trade dictionaries as returned by the data API
+
+        Returns:
+            Number of trades appended
+        """
+        with self._lock:
+            trades = list(trades)
+            keys = [trade_hash(trade) for trade in trades]
+            rows = []
+            for trade, key, archived in zip(trades, keys, self._archived(keys)):
+                if archived or key in self._new_keys:
+                    self.skipped += 1
+                    continue
+                self._new_keys.add(key)
+                rows.append((
+                    int(trade.get("timestamp") or 0),
+                    float(trade.get("price") or 0.0),
+                    float(trade.get("size") or 0.0),
+                    key,
+                    self._id("wallet", (trade.get("proxyWallet") or "").lower()),
+                    self._id("market", trade.get("conditionId") or ""),
+                    self._id("outcome", trade.get("outcome") or ""),
+                    1 if str(trade.get("side", "BUY")).upper() == "SELL" else 0,
+                ))
+            if not rows:
+                return 0
+
+            # Dictionary entries must be on disk before rows referring to them
+            for f in self._dictionary_files.values():
+                f.flush()
+            self._write({
+                name: np.asarray(values, dtype=COLUMN_TYPES[name])
+                for name, values in zip(COLUMN_TYPES, zip(*rows))
+            })
+
+            if len(self._new_keys) > 100000:
+                self._keys = np.union1d(self._keys, np.fromiter(self._new_keys, dtype="<u8"))
+                self._new_keys.clear()
+            self.appended += len(rows)
+            return len(rows)
+
+    def _write(self, columns: Dict[str, np.ndarray]):
+        """Write rows into the open segment, starting new ones as they fill up."""
+        total = len(columns["timestamp"])
+        written = 0
+        while written < total:
+            if self.segment is None or self.segment.rows >= self.segment.capacity:
+                if self.segment is not None:
+                    self.segment.flush()
+                    self.segment.close()
+                path = os.path.join(self.path, f"seg-{self._segment_count:06d}.col")
+                self.segment = Segment.create(path, self.segment_rows)
+                self._segment_count += 1
+            start = self.segment.rows
+            count = min(total - written, self.segment.capacity - start)
+            self.segment.write(start, {name: values[written:written + count] for name, values in columns.items()})
+            written += count
+        self.rows += total
+
+    def flush(self):
+        """Flush dictionaries and the open segment to disk."""
+        with self._lock:
+            for f in self._dictionary_files.values():
+                f.flush()
+                os.fsync(f.fileno())
+            if self.segment is not None:
+                self.segment.flush()
+
+    def close(self):
+        """Flush and release the archive."""
+        self.flush()
+        with self._lock:
+            for f in self._dictionary_files.values():
+                f.close()
+            if self.segment is not None:
+                self.segment.close()
+                self.segment = None
+            self._lock_file.close()
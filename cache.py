@@ -0,0 +1,339 @@
+"""Bounded in-memory caches, and a response cache shared between processes."""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from config import SHARED_CACHE_PATH, SHARED_CACHE_TTLS, SHARED_CACHE_LEASE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after `ttl` seconds.
+
+    Holds at most `maxsize` entries; inserting beyond that evicts the least
+    recently used one. Expired entries are dropped when they are looked up.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize: int, ttl: float):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Most entries kept
+            ttl: Seconds an entry stays valid
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Cached value for `key`, or `default` if missing or expired."""
+        value = self._lookup(key, time.time())
+        return default if value is self._MISSING else value
+
+    def _lookup(self, key, now: float):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return self._MISSING
+            stored_at, value = entry
+            if now - stored_at > self.ttl:
+                del self._data[key]
+                self.misses += 1
+                return self._MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_many(self, keys: Iterable) -> Tuple[Dict[Any, Any], list]:
+        """
+        Look up several keys at once.
+
+        Returns:
+            (found, missing): dict of cached values and list of keys that
+            were missing or expired
+        """
+        now = time.time()
+        found, missing = {}, []
+        for key in keys:
+            value = self._lookup(key, now)
+            if value is self._MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        return found, missing
+
+    def set(self, key, value, now: Optional[float] = None):
+        """Store a value, evicting the least recently used entry if full."""
+        with self._lock:
+            self._data[key] = (time.time() if now is None else now, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SharedCache:
+    """
+    Response cache in a SQLite file, shared by every process that opens it.
+
+    Each entry stores a JSON value with its own expiry time. get_or_fetch()
+    gives single-flight semantics across processes: the first caller to miss
+    takes a lease on the key (a row in the `leases` table, claimed inside an
+    IMMEDIATE transaction so only one process can win it), fetches, stores
+    and releases; callers that find the lease taken poll for the value
+    instead of fetching it themselves. A lease expires after `lease_seconds`,
+    so a crashed owner only delays the others.
+
+    The database file belongs on a local disk shared by the processes of
+    one host: SQLite's file locking is not reliable on network filesystems
+    such as NFS, where concurrent writers can corrupt it.
+    Database errors are logged and the value fetched directly: the cache
+    never stops a fetch from happening.
+    """
+
+    _MISSING = object()
+    # Expired entries are deleted after this many stores by a process
+    PRUNE_EVERY = 1000
+
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: float = SHARED_CACHE_LEASE_SECONDS,
+        poll_interval: float = 0.05,
+    ):
+        """
+        Open (and create if needed) the cache database.
+
+        Args:
+            path: SQLite database file
+            lease_seconds: Longest a fetch by another process is waited for
+            poll_interval: Seconds between checks while waiting
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.stats = {"hits": 0, "misses": 0, "waits": 0, "fetches": 0, "errors": 0}
+        self._stores = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases "
+                "(key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection (sqlite3 connections are not shared between threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        return conn
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def get(self, key: str, default=None):
+        """Cached value for `key`, or `default` if missing or expired."""
+        try:
+            row = self._connection().execute(
+                "SELECT value FROM entries WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache read failed: {e}")
+            self._count("errors")
+            return default
+        return default if row is None else json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float):
+        """Store a JSON-serializable value for `ttl` seconds."""
+        now = time.time()
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), now + ttl),
+            )
+            with self._lock:
+                self._stores += 1
+                prune = self._stores % self.PRUNE_EVERY == 0
+            if prune:
+                conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+                conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache write failed: {e}")
+            self._count("errors")
+
+    def _claim(self, key: str, owner: str):
+        """
+        In one transaction: return the cached value if there is one,
+        otherwise take the lease on `key` if nobody else holds it.
+
+        Returns:
+            (value, leased): value is _MISSING unless cached
+        """
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM entries WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is not None:
+                return json.loads(row[0]), False
+            lease = conn.execute(
+                "SELECT owner FROM leases WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if lease is not None and lease[0] != owner:
+                return self._MISSING, False
+            conn.execute(
+                "INSERT OR REPLACE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, owner, now + self.lease_seconds),
+            )
+            return self._MISSING, True
+        finally:
+            conn.execute("COMMIT")
+
+    def _release(self, key: str, owner: str):
+        try:
+            self._connection().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache lease release failed: {e}")
+            self._count("errors")
+
+    def get_or_fetch(
+        self,
+        key: str,
+        ttl: float,
+        fetch: Callable[[], Any],
+        wait: Optional[float] = None,
+    ) -> Any:
+        """
+        Cached value for `key`, fetching and storing it if missing. Only one
+        process (or thread) fetches a key at a time; the rest wait for it.
+
+        Exceptions from `fetch` propagate and nothing is stored, so failures
+        are never cached.
+
+        Args:
+            key: Cache key
+            ttl: Seconds a fetched value stays valid
+            fetch: Returns the JSON-serializable value from upstream
+            wait: Longest to wait for another fetch of the key before
+                fetching anyway (defaults to lease_seconds)
+
+        Returns:
+            The cached or fetched value
+        """
+        owner = f"{self.owner}:{threading.get_ident()}"
+        give_up_at = time.monotonic() + (self.lease_seconds if wait is None else wait)
+        waited = False
+        while True:
+            try:
+                value, leased = self._claim(key, owner)
+            except sqlite3.Error as e:
+                logger.warning(f"Shared cache lookup failed, fetching directly: {e}")
+                self._count("errors")
+                return fetch()
+            if value is not self._MISSING:
+                self._count("waits" if waited else "hits")
+                return value
+            if leased:
+                break
+            if time.monotonic() >= give_up_at:
+                logger.debug(f"Gave up waiting for another fetch of {key}")
+                return fetch()
+            waited = True
+            time.sleep(self.poll_interval)
+
+        self._count("misses")
+        try:
+            value = fetch()
+            self._count("fetches")
+            self.set(key, value, ttl)
+            return value
+        finally:
+            self._release(key, owner)
+
+    def log_summary(self):
+        """Log hit, wait and fetch counts."""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["waits"] + stats["misses"]
+        if not lookups:
+            return
+        logger.info(
+            f"Shared cache {self.path}: {lookups} lookups, {stats['hits']} hits, "
+            f"{stats['waits']} served by another process's fetch, {stats['fetches']} fetched"
+            + (f", {stats['errors']} errors" if stats["errors"] else "")
+        )
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_shared_cache: Optional[SharedCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_cache() -> Optional[SharedCache]:
+    """Return the process-wide SharedCache at SHARED_CACHE_PATH (None when disabled)."""
+    global _shared_cache
+    if not SHARED_CACHE_PATH:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = SharedCache(SHARED_CACHE_PATH)
+        return _shared_cache
+
+
+def shared_fetch(kind: str, key: str, fetch: Callable[[], Any], wait: Optional[float] = None) -> Any:
+    """
+    Fetch through the shared cache when one is configured, otherwise just fetch.
+
+    Args:
+        kind: Entry kind, selecting the TTL in SHARED_CACHE_TTLS
+        key: Cache key within the kind (e.g. the request URL)
+        fetch: Returns the JSON-serializable value from upstream
+        wait: Longest to wait for another process's fetch of the key
+
+    Returns:
+        The cached or fetched value
+    """
+    cache = get_shared_cache()
+    if cache is None:
+        return fetch()
+    return cache.get_or_fetch(f"{kind}:{key}", SHARED_CACHE_TTLS.get(kind, 60), fetch, wait=wait)
@@ -0,0 +1,155 @@
+"""Versioned checkpoints of processor state for warm starts."""
+
+import json
+import logging
+import os
+import struct
+import tempfile
+import time
+import zlib
+from typing import Dict, Any, Optional
+
+from stats import RunningStats
+
+logger = logging.getLogger(__name__)
+
+# File layout: magic, format version, payload CRC32, payload length, payload
+CHECKPOINT_MAGIC = b"PMCK"
+CHECKPOINT_VERSION = 2
+_HEADER = struct.Struct("<4sHIQ")
+
+# Values JSON has no type for are written as {TYPE_TAG: name, "v": ...}
+TYPE_TAG = "$t"
+
+
+def encode_value(value: Any) -> Any:
+    """
+    Turn state into plain JSON values.
+
+    Tuples, sets, RunningStats and dicts with non-string keys are written as
+    tagged objects that decode_object turns back into the same types; any
+    other non-JSON type is an error.
+
+    Args:
+        value: State to encode
+
+    Returns:
+        JSON-serializable value
+    """
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, dict):
+        if all(isinstance(key, str) for key in value) and TYPE_TAG not in value:
+            return {key: encode_value(item) for key, item in value.items()}
+        return {TYPE_TAG: "dict", "v": [[encode_value(key), encode_value(item)] for key, item in value.items()]}
+    if isinstance(value, list):
+        return [encode_value(item) for item in value]
+    if isinstance(value, tuple):
+        return {TYPE_TAG: "tuple", "v": [encode_value(item) for item in value]}
+    if isinstance(value, (set, frozenset)):
+        return {TYPE_TAG: "set", "v": [encode_value(item) for item in value]}
+    if isinstance(value, RunningStats):
+        return {TYPE_TAG: "stats", "v": value.export_state()}
+    raise TypeError(f"Cannot checkpoint value of type {type(value).__name__}")
+
+
+def decode_object(obj: Dict[str, Any]) -> Any:
+    """json.loads object_hook undoing encode_value's tagged objects."""
+    kind = obj.get(TYPE_TAG)
+    if kind is None:
+        return obj
+    values = obj["v"]
+    if kind == "tuple":
+        return tuple(values)
+    if kind == "set":
+        return set(values)
+    if kind == "dict":
+        return {key: item for key, item in values}
+    if kind == "stats":
+        return RunningStats.from_state(values)
+    raise ValueError(f"Unknown checkpoint value type {kind!r}")
+
+
+def save_checkpoint(path: str, state: Dict[str, Any]):
+    """
+    Atomically write state to a checkpoint file.
+
+    The payload is compressed JSON (see encode_value) behind a fixed header,
+    so loading a checkpoint never runs code from the file; it is written to
+    a temporary name and renamed, so readers never see a partial checkpoint.
+
+    Args:
+        path: Checkpoint file path
+        state: State dictionary (JSON types plus tuples, sets, RunningStats)
+    """
+    started = time.monotonic()
+    document = encode_value({"saved_at": time.time(), "state": state})
+    payload = zlib.compress(json.dumps(document, separators=(",", ":")).encode("utf-8"), 6)
+    header = _HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, zlib.crc32(payload), len(payload))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".checkpoint-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    elapsed_ms = (time.monotonic() - started) * 1000
+    logger.info(f"Checkpoint written to {path} ({len(payload) / 1024:.0f} KB, {elapsed_ms:.0f} ms)")
+
+
+def load_checkpoint(path: str, max_age_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    Read a checkpoint written by save_checkpoint.
+
+    Args:
+        path: Checkpoint file path
+        max_age_seconds: Ignore checkpoints older than this (None = any age)
+
+    Returns:
+        The saved state dictionary, or None if the file is missing, has a
+        different format version, is corrupt or is too old
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                logger.warning(f"Ignoring truncated checkpoint {path}")
+                return None
+            magic, version, crc, length = _HEADER.unpack(header)
+            if magic != CHECKPOINT_MAGIC:
+                logger.warning(f"Ignoring {path}: not a checkpoint file")
+                return None
+            if version != CHECKPOINT_VERSION:
+                logger.warning(f"Ignoring checkpoint {path}: version {version}, expected {CHECKPOINT_VERSION}")
+                return None
+            payload = f.read(length)
+    except OSError as e:
+        logger.warning(f"Could not read checkpoint {path}: {e}")
+        return None
+
+    if len(payload) != length or zlib.crc32(payload) != crc:
+        logger.warning(f"Ignoring corrupt checkpoint {path}")
+        return None
+
+    try:
+        document = json.loads(zlib.decompress(payload).decode("utf-8"), object_hook=decode_object)
+    except Exception as e:
+        logger.warning(f"Could not decode checkpoint {path}: {e}")
+        return None
+
+    age = time.time() - document.get("saved_at", 0)
+    if max_age_seconds is not None and age > max_age_seconds:
+        logger.info(f"Ignoring checkpoint {path}: {age:.0f}s old (limit {max_age_seconds}s)")
+        return None
+
+    logger.info(f"Loaded checkpoint {path} ({age:.0f}s old)")
+    return document["state"]
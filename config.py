@@ -75,19 +75,258 @@ TRADER_RATINGS = {
     "Zzdl": 3,
 }
 
+# Computed trader ratings (ratings.py). Every folded trade updates its
+# trader's open positions; when a market resolves, the positions are settled
+# into realized PnL, hit rate and calibration (hit rate vs. entry price).
+# With USE_COMPUTED_RATINGS, a trader with at least RATING_MIN_RESOLVED_BETS
+# settled bets gets a 1-10 rating from their edge over the entry prices
+# (shrunk towards 0 by RATING_PRIOR_BETS pseudo-bets), replacing the
+# TRADER_RATINGS entry; other traders keep the hand-maintained value.
+USE_COMPUTED_RATINGS = False
+RATING_MIN_RESOLVED_BETS = 10
+RATING_PRIOR_BETS = 10
+RATING_EDGE_SCALE = 20          # Rating points per unit of edge, around 5.5
+RATINGS_STATE_PATH = "trader_ratings.ckpt"
+# Open markets are checked for a resolution at most this often, and at most
+# RATING_MAX_RESOLUTION_CHECKS of them per cycle
+RATING_RESOLUTION_CHECK_SECONDS = 1800
+RATING_MAX_RESOLUTION_CHECKS = 50
+
+# Raw trade archive (archive.py). When ARCHIVE_PATH is set, every trade the
+# pipeline folds is also appended (once) to a memory-mapped columnar archive
+# in that directory, for backtests and rating calibration over long periods.
+# Segment files hold ARCHIVE_SEGMENT_ROWS trades each.
+ARCHIVE_PATH = None
+ARCHIVE_SEGMENT_ROWS = 1000000
+
 # API endpoints
 POLYMARKET_API_BASE = "https://data-api.polymarket.com"
 TRADES_ENDPOINT = f"{POLYMARKET_API_BASE}/trades"
 MARKETS_ENDPOINT = f"{POLYMARKET_API_BASE}/markets"
 
+# Structured market status source used by CHECK_LIVE_STATUS before falling
+# back to scanning the polymarket.com market page. Set to None to disable.
+MARKET_STATUS_API = "https://gamma-api.polymarket.com/markets"
+
+# Batched market metadata (end date, category, status flags) by condition id,
+# from the same markets API. Lookups are split into batches of
+# MARKET_METADATA_BATCH_SIZE ids, fetched MARKET_METADATA_CONCURRENCY at a
+# time, and cached (LRU, MARKET_METADATA_CACHE_SIZE entries) for
+# MARKET_METADATA_TTL seconds. With CHECK_LIVE_STATUS, markets found here
+# skip the market page scan. Set MARKET_METADATA_API to None to disable.
+MARKET_METADATA_API = MARKET_STATUS_API
+MARKET_METADATA_BATCH_SIZE = 50
+MARKET_METADATA_CONCURRENCY = 4
+MARKET_METADATA_CACHE_SIZE = 5000
+MARKET_METADATA_TTL = 600
+# Treat markets as expired this many hours after their end date, even if the
+# API still lists them as open (None = don't use end dates)
+MARKET_EXPIRY_GRACE_HOURS = None
+
+# Shared HTTP client (http_client.py): keep-alive connection pools per host
+HTTP_POOL_CONNECTIONS = 10      # Number of hosts to keep pools for
+HTTP_POOL_MAXSIZE = 16          # Connections kept alive per host
+HTTP_TIMEOUT = 10               # Default request timeout in seconds
+HTTP_MAX_CONCURRENCY_PER_HOST = 8
+# Per-host overrides of HTTP_MAX_CONCURRENCY_PER_HOST
+HTTP_HOST_CONCURRENCY = {
+    "polymarket.com": 4,
+    "api.telegram.org": 2,
+}
+# URL prefix rewrites applied to every outbound request, e.g. to send all
+# traffic to the local mock server (mock_server.py):
+#   {"https://data-api.polymarket.com": "http://127.0.0.1:9000"}
+HTTP_URL_REWRITES = {}
+
+# Long-running mode (python main.py --serve): seconds between analysis
+# cycles, and where the latest results are served as JSON
+POLL_INTERVAL_SECONDS = 300
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8080
+
+# Processor state checkpoint for warm starts. The folded market aggregates
+# and status cache are written here after a cycle (at most every
+# CHECKPOINT_INTERVAL_SECONDS) and restored when --serve starts, so a
+# restarted server can publish signals before its first fetch completes (that
+# fetch still rebuilds the state from scratch). Checkpoints are compressed
+# JSON, never unpickled. Set CHECKPOINT_PATH to None to disable.
+CHECKPOINT_PATH = "processor_state.ckpt"
+CHECKPOINT_INTERVAL_SECONDS = 300
+CHECKPOINT_MAX_AGE_SECONDS = 6 * 3600
+
 # Output settings
 OUTPUT_CSV = "polymarket_trades_analysis.csv"
 MIN_WALLETS_PER_MARKET = 2
+
+# Signal score (Score column) used to pick the top markets for the console
+# table and notifications. Each feature is scaled to [0, 1]:
+#   rated_size      - size on the majority outcome weighted by trader rating
+#   majority_margin - lead of the majority outcome in trader count
+#   wallet_count    - number of tracked wallets in the market
+#   recency         - halves every SCORE_RECENCY_HALF_LIFE_HOURS since the latest trade
+SCORE_WEIGHTS = {
+    "rated_size": 0.4,
+    "majority_margin": 0.3,
+    "wallet_count": 0.2,
+    "recency": 0.1,
+}
+SCORE_RECENCY_HALF_LIFE_HOURS = 6
+# Rating assumed for traders not in TRADER_RATINGS when weighting size
+SCORE_UNRATED_RATING = 3
+# Markets shown in the console table, best score first (None = all)
+CONSOLE_TOP_N = None
+
+# Only markets that appear among this many most recent trades (across all
+# tracked wallets) are analyzed
+MAX_RECENT_TRADES = 600
+
+# With TRADES_PAGE_SIZE set, wallet trades are paged newest-first across
+# wallets, TRADES_PAGE_SIZE at a time, down to MAX_TRADES_PER_WALLET per
+# wallet (the same trades as one request with the API's default page size,
+# in more requests; a deadline can then keep a wallet's newest pages). None
+# = one request per wallet.
+TRADES_PAGE_SIZE = None
+MAX_TRADES_PER_WALLET = 100
+
+# Number of wallet fetches in flight at once. Each wallet's trades are folded
+# into the market aggregates as soon as its response arrives.
+FETCH_CONCURRENCY = 8
+
+# Time budget in seconds for a cycle. When it runs out during the fetch,
+# filtering runs with the wallets that have arrived; live status checks not
+# done by then use a stale cached status or keep the market unchecked. The
+# run output lists the missing and partially fetched wallets and the
+# markets with stale or unchecked status. Set to None to wait for all.
+PIPELINE_DEADLINE_SECONDS = None
+
+# Speculatively fetch current prices for candidate markets while slower
+# wallets are still loading (stored in each market's "current_prices")
+PREFETCH_CURRENT_PRICES = False
+
+# Streaming trade ingest (`python main.py --serve --stream`): trades pushed
+# over the feed are folded in as they happen, and polling only runs to seed
+# the state, to recover trades missed while disconnected (reaching back
+# STREAM_GAP_MARGIN_SECONDS before the disconnect) and to rebuild the state
+# from scratch every STREAM_RESYNC_SECONDS (None = never).
+TRADE_STREAM_URL = "wss://ws-live-data.polymarket.com"
+TRADE_STREAM_SUBSCRIPTION = {
+    "action": "subscribe",
+    "subscriptions": [{"topic": "activity", "type": "trades"}],
+}
+STREAM_RECONNECT_DELAY = 1.0
+STREAM_MAX_RECONNECT_DELAY = 60.0
+STREAM_RESYNC_SECONDS = 3600
+STREAM_GAP_MARGIN_SECONDS = 60
+
+# Adaptive polling (`python main.py --serve --adaptive`): after one full
+# poll seeds the state, each wallet is polled on its own interval instead of
+# refetching every wallet each cycle. A wallet's interval is
+# POLL_INTERVAL_SECONDS divided by its weight, clamped to
+# [POLL_MIN_INTERVAL_SECONDS, POLL_MAX_INTERVAL_SECONDS]:
+#   (1 + trades per POLL_INTERVAL_SECONDS over the last POLL_RATE_WINDOW_SECONDS)
+#   * rating / SCORE_UNRATED_RATING
+#   * POLL_SURFACED_BOOST if it holds a position in a surfaced market
+# When the intervals add up to more than POLL_BUDGET_PER_SECOND requests per
+# second, all of them are stretched by the same factor; every request also
+# takes a token from a bucket refilling at that rate (burst POLL_BUDGET_BURST).
+# The state is rebuilt from a full poll every POLL_RESYNC_SECONDS (None = never).
+POLL_BUDGET_PER_SECOND = 1.0
+POLL_BUDGET_BURST = 10
+POLL_MIN_INTERVAL_SECONDS = 30
+POLL_MAX_INTERVAL_SECONDS = 6 * 3600
+POLL_RATE_WINDOW_SECONDS = 24 * 3600
+POLL_SURFACED_BOOST = 4.0
+POLL_RESYNC_SECONDS = 6 * 3600
+
+# Market watch (`python main.py --serve --watch`): between analysis cycles
+# the markets in the latest results (the WATCH_MAX_MARKETS best by score)
+# are polled by condition id every WATCH_INTERVAL_SECONDS, WATCH_TRADES_LIMIT
+# newest trades each. Trades by tracked wallets are folded into the market
+# aggregates, and entries, exits and last-price moves of at least
+# WATCH_PRICE_MOVE are served at /watch and sent to TELEGRAM_CHAT_ID (when
+# notifications are enabled). A market leaves the watch set when it resolves
+# or closes, or after WATCH_QUIET_SECONDS without a trade.
+WATCH_INTERVAL_SECONDS = 15
+WATCH_TRADES_LIMIT = 100
+WATCH_PRICE_MOVE = 0.05
+WATCH_QUIET_SECONDS = 2 * 3600
+WATCH_MAX_MARKETS = 20
+WATCH_CONCURRENCY = 4
+WATCH_MAX_EVENTS = 200          # Recent events kept for /watch
 # If False, do not attempt to check market page status; include all markets
 # referenced in tracked wallets' trades. Set to True to filter to markets
 # that appear to be LIVE (not resolved/closed).
 CHECK_LIVE_STATUS = False
 
+# Reorder independent filter stages by measured cost and drop rate (cheap,
+# selective checks first). Results are the same either way.
+ADAPTIVE_FILTER_ORDER = True
+
+# Every filter run records which stage dropped each market and which stages
+# removed each (market, outcome, trader) entry, as bitmasks in a columnar
+# table. The default profile's table is written here after each run and
+# read by `python main.py --explain <market id>` (None to disable).
+FILTER_VERDICTS_PATH = "filter_verdicts.npz"
+
+# Detection latency (trade -> fetch -> decision -> delivery) is kept for
+# signals from the last LATENCY_WINDOW_SECONDS, bucketed by these upper
+# bounds in seconds, and written to LATENCY_METRICS_PATH after each run
+# (None to disable). In --serve mode it is also exposed at /metrics.
+LATENCY_WINDOW_SECONDS = 6 * 3600
+LATENCY_MAX_SAMPLES = 10000
+LATENCY_BUCKETS = [5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200, 21600]
+LATENCY_METRICS_PATH = "latency_metrics.json"
+
+# Outbound HTTP latency and response size per endpoint class (host plus
+# first path segment, e.g. data-api.polymarket.com/trades), kept for the
+# last HTTP_METRICS_WINDOW_SECONDS. Logged after each run and exposed at
+# /metrics in --serve mode.
+HTTP_METRICS_WINDOW_SECONDS = 3600
+HTTP_METRICS_MAX_SAMPLES = 5000
+HTTP_LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+HTTP_SIZE_BUCKETS = [1024, 8192, 32768, 131072, 524288, 2097152]
+
+# Hedged requests: an idempotent GET (wallet trades, market status and
+# metadata lookups) still unanswered after the HTTP_HEDGE_PERCENTILE latency
+# of its endpoint gets one duplicate request, and whichever answers first is
+# used. Until an endpoint has HTTP_HEDGE_MIN_SAMPLES latency samples,
+# HTTP_HEDGE_DEFAULT_DELAY seconds is used instead. Set
+# HTTP_HEDGE_PERCENTILE to None to disable.
+HTTP_HEDGE_PERCENTILE = 95
+HTTP_HEDGE_MIN_SAMPLES = 20
+HTTP_HEDGE_DEFAULT_DELAY = 2.0
+HTTP_HEDGE_MIN_DELAY = 0.1
+HTTP_HEDGE_WORKERS = 32
+
+# Run tracing (main.py --trace DIR): nested spans for each run (wallet page
+# fetches, HTTP requests, filter stages, status checks, notifications)
+# written as Chrome trace JSON, viewable in chrome://tracing or Perfetto.
+# At most TRACE_MAX_EVENTS spans are kept per run and the newest
+# TRACE_KEEP_FILES trace files are kept in DIR.
+TRACE_MAX_EVENTS = 200000
+TRACE_KEEP_FILES = 50
+
+# Seconds a fetched live status is reused before the market is checked again
+LIVE_STATUS_CACHE_TTL = 600
+# Expired statuses are kept this much longer as a fallback for when the cycle
+# deadline leaves no time to recheck, then dropped from the cache
+LIVE_STATUS_STALE_SECONDS = 3600
+
+# Response cache shared by every instance pointing at the same
+# SHARED_CACHE_PATH (a SQLite file on a local disk; SQLite locking is not
+# reliable on network filesystems like NFS). Wallet trade
+# pages, market trades (current prices) and live status checks are kept for their
+# SHARED_CACHE_TTLS entry in seconds. When several processes want the same
+# entry at once, one fetches it and the others wait up to
+# SHARED_CACHE_LEASE_SECONDS for its result. Set to None to disable.
+SHARED_CACHE_PATH = None
+SHARED_CACHE_TTLS = {
+    "trades": 30,
+    "market_trades": 10,
+    "status": LIVE_STATUS_CACHE_TTL,
+}
+SHARED_CACHE_LEASE_SECONDS = 15
+
 # Optional market keyword filter: when set to a non-empty list, only trades
 # whose market title contains any of these keywords (case-insensitive)
 # will be included in analysis. For example, ['lol'] will restrict output
@@ -149,9 +388,42 @@ ENABLE_VOLATILITY_FILTER = True
 # If max(price) - min(price) is above this, the market is filtered out.
 MAX_OUTCOME_PRICE_SPREAD = 0.25
 
-# Only evaluate volatility on outcomes that have at least this many prices.
+# Only evaluate volatility on outcomes with at least this many traders (each
+# trader counts once, at the price of their latest fill).
 MIN_PRICES_FOR_VOLATILITY_CHECK = 2
 
+# Optional cap on the standard deviation of entry prices on the same outcome.
+# Set to None to only use the max-min spread check above.
+MAX_OUTCOME_PRICE_STDDEV = None
+
+# Keep only markets where one outcome has at least this share of the traders
+MAJORITY_THRESHOLD = 0.65
+
+# Named filter profiles evaluated over the same fetch and aggregation as the
+# main run, each with its own results, CSV and notification target. Settings
+# left out fall back to the values above. Profile keywords narrow the shared
+# MAX_RECENT_TRADES window (ONLY_SHOW_MARKET_KEYWORDS still applies to it).
+#
+# FILTER_PROFILES = {
+#     "lol-strict": {
+#         "keywords": ["lol"],
+#         "min_wallets": 3,
+#         "majority_threshold": 0.75,
+#         "max_market_age_hours": 3,
+#         "csv": "lol_strict.csv",
+#         "telegram_chat_id": "123456789",
+#     },
+# }
+FILTER_PROFILES = {}
+
+# Threshold grid for `python main.py --sweep` (override with --grid)
+SWEEP_GRID = {
+    "max_price_spread": [0.1, 0.15, 0.2, 0.25, 0.3, 0.4],
+    "min_prices_for_volatility": [2, 3, 4, 5],
+    "majority_threshold": [0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.9],
+}
+SWEEP_CSV = "threshold_sweep.csv"
+
 # If True, show individual MMR ratings for each trader and total $ per outcome
 # If False, show average MMR
 SHOW_INDIVIDUAL_RATINGS = True
@@ -161,4 +433,40 @@ SHOW_INDIVIDUAL_RATINGS = True
 # Get chat ID by messaging @userinfobot on Telegram
 TELEGRAM_BOT_TOKEN = "8395273058:AAGEGxcT03W80zL5rMjshMXP2NH-AAaJcto"
 TELEGRAM_CHAT_ID = "8509374331"
-ENABLE_TELEGRAM_NOTIFICATIONS = True
\ No newline at end of file
+ENABLE_TELEGRAM_NOTIFICATIONS = True
+
+# Telegram Bot API base URL (point at a local stand-in server for testing)
+TELEGRAM_API_BASE = "https://api.telegram.org"
+
+# Multi-chat fan-out. When non-empty, each entry gets its own feed instead of
+# the single TELEGRAM_CHAT_ID message:
+#   {"chat_id": "123", "name": "lol-feed", "categories": ["lol"],
+#    "min_rating": 7, "max_markets": 4}
+# "categories" refers to MARKET_CATEGORIES names (empty = all markets) and
+# "min_rating" to the best TRADER_RATINGS value among the market's traders.
+TELEGRAM_SUBSCRIBERS = []
+
+# Title keywords (case-insensitive) that put a market in a category
+MARKET_CATEGORIES = {
+    "lol": ["lol", "league of legends"],
+    "dota": ["dota"],
+    "cs": ["counter-strike", "cs2"],
+    "valorant": ["valorant"],
+    "tennis": ["open:", "atp", "wta"],
+    "soccer": ["fc ", "united", "premier league", "la liga"],
+    "basketball": ["nba", "wnba"],
+}
+
+# Telegram rate limits: messages per second across all chats, and minimum
+# seconds between messages to the same chat
+TELEGRAM_GLOBAL_RATE = 25
+TELEGRAM_CHAT_INTERVAL = 1.0
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+TELEGRAM_SEND_WORKERS = 8
+
+# A message answered 429 is sent again after the retry_after Telegram asks
+# for, at most TELEGRAM_MAX_RATE_LIMIT_RETRIES times per market and chat.
+# Markets still queued TELEGRAM_FLUSH_TIMEOUT seconds into a flush are left
+# undelivered (None = wait as long as it takes)
+TELEGRAM_MAX_RATE_LIMIT_RETRIES = 3
+TELEGRAM_FLUSH_TIMEOUT = 120
\ No newline at end of file
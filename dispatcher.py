@@ -0,0 +1,404 @@
+"""Fan-out of market notifications to many Telegram chats."""
+
+import logging
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
+import pandas as pd
+
+from config import (
+    MARKET_CATEGORIES,
+    TELEGRAM_API_BASE,
+    TELEGRAM_GLOBAL_RATE,
+    TELEGRAM_CHAT_INTERVAL,
+    TELEGRAM_MAX_MESSAGE_LENGTH,
+    TELEGRAM_SEND_WORKERS,
+    TELEGRAM_MAX_RATE_LIMIT_RETRIES,
+    TELEGRAM_FLUSH_TIMEOUT,
+)
+from http_client import HttpClient, get_http_client
+from notifier import format_market_body
+from ratelimit import TokenBucket
+from scoring import iter_ranked_indices
+from latency import get_latency_tracker
+
+logger = logging.getLogger(__name__)
+
+# An HTML entity or tag cut short at the end of a string ("&am", "<a hr")
+PARTIAL_MARKUP_PATTERN = re.compile(r"(&[#\w]*|<[^>]*)$")
+
+
+def market_categories(title: str) -> set:
+    """
+    Categories from MARKET_CATEGORIES whose keywords appear in a market title.
+
+    Args:
+        title: Market title
+
+    Returns:
+        Set of category names (case-insensitive keyword match)
+    """
+    title = title.lower()
+    return {
+        category for category, keywords in MARKET_CATEGORIES.items()
+        if any(k.lower() in title for k in keywords)
+    }
+
+
+def fit_market_part(number: int, title: str, body: str, budget: int) -> str:
+    """
+    Render one market of a digest, shortened to `budget` characters if needed.
+
+    Body lines are dropped whole and the title is cut inside its <b> tag, so
+    the result never ends in the middle of a tag or entity (Telegram rejects
+    the whole message when the HTML doesn't parse).
+
+    Args:
+        number: Position of the market in the digest
+        title: Market title
+        body: Lines from format_market_body
+        budget: Most characters the part may take
+
+    Returns:
+        Message fragment ending in a blank line
+    """
+    part = f"<b>{number}. {title}</b>\n{body}\n"
+    if len(part) <= budget:
+        return part
+
+    more = "   …\n\n"
+    head = f"<b>{number}. {title}</b>\n"
+    overflow = len(head) + len(more) - budget
+    if overflow > 0:
+        cut = PARTIAL_MARKUP_PATTERN.sub("", title[:max(0, len(title) - overflow - 1)])
+        head = f"<b>{number}. {cut}…</b>\n"
+    lines = []
+    length = len(head) + len(more)
+    for line in body.splitlines(keepends=True):
+        if length + len(line) > budget:
+            break
+        lines.append(line)
+        length += len(line)
+    return head + "".join(lines) + more
+
+
+class Subscriber:
+    """A chat that receives a filtered feed of markets."""
+
+    def __init__(
+        self,
+        chat_id: str,
+        name: str = "",
+        categories: Optional[List[str]] = None,
+        min_rating: Optional[int] = None,
+        max_markets: int = 4,
+    ):
+        """
+        Initialize a subscriber.
+
+        Args:
+            chat_id: Telegram chat ID
+            name: Label used in logs
+            categories: MARKET_CATEGORIES names to receive (empty/None = all)
+            min_rating: Only markets whose best trader rating is at least this
+            max_markets: Most markets to deliver per run
+        """
+        self.chat_id = str(chat_id)
+        self.name = name or self.chat_id
+        self.categories = set(categories or [])
+        self.min_rating = min_rating
+        self.max_markets = max_markets
+
+    @classmethod
+    def from_config(cls, entry: Dict[str, Any]) -> "Subscriber":
+        """Build a subscriber from a TELEGRAM_SUBSCRIBERS entry."""
+        return cls(
+            chat_id=entry["chat_id"],
+            name=entry.get("name", ""),
+            categories=entry.get("categories"),
+            min_rating=entry.get("min_rating"),
+            max_markets=entry.get("max_markets", 4),
+        )
+
+    def accepts(self, categories: set, rating: Optional[int]) -> bool:
+        """
+        Check whether a market belongs in this subscriber's feed.
+
+        Args:
+            categories: Categories of the market
+            rating: Best trader rating on the market (None if unrated)
+
+        Returns:
+            True if the market matches
+        """
+        if self.categories and not (self.categories & categories):
+            return False
+        if self.min_rating is not None and (rating is None or rating < self.min_rating):
+            return False
+        return True
+
+
+class NotificationDispatcher:
+    """
+    Renders each market once and delivers it to every matching subscriber.
+
+    Each chat has its own queue. Sends are spaced by TELEGRAM_CHAT_INTERVAL per
+    chat and capped by a global token bucket (TELEGRAM_GLOBAL_RATE messages per
+    second). When several markets are waiting for the same chat, they are sent
+    together as a single digest message.
+    """
+
+    def __init__(
+        self,
+        bot_token: str,
+        subscribers: List[Subscriber],
+        http: Optional[HttpClient] = None,
+        api_base: str = TELEGRAM_API_BASE,
+        global_rate: float = TELEGRAM_GLOBAL_RATE,
+        chat_interval: float = TELEGRAM_CHAT_INTERVAL,
+        max_message_length: int = TELEGRAM_MAX_MESSAGE_LENGTH,
+        workers: int = TELEGRAM_SEND_WORKERS,
+        max_rate_limit_retries: int = TELEGRAM_MAX_RATE_LIMIT_RETRIES,
+    ):
+        """
+        Initialize the dispatcher.
+
+        Args:
+            bot_token: Telegram bot token from @BotFather
+            subscribers: Chats to deliver to
+            http: HTTP client to send through (defaults to the shared one)
+            api_base: Telegram Bot API base URL (point at a stand-in server for testing)
+            global_rate: Messages per second across all chats
+            chat_interval: Minimum seconds between messages to the same chat
+            max_message_length: Longest message Telegram accepts
+            workers: Sends in flight at once
+            max_rate_limit_retries: Times a market is sent to a chat again
+                after a 429 before it is given up on
+        """
+        self.bot_token = bot_token
+        self.subscribers = subscribers
+        self.http = http or get_http_client()
+        self.url = f"{api_base}/bot{bot_token}/sendMessage"
+        self.global_bucket = TokenBucket(global_rate)
+        self.chat_interval = chat_interval
+        self.max_message_length = max_message_length
+        self.workers = workers
+        self.max_rate_limit_retries = max_rate_limit_retries
+
+        self.queues: Dict[str, deque] = {}
+        # Market ids queued for at least one chat by the last route(), and
+        # those since delivered to every chat they were queued for
+        self.routed: set = set()
+        self.delivered: set = set()
+        # Market id -> deliveries queued by the last route() not yet made
+        self._pending: Dict[Any, int] = {}
+        # (chat id, market id) -> 429s answered to its sends so far
+        self._rate_limited: Dict[Tuple[str, Any], int] = {}
+        self.next_send_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def route(self, df: pd.DataFrame) -> int:
+        """
+        Render every market once and queue it for each matching subscriber.
+
+        Args:
+            df: DataFrame with market analysis results (visited best score
+                first; heap-ordered lazily, so routing stops once every
+                subscriber is full without sorting the whole table)
+
+        Returns:
+            Number of (market, chat) deliveries queued
+        """
+        queued = 0
+        self.routed = set()
+        self.delivered = set()
+        self._pending = {}
+        self._rate_limited = {}
+        remaining = {s.chat_id: s.max_markets for s in self.subscribers}
+
+        if "Score" in df.columns:
+            order = iter_ranked_indices(df["Score"].tolist())
+        else:
+            order = iter(range(len(df)))
+
+        for position in order:
+            if not any(remaining.values()):
+                break
+            row = df.iloc[position]
+
+            title = str(row.get("Market Title", "Unknown"))
+            rating = row.get("Max Rating")
+            rating = int(rating) if isinstance(rating, (int, float)) and not pd.isna(rating) else None
+            categories = market_categories(title)
+            block = None
+
+            for subscriber in self.subscribers:
+                if remaining[subscriber.chat_id] <= 0:
+                    continue
+                if not subscriber.accepts(categories, rating):
+                    continue
+                if block is None:
+                    block = (row.get("Market ID"), title, format_market_body(row))
+                self.queues.setdefault(subscriber.chat_id, deque()).append(block)
+                self.routed.add(block[0])
+                self._pending[block[0]] = self._pending.get(block[0], 0) + 1
+                remaining[subscriber.chat_id] -= 1
+                queued += 1
+
+        return queued
+
+    def _take_digest(self, chat_id: str) -> Tuple[str, int]:
+        """
+        Pop as many queued markets for a chat as fit in one message.
+
+        Returns:
+            (message text, number of markets taken)
+        """
+        queue = self.queues[chat_id]
+        # Leave room for the header
+        budget = self.max_message_length - 40
+        parts = []
+        length = 0
+        while queue:
+            _, title, body = queue[0]
+            part = fit_market_part(len(parts) + 1, title, body, budget)
+            if parts and length + len(part) > budget:
+                break
+            parts.append(part)
+            length += len(part)
+            queue.popleft()
+
+        if len(parts) == 1:
+            header = "🎯 <b>POLYMARKET BET</b>\n\n"
+        else:
+            header = f"🎯 <b>{len(parts)} POLYMARKET BETS</b>\n\n"
+        return header + "".join(parts), len(parts)
+
+    def _send(self, chat_id: str, message: str) -> Tuple[bool, float]:
+        """
+        Send one message.
+
+        Returns:
+            (delivered, seconds to back off when rate limited)
+        """
+        payload = {
+            "chat_id": chat_id,
+            "text": message,
+            "parse_mode": "HTML",
+            "disable_web_page_preview": True,
+        }
+        try:
+            response = self.http.post(self.url, json=payload, timeout=10)
+            if response.status_code == 429:
+                retry_after = 1.0
+                try:
+                    retry_after = float(response.json().get("parameters", {}).get("retry_after", 1))
+                except Exception:
+                    pass
+                return False, retry_after
+            response.raise_for_status()
+            return True, 0.0
+        except Exception as e:
+            logger.error(f"Failed to send Telegram notification to {chat_id}: {e}")
+            return False, 0.0
+
+    def flush(self, timeout: Optional[float] = TELEGRAM_FLUSH_TIMEOUT) -> Dict[str, int]:
+        """
+        Deliver everything queued, respecting global and per-chat rate limits.
+
+        Args:
+            timeout: Give up on undelivered messages after this many seconds
+                (None = wait until everything is delivered or given up on)
+
+        Returns:
+            Dict mapping chat_id to number of markets delivered
+        """
+        delivered = {chat_id: 0 for chat_id in self.queues}
+        in_flight = {}
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        def send(chat_id: str, message: str, taken: int, blocks: list):
+            ok, retry_after = self._send(chat_id, message)
+            if ok:
+                get_latency_tracker().record_delivery(block[0] for block in blocks)
+            with self._lock:
+                if ok:
+                    delivered[chat_id] += taken
+                    for market_id, _, _ in blocks:
+                        if market_id in self._pending:
+                            self._pending[market_id] -= 1
+                            if not self._pending[market_id]:
+                                self.delivered.add(market_id)
+                elif retry_after:
+                    keys = [(chat_id, block[0]) for block in blocks]
+                    for key in keys:
+                        self._rate_limited[key] = self._rate_limited.get(key, 0) + 1
+                    if max(self._rate_limited[key] for key in keys) > self.max_rate_limit_retries:
+                        logger.warning(
+                            f"Giving up on {taken} markets for chat {chat_id} after "
+                            f"{self.max_rate_limit_retries} rate-limited retries"
+                        )
+                    else:
+                        # Rate limited: put the markets back and wait as told
+                        self.queues[chat_id].extendleft(reversed(blocks))
+                        self.next_send_at[chat_id] = time.monotonic() + retry_after
+            return chat_id
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            while True:
+                with self._lock:
+                    for future in [f for f in in_flight if f.done()]:
+                        del in_flight[future]
+                    busy = set(in_flight.values())
+                    waiting = [c for c, q in self.queues.items() if q and c not in busy]
+
+                if not waiting and not in_flight:
+                    break
+                if deadline is not None and time.monotonic() > deadline:
+                    logger.warning("Notification flush timed out with messages still queued")
+                    break
+
+                now = time.monotonic()
+                ready = [c for c in waiting if self.next_send_at.get(c, 0) <= now]
+                if not ready:
+                    time.sleep(0.01)
+                    continue
+
+                for chat_id in ready:
+                    wait = self.global_bucket.try_acquire()
+                    if wait:
+                        time.sleep(min(wait, 0.05))
+                        break
+                    with self._lock:
+                        blocks = list(self.queues[chat_id])
+                        message, taken = self._take_digest(chat_id)
+                        self.next_send_at[chat_id] = time.monotonic() + self.chat_interval
+                    future = executor.submit(send, chat_id, message, taken, blocks[:taken])
+                    in_flight[future] = chat_id
+
+        for chat_id, count in delivered.items():
+            logger.debug(f"Delivered {count} markets to chat {chat_id}")
+        logger.info(f"Delivered {sum(delivered.values())} markets to {len(delivered)} chats")
+        return delivered
+
+    def dispatch(self, df: pd.DataFrame, timeout: Optional[float] = TELEGRAM_FLUSH_TIMEOUT) -> Dict[str, int]:
+        """
+        Route results to subscribers and deliver them.
+
+        Args:
+            df: DataFrame with market analysis results (visited best score
+                first; heap-ordered lazily, so routing stops once every
+                subscriber is full without sorting the whole table)
+            timeout: Give up on undelivered messages after this many seconds
+                (None = wait until everything is delivered or given up on)
+
+        Returns:
+            Dict mapping chat_id to number of markets delivered
+        """
+        queued = self.route(df)
+        logger.info(f"Queued {queued} market deliveries for {len(self.subscribers)} subscribers")
+        return self.flush(timeout=timeout)
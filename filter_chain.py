@@ -0,0 +1,379 @@
+"""Composable market filter stages with adaptive ordering."""
+
+import json
+import logging
+import math
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List, Any, Iterable, Optional
+
+import numpy as np
+
+from tracing import trace_span
+
+logger = logging.getLogger(__name__)
+
+MarketData = Dict[str, Dict[str, Any]]
+
+
+class FilterStage:
+    """
+    One step of the filter chain.
+
+    A stage maps market data to market data, looking at each market on its
+    own. It declares which market fields it reads and which it writes; two
+    stages commute (can swap places without changing the output) when
+    neither writes a field the other reads or writes.
+
+    Cost per input market and pass rate are tracked as exponentially
+    weighted averages over runs.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        apply: Callable[[MarketData], MarketData],
+        reads: Iterable[str] = (),
+        writes: Iterable[str] = (),
+        smoothing: float = 0.3,
+    ):
+        """
+        Initialize a stage.
+
+        Args:
+            name: Stage name for logs
+            apply: Function filtering/transforming market data
+            reads: Market fields the stage depends on
+            writes: Market fields the stage changes
+            smoothing: Weight of the latest run in the cost/pass averages
+        """
+        self.name = name
+        self.apply = apply
+        self.reads = frozenset(reads)
+        self.writes = frozenset(writes)
+        self.smoothing = smoothing
+
+        self.cost: Optional[float] = None       # seconds per input market
+        self.pass_rate: Optional[float] = None  # fraction of markets kept
+
+    def commutes_with(self, other: "FilterStage") -> bool:
+        """True if running the two stages in either order gives the same output."""
+        return not (
+            self.writes & (other.reads | other.writes)
+            or other.writes & self.reads
+        )
+
+    def record(self, seconds: float, markets_in: int, markets_out: int):
+        """
+        Fold one run's measurements into the averages.
+
+        Args:
+            seconds: Time spent in the stage
+            markets_in: Markets passed in
+            markets_out: Markets passed on
+        """
+        if markets_in <= 0:
+            return
+        cost = seconds / markets_in
+        pass_rate = markets_out / markets_in
+        if self.cost is None:
+            self.cost, self.pass_rate = cost, pass_rate
+        else:
+            a = self.smoothing
+            self.cost = a * cost + (1 - a) * self.cost
+            self.pass_rate = a * pass_rate + (1 - a) * self.pass_rate
+
+    @property
+    def rank(self) -> float:
+        """
+        Cost per market dropped (cost / drop rate). Stages with a lower rank
+        should run first; unmeasured stages and stages that never drop
+        anything rank last.
+        """
+        if self.cost is None or self.pass_rate is None or self.pass_rate >= 1.0:
+            return math.inf
+        return self.cost / (1.0 - self.pass_rate)
+
+
+class FilterVerdicts:
+    """
+    Which stages rejected each market and each (market, outcome, trader)
+    entry in one run of a filter chain, as a columnar table.
+
+    Bit i of a mask stands for the chain's i-th declared stage, whatever
+    order the stages ran in. A market's mask has the bit of the stage that
+    dropped it (later stages never saw it, so at most one bit is set); a
+    trader entry's mask has the bits of the trader-level stages that removed
+    it, either on its own or along with its whole market. A mask of 0 means
+    kept. Trader entries are stored grouped by market,
+    so looking up a market is a dict lookup plus a slice.
+    """
+
+    def __init__(self, stage_names: List[str], market_data: MarketData, pair_field: str):
+        """
+        Enumerate the markets and trader entries of a chain's input.
+
+        Args:
+            stage_names: Stage names in declared order (one bit each)
+            market_data: Grouped market data passed to the chain
+            pair_field: Market field holding {outcome: {trader: info}}
+        """
+        self.stage_names = list(stage_names)
+        self.pair_field = pair_field
+        self.created_at = time.time()
+        self.market_ids = list(market_data)
+        self.market_titles = [data.get("market_title", "") for data in market_data.values()]
+        self.market_masks = np.zeros(len(self.market_ids), dtype=np.uint32)
+        self.row = {market_id: i for i, market_id in enumerate(self.market_ids)}
+
+        outcomes, traders, offsets = [], [], [0]
+        self._pair_row: Dict[tuple, int] = {}
+        for market_id, data in market_data.items():
+            for outcome, traders_dict in (data.get(pair_field) or {}).items():
+                for trader in traders_dict:
+                    self._pair_row[(market_id, outcome, trader)] = len(outcomes)
+                    outcomes.append(outcome)
+                    traders.append(trader)
+            offsets.append(len(outcomes))
+        self.pair_outcomes = outcomes
+        self.pair_traders = traders
+        self.pair_offsets = np.array(offsets, dtype=np.int64)
+        self.pair_masks = np.zeros(len(outcomes), dtype=np.uint32)
+
+    def record(self, bit: int, before: MarketData, after: MarketData, pairs: bool):
+        """
+        Set a stage's bit on what it dropped.
+
+        Args:
+            bit: Declared index of the stage
+            before: Market data the stage got
+            after: Market data the stage returned
+            pairs: Also diff trader entries (for stages that rewrite them);
+                every entry of a market the stage dropped counts as removed
+        """
+        flag = np.uint32(1 << bit)
+        for market_id in before.keys() - after.keys():
+            self.market_masks[self.row[market_id]] |= flag
+        if not pairs:
+            return
+        for market_id, data in before.items():
+            old = data.get(self.pair_field) or {}
+            new = (after[market_id].get(self.pair_field) or {}) if market_id in after else {}
+            if old is new:
+                continue
+            for outcome, traders_dict in old.items():
+                kept = new.get(outcome) or {}
+                for trader in traders_dict:
+                    if trader not in kept:
+                        row = self._pair_row.get((market_id, outcome, trader))
+                        if row is not None:
+                            self.pair_masks[row] |= flag
+
+    def names(self, mask: int) -> List[str]:
+        """Stage names whose bits are set in a mask."""
+        return [name for i, name in enumerate(self.stage_names) if mask & (1 << i)]
+
+    def explain(self, market_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Verdicts for one market.
+
+        Args:
+            market_id: Condition id
+
+        Returns:
+            Dict with market_id, title, kept, rejected_by and traders (list
+            of {outcome, trader, kept, rejected_by}), or None if the market
+            was not in the chain's input
+        """
+        row = self.row.get(market_id)
+        if row is None:
+            return None
+        mask = int(self.market_masks[row])
+        start, end = int(self.pair_offsets[row]), int(self.pair_offsets[row + 1])
+        traders = []
+        for i in range(start, end):
+            pair_mask = int(self.pair_masks[i])
+            traders.append({
+                "outcome": self.pair_outcomes[i],
+                "trader": self.pair_traders[i],
+                "kept": pair_mask == 0,
+                "rejected_by": self.names(pair_mask),
+            })
+        return {
+            "market_id": market_id,
+            "title": self.market_titles[row],
+            "kept": mask == 0,
+            "rejected_by": self.names(mask),
+            "traders": traders,
+        }
+
+    def counts(self) -> Dict[str, int]:
+        """Markets dropped per stage."""
+        return {
+            name: int(np.count_nonzero(self.market_masks & np.uint32(1 << i)))
+            for i, name in enumerate(self.stage_names)
+        }
+
+    def save(self, path: str):
+        """
+        Atomically write the table to a .npz file.
+
+        Args:
+            path: Output file path
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".verdicts-", suffix=".npz", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    meta=np.array(json.dumps({
+                        "stage_names": self.stage_names,
+                        "pair_field": self.pair_field,
+                        "created_at": self.created_at,
+                    })),
+                    market_ids=np.array(self.market_ids, dtype=str),
+                    market_titles=np.array(self.market_titles, dtype=str),
+                    market_masks=self.market_masks,
+                    pair_outcomes=np.array(self.pair_outcomes, dtype=str),
+                    pair_traders=np.array(self.pair_traders, dtype=str),
+                    pair_offsets=self.pair_offsets,
+                    pair_masks=self.pair_masks,
+                )
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "FilterVerdicts":
+        """
+        Read a table written by save().
+
+        Args:
+            path: File written by save()
+
+        Returns:
+            FilterVerdicts for lookups (record() is not available)
+        """
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            verdicts = cls(meta["stage_names"], {}, meta["pair_field"])
+            verdicts.created_at = meta["created_at"]
+            verdicts.market_ids = data["market_ids"].tolist()
+            verdicts.market_titles = data["market_titles"].tolist()
+            verdicts.market_masks = data["market_masks"]
+            verdicts.pair_outcomes = data["pair_outcomes"].tolist()
+            verdicts.pair_traders = data["pair_traders"].tolist()
+            verdicts.pair_offsets = data["pair_offsets"]
+            verdicts.pair_masks = data["pair_masks"]
+        verdicts.row = {market_id: i for i, market_id in enumerate(verdicts.market_ids)}
+        return verdicts
+
+
+class FilterChain:
+    """
+    Runs filter stages, reordering commuting stages by measured rank.
+
+    The declared order defines the semantics: a stage must stay after every
+    earlier-declared stage it does not commute with. Within those
+    constraints the chain repeatedly runs the ready stage with the lowest
+    rank (ties keep the declared order), so cheap, highly selective stages
+    move ahead of expensive ones and the output is unchanged.
+    """
+
+    def __init__(self, stages: List[FilterStage], adaptive: bool = True, pair_field: Optional[str] = None):
+        """
+        Initialize the chain.
+
+        Args:
+            stages: Stages in their reference order
+            adaptive: Reorder commuting stages by measured rank
+            pair_field: Market field of {outcome: {trader: info}} entries to
+                record per-trader verdicts for (None = market verdicts only)
+        """
+        self.stages = stages
+        self.adaptive = adaptive
+        self.pair_field = pair_field
+        # FilterVerdicts of the last run
+        self.verdicts: Optional[FilterVerdicts] = None
+        # Declared-order indices each stage has to wait for
+        self.depends_on: List[List[int]] = [
+            [j for j in range(i) if not stages[i].commutes_with(stages[j])]
+            for i in range(len(stages))
+        ]
+        self._last_order: Optional[List[str]] = None
+
+    def plan(self) -> List[FilterStage]:
+        """
+        Stage order for the next run.
+
+        Returns:
+            Stages in execution order
+        """
+        if not self.adaptive:
+            return list(self.stages)
+
+        done = set()
+        order = []
+        while len(order) < len(self.stages):
+            ready = [
+                i for i in range(len(self.stages))
+                if i not in done and all(j in done for j in self.depends_on[i])
+            ]
+            best = min(ready, key=lambda i: (self.stages[i].rank, i))
+            done.add(best)
+            order.append(self.stages[best])
+        return order
+
+    def run(self, market_data: MarketData) -> MarketData:
+        """
+        Run all stages over market data, measuring each one.
+
+        Args:
+            market_data: Grouped market data
+
+        Returns:
+            Filtered market data
+        """
+        order = self.plan()
+        names = [stage.name for stage in order]
+        if names != self._last_order:
+            logger.info(f"Filter order: {' -> '.join(names)}")
+            self._last_order = names
+
+        verdicts = FilterVerdicts([s.name for s in self.stages], market_data, self.pair_field)
+        bits = {id(stage): i for i, stage in enumerate(self.stages)}
+        for stage in order:
+            if not market_data:
+                break
+            started = time.perf_counter()
+            with trace_span(stage.name, "filter", markets_in=len(market_data)) as span:
+                result = stage.apply(market_data)
+                if span is not None:
+                    span["markets_out"] = len(result)
+            stage.record(time.perf_counter() - started, len(market_data), len(result))
+            verdicts.record(bits[id(stage)], market_data, result, pairs=self.pair_field in stage.writes)
+            logger.debug(f"Stage {stage.name}: {len(market_data)} -> {len(result)} markets")
+            market_data = result
+        self.verdicts = verdicts
+        return market_data
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Measured cost and pass rate per stage, in declared order.
+
+        Returns:
+            List of dicts with name, cost_us (per market), pass_rate and rank
+        """
+        return [
+            {
+                "name": stage.name,
+                "cost_us": None if stage.cost is None else stage.cost * 1e6,
+                "pass_rate": stage.pass_rate,
+                "rank": stage.rank,
+            }
+            for stage in self.stages
+        ]
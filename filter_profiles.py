@@ -0,0 +1,105 @@
+"""Named filter settings evaluated over one shared fetch and aggregation."""
+
+from typing import Dict, List, Any, Optional
+
+from config import (
+    MIN_WALLETS_PER_MARKET,
+    MAJORITY_THRESHOLD,
+    ENABLE_VOLATILITY_FILTER,
+    MAX_OUTCOME_PRICE_SPREAD,
+    MIN_PRICES_FOR_VOLATILITY_CHECK,
+    MAX_OUTCOME_PRICE_STDDEV,
+    MAX_MARKET_AGE_HOURS,
+    FILTER_PROFILES,
+)
+
+
+class FilterProfile:
+    """
+    One set of filter thresholds plus where its results go.
+
+    Profiles only change the filter stage, so any number of them can be run
+    over the same grouped market data.
+    """
+
+    SETTINGS = (
+        "keywords",
+        "min_wallets",
+        "majority_threshold",
+        "volatility_filter",
+        "max_price_spread",
+        "min_prices_for_volatility",
+        "max_price_stddev",
+        "max_market_age_hours",
+        "csv",
+        "telegram_chat_id",
+    )
+
+    def __init__(
+        self,
+        name: str = "default",
+        keywords: Optional[List[str]] = None,
+        min_wallets: int = MIN_WALLETS_PER_MARKET,
+        majority_threshold: float = MAJORITY_THRESHOLD,
+        volatility_filter: bool = ENABLE_VOLATILITY_FILTER,
+        max_price_spread: float = MAX_OUTCOME_PRICE_SPREAD,
+        min_prices_for_volatility: int = MIN_PRICES_FOR_VOLATILITY_CHECK,
+        max_price_stddev: Optional[float] = MAX_OUTCOME_PRICE_STDDEV,
+        max_market_age_hours: Optional[float] = MAX_MARKET_AGE_HOURS,
+        csv: Optional[str] = None,
+        telegram_chat_id: Optional[str] = None,
+    ):
+        """
+        Initialize a profile.
+
+        Args:
+            name: Profile name (used in logs, file names and server paths)
+            keywords: Only markets whose title contains one of these (case-insensitive)
+            min_wallets: Minimum wallets per market
+            majority_threshold: Minimum share of traders on the leading outcome
+            volatility_filter: Apply the entry-price spread filter
+            max_price_spread: Maximum entry-price spread on an outcome
+            min_prices_for_volatility: Prices an outcome needs before it is checked
+            max_price_stddev: Optional cap on entry-price standard deviation
+            max_market_age_hours: Maximum hours since a market's last trade (None = any)
+            csv: CSV file for this profile's results (default: <name>.csv)
+            telegram_chat_id: Chat to notify with this profile's top markets
+        """
+        self.name = name
+        self.keywords = [k.lower() for k in (keywords or [])]
+        self.min_wallets = min_wallets
+        self.majority_threshold = majority_threshold
+        self.volatility_filter = volatility_filter
+        self.max_price_spread = max_price_spread
+        self.min_prices_for_volatility = min_prices_for_volatility
+        self.max_price_stddev = max_price_stddev
+        self.max_market_age_hours = max_market_age_hours
+        self.csv = csv or f"{name}.csv"
+        self.telegram_chat_id = telegram_chat_id
+
+    @classmethod
+    def from_config(cls, name: str, settings: Dict[str, Any]) -> "FilterProfile":
+        """
+        Build a profile from a FILTER_PROFILES entry.
+
+        Raises:
+            ValueError: If the entry has unknown settings
+        """
+        unknown = set(settings) - set(cls.SETTINGS)
+        if unknown:
+            raise ValueError(f"Unknown settings in filter profile {name!r}: {', '.join(sorted(unknown))}")
+        return cls(name=name, **settings)
+
+
+def load_profiles(entries: Optional[Dict[str, Dict[str, Any]]] = None) -> List[FilterProfile]:
+    """
+    Build the configured filter profiles.
+
+    Args:
+        entries: Dict mapping profile name to settings (defaults to FILTER_PROFILES)
+
+    Returns:
+        List of profiles in configuration order
+    """
+    entries = FILTER_PROFILES if entries is None else entries
+    return [FilterProfile.from_config(name, settings or {}) for name, settings in entries.items()]
@@ -0,0 +1,404 @@
+"""Shared pooled HTTP client for all outbound requests."""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_TIMEOUT,
+    HTTP_MAX_CONCURRENCY_PER_HOST,
+    HTTP_HOST_CONCURRENCY,
+    HTTP_URL_REWRITES,
+    HTTP_METRICS_WINDOW_SECONDS,
+    HTTP_METRICS_MAX_SAMPLES,
+    HTTP_LATENCY_BUCKETS,
+    HTTP_SIZE_BUCKETS,
+    HTTP_HEDGE_PERCENTILE,
+    HTTP_HEDGE_MIN_SAMPLES,
+    HTTP_HEDGE_DEFAULT_DELAY,
+    HTTP_HEDGE_MIN_DELAY,
+    HTTP_HEDGE_WORKERS,
+)
+from latency import PERCENTILES, RollingHistogram
+from tracing import trace_span
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def endpoint_class(url: str) -> str:
+    """
+    Endpoint a URL belongs to, for metrics: host plus first path segment
+    (data-api.polymarket.com/trades, polymarket.com/market). Telegram Bot API
+    paths are reduced to the method so the bot token is never recorded.
+
+    Args:
+        url: Absolute URL
+    """
+    parts = urlsplit(url)
+    segments = [segment for segment in parts.path.split("/") if segment]
+    if len(segments) > 1 and segments[0].startswith("bot"):
+        return f"{parts.netloc}/{segments[-1]}"
+    return f"{parts.netloc}/{segments[0]}" if segments else parts.netloc
+
+
+class HttpClient:
+    """
+    Keep-alive HTTP client shared by the API, processor and notifier.
+
+    One requests.Session holds a connection pool per host, so repeated calls
+    to the same host reuse the TCP/TLS connection. A semaphore per host caps
+    the number of requests in flight, and per-host counters record what was
+    sent. Per endpoint class, status codes are counted and latency and
+    response size go into rolling histograms.
+
+    GETs made with hedge=True get a duplicate request once they have taken
+    longer than the endpoint's HTTP_HEDGE_PERCENTILE latency; the first
+    response wins and the other is discarded.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = HTTP_POOL_CONNECTIONS,
+        pool_maxsize: int = HTTP_POOL_MAXSIZE,
+        timeout: float = HTTP_TIMEOUT,
+        max_concurrency_per_host: int = HTTP_MAX_CONCURRENCY_PER_HOST,
+        host_concurrency: Optional[Dict[str, int]] = None,
+        url_rewrites: Optional[Dict[str, str]] = None,
+        hedge_percentile: Optional[float] = HTTP_HEDGE_PERCENTILE,
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            pool_connections: Number of per-host pools to keep
+            pool_maxsize: Connections kept alive per host
+            timeout: Default timeout in seconds when a call doesn't pass one
+            max_concurrency_per_host: Requests in flight per host
+            host_concurrency: Per-host overrides of max_concurrency_per_host
+            url_rewrites: URL prefix -> replacement prefix, applied before
+                sending (limits and counters stay keyed by the original host)
+            hedge_percentile: Endpoint latency percentile after which hedged
+                GETs send a duplicate (None = never hedge)
+        """
+        self.timeout = timeout
+        self.max_concurrency_per_host = max_concurrency_per_host
+        self.host_concurrency = dict(HTTP_HOST_CONCURRENCY if host_concurrency is None else host_concurrency)
+        self.url_rewrites = dict(HTTP_URL_REWRITES if url_rewrites is None else url_rewrites)
+        self.hedge_percentile = hedge_percentile
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self.stats = defaultdict(lambda: {"requests": 0, "errors": 0, "bytes": 0, "seconds": 0.0})
+        self.endpoints = defaultdict(lambda: {
+            "statuses": defaultdict(int),
+            "latency": RollingHistogram(HTTP_METRICS_WINDOW_SECONDS, HTTP_METRICS_MAX_SAMPLES, HTTP_LATENCY_BUCKETS),
+            "size": RollingHistogram(HTTP_METRICS_WINDOW_SECONDS, HTTP_METRICS_MAX_SAMPLES, HTTP_SIZE_BUCKETS),
+            "hedged": 0,
+            "hedge_wins": 0,
+        })
+        # endpoint -> (computed_at, hedge delay), recomputed every few seconds
+        self._hedge_delays: Dict[str, Tuple[float, float]] = {}
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+
+    def _host_semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._host_limits.get(host)
+            if semaphore is None:
+                limit = self.host_concurrency.get(host, self.max_concurrency_per_host)
+                semaphore = self._host_limits[host] = threading.BoundedSemaphore(max(1, limit))
+        return semaphore
+
+    def _record(self, host: str, endpoint: str, status, elapsed: float, nbytes: int = 0, error: bool = False):
+        with self._lock:
+            stats = self.stats[host]
+            stats["requests"] += 1
+            stats["seconds"] += elapsed
+            stats["bytes"] += nbytes
+            if error:
+                stats["errors"] += 1
+            histograms = self.endpoints[endpoint]
+            histograms["statuses"][str(status)] += 1
+            histograms["latency"].add(elapsed)
+            histograms["size"].add(nbytes)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request through the shared session.
+
+        A streamed response (stream=True) keeps its host's concurrency slot
+        until it is closed, so reading the body counts towards the limit;
+        use it as a context manager or close() it.
+
+        Args:
+            method: HTTP method
+            url: Absolute URL
+            **kwargs: Passed on to requests.Session.request
+
+        Returns:
+            requests.Response (raises requests exceptions like requests does)
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).netloc
+        endpoint = endpoint_class(url)
+        for prefix, replacement in self.url_rewrites.items():
+            if url.startswith(prefix):
+                url = replacement + url[len(prefix):]
+                break
+
+        semaphore = self._host_semaphore(host)
+        semaphore.acquire()
+        try:
+            with trace_span(f"{method} {endpoint}", "http") as span:
+                start = time.monotonic()
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except requests.exceptions.RequestException as e:
+                    self._record(host, endpoint, type(e).__name__, time.monotonic() - start, error=True)
+                    raise
+
+                if kwargs.get("stream"):
+                    # Body not read yet; fall back to the advertised length
+                    nbytes = int(response.headers.get("Content-Length", 0) or 0)
+                else:
+                    nbytes = len(response.content)
+                self._record(host, endpoint, response.status_code, time.monotonic() - start, nbytes,
+                             error=response.status_code >= 400)
+                if span is not None:
+                    span.update(status=response.status_code, bytes=nbytes)
+        except BaseException:
+            semaphore.release()
+            raise
+
+        if kwargs.get("stream"):
+            _release_on_close(response, semaphore)
+        else:
+            semaphore.release()
+        return response
+
+    def get(self, url: str, hedge: bool = False, **kwargs) -> requests.Response:
+        """
+        GET a URL (see request).
+
+        Args:
+            url: Absolute URL
+            hedge: Send a duplicate if the response is slower than the
+                endpoint's HTTP_HEDGE_PERCENTILE latency (idempotent calls only)
+        """
+        if hedge and self.hedge_percentile is not None:
+            return self._hedged_get(url, **kwargs)
+        return self.request("GET", url, **kwargs)
+
+    def hedge_delay(self, endpoint: str) -> float:
+        """
+        Seconds a hedged GET to an endpoint waits before sending its duplicate.
+
+        Args:
+            endpoint: Endpoint class (see endpoint_class)
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._hedge_delays.get(endpoint)
+            if cached is not None and now - cached[0] < 5.0:
+                return cached[1]
+            histograms = self.endpoints.get(endpoint)
+            values = histograms["latency"].values() if histograms else []
+            if len(values) < HTTP_HEDGE_MIN_SAMPLES:
+                return HTTP_HEDGE_DEFAULT_DELAY
+            delay = max(HTTP_HEDGE_MIN_DELAY, RollingHistogram.percentile(values, self.hedge_percentile))
+            self._hedge_delays[endpoint] = (now, delay)
+            return delay
+
+    def _hedged_get(self, url: str, **kwargs) -> requests.Response:
+        endpoint = endpoint_class(url)
+        delay = self.hedge_delay(endpoint)
+        with self._lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=HTTP_HEDGE_WORKERS, thread_name_prefix="http-hedge")
+            executor = self._hedge_executor
+
+        primary = executor.submit(self.request, "GET", url, **kwargs)
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeout:
+            pass
+
+        hedge = executor.submit(self.request, "GET", url, **kwargs)
+        with self._lock:
+            self.endpoints[endpoint]["hedged"] += 1
+        logger.debug(f"Hedging {endpoint} request after {delay:.2f}s")
+
+        # First successful response wins; an error only counts if both fail
+        done, _ = wait([primary, hedge], return_when=FIRST_COMPLETED)
+        winner = primary if primary in done else hedge
+        if winner.exception() is not None:
+            other = hedge if winner is primary else primary
+            wait([other])
+            if other.exception() is None:
+                winner = other
+        loser = hedge if winner is primary else primary
+        loser.add_done_callback(_close_response)
+        if winner is hedge:
+            with self._lock:
+                self.endpoints[endpoint]["hedge_wins"] += 1
+        return winner.result()
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def snapshot_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Copy of the per-host counters."""
+        with self._lock:
+            return {host: dict(stats) for host, stats in self.stats.items()}
+
+    def snapshot_endpoints(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-endpoint metrics over the current window.
+
+        Returns:
+            Dict mapping endpoint class to {statuses: {status: count},
+            latency: histogram summary, size: histogram summary} (see
+            RollingHistogram.snapshot)
+        """
+        with self._lock:
+            return {
+                endpoint: {
+                    "statuses": dict(histograms["statuses"]),
+                    "latency": histograms["latency"].snapshot(),
+                    "size": histograms["size"].snapshot(),
+                    "hedged": histograms["hedged"],
+                    "hedge_wins": histograms["hedge_wins"],
+                }
+                for endpoint, histograms in self.endpoints.items()
+            }
+
+    def log_summary(self):
+        """
+        Log one line per host with request counts, errors, bytes and mean
+        latency, then one per endpoint with latency percentiles and statuses.
+        """
+        for host, stats in sorted(self.snapshot_stats().items()):
+            mean_ms = 1000 * stats["seconds"] / stats["requests"] if stats["requests"] else 0
+            logger.info(
+                f"HTTP {host}: {stats['requests']} requests, {stats['errors']} errors, "
+                f"{stats['bytes'] / 1024:.0f} KB, {mean_ms:.0f} ms avg"
+            )
+        for endpoint, metrics in sorted(self.snapshot_endpoints().items()):
+            latency = metrics["latency"]
+            if not latency["count"]:
+                continue
+            percentiles = ", ".join(f"p{q} {1000 * latency[f'p{q}']:.0f}ms" for q in PERCENTILES)
+            statuses = ", ".join(f"{status}: {count}" for status, count in sorted(metrics["statuses"].items()))
+            hedged = f", {metrics['hedged']} hedged ({metrics['hedge_wins']} won)" if metrics["hedged"] else ""
+            logger.info(
+                f"HTTP {endpoint}: {latency['count']} requests, {percentiles}, "
+                f"max {1000 * latency['max']:.0f}ms, {metrics['size']['mean'] / 1024:.1f} KB avg "
+                f"({statuses}){hedged}"
+            )
+
+    def to_prometheus(self) -> str:
+        """
+        Per-endpoint latency and response size histograms and status counts
+        in Prometheus text exposition format. Histograms are exported from
+        the lifetime totals, so they only ever go up.
+        """
+        lines = [
+            "# HELP polymarket_http_request_seconds Outbound request latency by endpoint",
+            "# TYPE polymarket_http_request_seconds histogram",
+        ]
+        size_lines = [
+            "# HELP polymarket_http_response_bytes Outbound response size by endpoint",
+            "# TYPE polymarket_http_response_bytes histogram",
+        ]
+        status_lines = [
+            "# HELP polymarket_http_responses_total Outbound responses by endpoint and status",
+            "# TYPE polymarket_http_responses_total counter",
+        ]
+        hedge_lines = [
+            "# HELP polymarket_http_hedged_total Hedged duplicate requests by endpoint and winner",
+            "# TYPE polymarket_http_hedged_total counter",
+        ]
+        for endpoint, metrics in sorted(self.snapshot_endpoints().items()):
+            label = f'endpoint="{endpoint}"'
+            for name, summary, target in (
+                ("polymarket_http_request_seconds", metrics["latency"], lines),
+                ("polymarket_http_response_bytes", metrics["size"], size_lines),
+            ):
+                for bound, count in summary["total_buckets"].items():
+                    target.append(f'{name}_bucket{{{label},le="{bound:g}"}} {count}')
+                target.append(f'{name}_bucket{{{label},le="+Inf"}} {summary["total_count"]}')
+                target.append(f"{name}_count{{{label}}} {summary['total_count']}")
+                target.append(f"{name}_sum{{{label}}} {summary['total_sum']:.3f}")
+            for status, count in sorted(metrics["statuses"].items()):
+                status_lines.append(f'polymarket_http_responses_total{{{label},status="{status}"}} {count}')
+            if metrics["hedged"]:
+                hedge_wins = metrics["hedge_wins"]
+                hedge_lines.append(f'polymarket_http_hedged_total{{{label},winner="hedge"}} {hedge_wins}')
+                hedge_lines.append(
+                    f'polymarket_http_hedged_total{{{label},winner="primary"}} {metrics["hedged"] - hedge_wins}'
+                )
+        return "\n".join(lines + size_lines + status_lines + hedge_lines) + "\n"
+
+    def close(self):
+        """Close the session and its pooled connections."""
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+            self._hedge_executor = None
+        self.session.close()
+
+
+def _release_on_close(response: requests.Response, semaphore: threading.BoundedSemaphore):
+    """Release a host slot when a streamed response is closed (once)."""
+    close = response.close
+    once = threading.Lock()
+
+    def close_and_release():
+        try:
+            close()
+        finally:
+            if once.acquire(blocking=False):
+                semaphore.release()
+
+    response.close = close_and_release
+
+
+def _close_response(future):
+    """Release the connection of a discarded hedged response."""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+_shared_client: Optional[HttpClient] = None
+_shared_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Return the process-wide shared HttpClient, creating it on first use."""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = HttpClient()
+        return _shared_client
+
+
+def close_http_client():
+    """Close the shared HttpClient (a new one is created on next use)."""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is not None:
+            _shared_client.close()
+            _shared_client = None
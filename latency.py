@@ -0,0 +1,252 @@
+"""Detection latency from a tracked wallet's trade to our alert."""
+
+import bisect
+import itertools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+from config import LATENCY_WINDOW_SECONDS, LATENCY_MAX_SAMPLES, LATENCY_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+# Latency stages, in pipeline order
+STAGES = ("trade_to_fetch", "fetch_to_decision", "decision_to_delivery", "trade_to_delivery")
+PERCENTILES = (50, 90, 99)
+
+
+class RollingHistogram:
+    """
+    Latency samples from the last `window_seconds`, with percentiles and
+    cumulative bucket counts over whatever is currently in the window.
+
+    Lifetime count, sum and bucket counts are kept alongside; unlike the
+    window they never go down, so they are what Prometheus histograms
+    (counters) are exported from.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = LATENCY_WINDOW_SECONDS,
+        max_samples: int = LATENCY_MAX_SAMPLES,
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ):
+        """
+        Initialize the histogram.
+
+        Args:
+            window_seconds: Age after which samples drop out
+            max_samples: Most samples kept (oldest dropped first)
+            buckets: Upper bounds in seconds for the bucket counts
+        """
+        self.window_seconds = window_seconds
+        self.buckets = sorted(buckets)
+        self.samples: deque = deque(maxlen=max_samples)  # (recorded_at, seconds)
+        self.total_count = 0
+        self.total_sum = 0.0
+        # Lifetime samples per bucket (non-cumulative; above the last bound: none)
+        self.total_buckets = [0] * len(self.buckets)
+
+    def add(self, seconds: float, now: Optional[float] = None):
+        """Record one latency in seconds."""
+        self.samples.append((time.time() if now is None else now, seconds))
+        self.total_count += 1
+        self.total_sum += seconds
+        index = bisect.bisect_left(self.buckets, seconds)
+        if index < len(self.buckets):
+            self.total_buckets[index] += 1
+
+    def values(self, now: Optional[float] = None) -> List[float]:
+        """Sorted latencies still inside the window."""
+        cutoff = (time.time() if now is None else now) - self.window_seconds
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+        return sorted(seconds for _, seconds in self.samples)
+
+    @staticmethod
+    def percentile(values: List[float], q: float) -> Optional[float]:
+        """Nearest-rank percentile of sorted values (None if empty)."""
+        if not values:
+            return None
+        rank = max(1, min(len(values), int(-(-q * len(values) // 100))))
+        return values[rank - 1]
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Summary of the current window.
+
+        Returns:
+            Dict with count, mean, p50/p90/p99, max, cumulative bucket counts
+            ({upper bound: count <= bound}) of the window, and lifetime
+            total_count, total_sum and total_buckets (cumulative as well)
+        """
+        values = self.values(now)
+        summary = {
+            "count": len(values),
+            "mean": sum(values) / len(values) if values else None,
+            "max": values[-1] if values else None,
+            "buckets": {bound: bisect.bisect_right(values, bound) for bound in self.buckets},
+            "total_count": self.total_count,
+            "total_sum": self.total_sum,
+            "total_buckets": dict(zip(self.buckets, itertools.accumulate(self.total_buckets))),
+        }
+        for q in PERCENTILES:
+            summary[f"p{q}"] = self.percentile(values, q)
+        return summary
+
+
+class LatencyTracker:
+    """
+    Records, for every newly published signal, how long it took from the
+    trade that triggered it to the fetch that saw it, to the decision to
+    publish it and to its delivery.
+
+    A signal is identified by its market and latest trade timestamp, so a
+    market re-published every cycle is only measured once per new trade.
+    """
+
+    def __init__(self, max_pending: int = 10000):
+        """
+        Initialize the tracker.
+
+        Args:
+            max_pending: Most decided-but-undelivered signals remembered
+        """
+        self.histograms: Dict[str, RollingHistogram] = {stage: RollingHistogram() for stage in STAGES}
+        self.max_pending = max_pending
+        # market_id -> latest trade timestamp already measured
+        self.decided: Dict[str, float] = {}
+        # market_id -> (trade_ts, decided_at) awaiting delivery
+        self.pending: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def record_decisions(self, markets: Iterable[Dict[str, Any]], decided_at: Optional[float] = None) -> int:
+        """
+        Record trade-to-fetch and fetch-to-decision for newly published signals.
+
+        Args:
+            markets: Filtered market data entries (market_id, latest_timestamp,
+                latest_fetched_at)
+            decided_at: When the results were decided (defaults to now)
+
+        Returns:
+            Number of new signals recorded
+        """
+        decided_at = time.time() if decided_at is None else decided_at
+        recorded = 0
+        with self._lock:
+            for data in markets:
+                market_id = data.get("market_id")
+                trade_ts = data.get("latest_timestamp") or 0
+                fetched_at = data.get("latest_fetched_at") or 0
+                if not market_id or not trade_ts or self.decided.get(market_id) == trade_ts:
+                    continue
+                self.decided[market_id] = trade_ts
+                if fetched_at:
+                    self.histograms["trade_to_fetch"].add(max(0.0, fetched_at - trade_ts), decided_at)
+                    self.histograms["fetch_to_decision"].add(max(0.0, decided_at - fetched_at), decided_at)
+                self.pending[market_id] = (trade_ts, decided_at)
+                recorded += 1
+
+            while len(self.pending) > self.max_pending:
+                self.pending.pop(next(iter(self.pending)))
+        return recorded
+
+    def record_delivery(self, market_ids: Iterable[str], delivered_at: Optional[float] = None):
+        """
+        Record decision-to-delivery for signals that were just sent.
+
+        Only the first delivery of a signal counts.
+
+        Args:
+            market_ids: Markets included in a delivered message
+            delivered_at: When the message was accepted (defaults to now)
+        """
+        delivered_at = time.time() if delivered_at is None else delivered_at
+        with self._lock:
+            for market_id in market_ids:
+                pending = self.pending.pop(market_id, None)
+                if pending is None:
+                    continue
+                trade_ts, decided_at = pending
+                self.histograms["decision_to_delivery"].add(max(0.0, delivered_at - decided_at), delivered_at)
+                self.histograms["trade_to_delivery"].add(max(0.0, delivered_at - trade_ts), delivered_at)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage histogram summaries."""
+        with self._lock:
+            return {stage: histogram.snapshot() for stage, histogram in self.histograms.items()}
+
+    def log_summary(self):
+        """Log one line per stage with count and percentiles."""
+        for stage, summary in self.snapshot().items():
+            if not summary["count"]:
+                continue
+            percentiles = ", ".join(f"p{q} {summary[f'p{q}']:.2f}s" for q in PERCENTILES)
+            logger.info(f"Latency {stage}: {summary['count']} signals, {percentiles}, max {summary['max']:.2f}s")
+
+    def to_prometheus(self) -> str:
+        """
+        Prometheus text exposition format: a histogram of every signal since
+        start (cumulative, as Prometheus expects) plus the current window's
+        percentiles as gauges, per stage.
+        """
+        lines = [
+            "# HELP polymarket_signal_latency_seconds Latency from trade to alert by stage",
+            "# TYPE polymarket_signal_latency_seconds histogram",
+        ]
+        quantile_lines = [
+            "# HELP polymarket_signal_latency_quantile_seconds Latency percentiles by stage over the recent window",
+            "# TYPE polymarket_signal_latency_quantile_seconds gauge",
+        ]
+        for stage, summary in self.snapshot().items():
+            label = f'stage="{stage}"'
+            for bound, count in summary["total_buckets"].items():
+                lines.append(f'polymarket_signal_latency_seconds_bucket{{{label},le="{bound:g}"}} {count}')
+            lines.append(f'polymarket_signal_latency_seconds_bucket{{{label},le="+Inf"}} {summary["total_count"]}')
+            lines.append(f"polymarket_signal_latency_seconds_count{{{label}}} {summary['total_count']}")
+            lines.append(f"polymarket_signal_latency_seconds_sum{{{label}}} {summary['total_sum']:.3f}")
+            for q in PERCENTILES:
+                value = summary[f"p{q}"]
+                if value is not None:
+                    quantile_lines.append(
+                        f'polymarket_signal_latency_quantile_seconds{{{label},quantile="0.{q:02d}"}} {value:.3f}'
+                    )
+        return "\n".join(lines + quantile_lines) + "\n"
+
+    def export_json(self, path: str):
+        """
+        Atomically write the per-stage summaries to a JSON file.
+
+        Args:
+            path: Output file path
+        """
+        document = {"generated_at": time.time(), "stages": self.snapshot()}
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".latency-", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(document, f, indent=2)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+
+_shared_tracker: Optional[LatencyTracker] = None
+_shared_lock = threading.Lock()
+
+
+def get_latency_tracker() -> LatencyTracker:
+    """Return the process-wide LatencyTracker, creating it on first use."""
+    global _shared_tracker
+    with _shared_lock:
+        if _shared_tracker is None:
+            _shared_tracker = LatencyTracker()
+        return _shared_tracker
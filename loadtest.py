@@ -0,0 +1,170 @@
+"""End-to-end load test: run main() against the local mock server."""
+
+import argparse
+import contextlib
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, List, Any, Optional
+
+from http_client import get_http_client
+from latency import PERCENTILES, RollingHistogram
+from mock_server import MockPolymarketServer, mock_wallets
+import main as analyzer_main
+
+logger = logging.getLogger(__name__)
+
+
+def peak_memory_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if peak > 1 << 32 else peak / 1024
+
+
+def run_load_test(
+    server: MockPolymarketServer,
+    wallet_count: int,
+    cycles: int,
+    main_args: Optional[List[str]] = None,
+    quiet: bool = True,
+) -> Dict[str, Any]:
+    """
+    Run one-shot main() `cycles` times against a started mock server.
+
+    All outbound HTTP of the shared client is rewritten to the mock first,
+    and checked to actually arrive there before anything runs.
+
+    Args:
+        server: Started MockPolymarketServer
+        wallet_count: Number of wallets to track (synthetic, or the first
+            ones in the recording)
+        cycles: Number of main() runs
+        main_args: Extra command line options for main()
+        quiet: Discard what main() prints (the results tables)
+
+    Returns:
+        Report dict: cycles, wallets, cycle time percentiles, requests and
+        trades served per second, errors/429s served and peak memory
+    """
+    http = get_http_client()
+    http.url_rewrites.update(server.url_rewrites())
+    before = server.snapshot_stats().get("trades", {}).get("requests", 0)
+    http.get("https://data-api.polymarket.com/trades", params={"user": "0xprobe", "limit": 1})
+    if server.snapshot_stats().get("trades", {}).get("requests", 0) <= before:
+        raise RuntimeError("Outbound requests are not reaching the mock server, aborting")
+
+    wallets = server.recorded_wallets()[:wallet_count] if server.recorded else mock_wallets(wallet_count)
+    cycle_times = []
+    started = time.perf_counter()
+    for cycle in range(cycles):
+        cycle_started = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                if quiet:
+                    stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+                analyzer_main.main(list(main_args or []), wallets=wallets)
+        except SystemExit as e:
+            logger.error(f"Cycle {cycle + 1} failed (exit {e.code})")
+        cycle_times.append(time.perf_counter() - cycle_started)
+        logger.warning(f"Cycle {cycle + 1}/{cycles}: {cycle_times[-1]:.2f}s")
+    elapsed = time.perf_counter() - started
+
+    stats = server.snapshot_stats()
+    requests = sum(s["requests"] for s in stats.values())
+    ordered = sorted(cycle_times)
+    report = {
+        "cycles": cycles,
+        "wallets": len(wallets),
+        "elapsed_seconds": elapsed,
+        "requests_per_second": requests / elapsed if elapsed else 0.0,
+        "trades_per_second": server.trades_served / elapsed if elapsed else 0.0,
+        "requests": requests,
+        "errors_served": sum(s["errors"] for s in stats.values()),
+        "rate_limited_served": sum(s["rate_limited"] for s in stats.values()),
+        "telegram_messages": len(server.messages),
+        "peak_memory_mb": peak_memory_mb(),
+        "endpoints": stats,
+    }
+    for q in PERCENTILES:
+        report[f"cycle_p{q}_seconds"] = RollingHistogram.percentile(ordered, q)
+    return report
+
+
+def print_report(report: Dict[str, Any]):
+    """Print a load test report."""
+    print("\n" + "=" * 70)
+    print(f"LOAD TEST: {report['wallets']} wallets x {report['cycles']} cycles "
+          f"in {report['elapsed_seconds']:.1f}s")
+    print("=" * 70)
+    percentiles = ", ".join(f"p{q} {report[f'cycle_p{q}_seconds']:.2f}s" for q in PERCENTILES)
+    print(f"Cycle time:   {percentiles}")
+    print(f"Throughput:   {report['requests_per_second']:.1f} requests/s, "
+          f"{report['trades_per_second']:.0f} trades/s")
+    print(f"Failures:     {report['errors_served']} errors, {report['rate_limited_served']} 429s served")
+    print(f"Telegram:     {report['telegram_messages']} messages")
+    if report["peak_memory_mb"] is not None:
+        print(f"Peak memory:  {report['peak_memory_mb']:.1f} MB")
+    for endpoint, stats in sorted(report["endpoints"].items()):
+        print(f"  {endpoint:<14} {stats['requests']:>7} requests {stats['bytes'] / 1e6:>9.1f} MB")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Load test the analyzer against a local mock server")
+    parser.add_argument("--wallets", type=int, default=2000, help="Number of synthetic wallets")
+    parser.add_argument("--cycles", type=int, default=5, help="Number of main() runs")
+    parser.add_argument("--trades-per-wallet", type=int, default=100, help="Synthetic history per wallet")
+    parser.add_argument("--markets", type=int, default=100, help="Number of synthetic markets")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.01, help="Extra random delay of up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of 500 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of 429 responses")
+    parser.add_argument("--payload-bytes", type=int, default=0, help="Filler bytes per trade")
+    parser.add_argument("--recorded", default=None, metavar="JSONL", help="Serve recorded trades instead")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for data and injected failures")
+    parser.add_argument("--verbose", action="store_true", help="Keep the analyzer's INFO logging and output")
+    parser.add_argument("main_args", nargs=argparse.REMAINDER,
+                        help="Options passed to main.py after --, e.g. -- --profile")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Start the mock server, run the load test and print the report."""
+    args = parse_args(argv)
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    server = MockPolymarketServer(
+        trades_per_wallet=args.trades_per_wallet,
+        markets=args.markets,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        payload_bytes=args.payload_bytes,
+        recorded_path=args.recorded,
+        seed=args.seed,
+    )
+    server.start()
+    main_args = [a for a in args.main_args if a != "--"]
+    # CSV, checkpoint and metrics files go to a scratch directory
+    workdir = tempfile.mkdtemp(prefix="polymarket-loadtest-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        report = run_load_test(server, args.wallets, args.cycles, main_args, quiet=not args.verbose)
+    finally:
+        os.chdir(cwd)
+        server.stop()
+    print_report(report)
+    print(f"Run output left in {workdir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,38 @@
 """Main entry point for Polymarket analysis."""
 
+import argparse
+import os
 import sys
+import time
+from typing import Dict, List, Optional, Tuple
 import pandas as pd
 from config import (
-    TRACKED_WALLETS, OUTPUT_CSV, MIN_WALLETS_PER_MARKET, TRADER_RATINGS,
-    TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, ENABLE_TELEGRAM_NOTIFICATIONS
+    TRACKED_WALLETS, OUTPUT_CSV, MIN_WALLETS_PER_MARKET,
+    TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, ENABLE_TELEGRAM_NOTIFICATIONS,
+    TELEGRAM_SUBSCRIBERS, SERVER_HOST, SERVER_PORT, POLL_INTERVAL_SECONDS,
+    CHECKPOINT_PATH, CHECKPOINT_INTERVAL_SECONDS, CHECKPOINT_MAX_AGE_SECONDS,
+    CONSOLE_TOP_N, SWEEP_GRID, SWEEP_CSV, LATENCY_METRICS_PATH, TRADE_STREAM_URL,
+    FILTER_VERDICTS_PATH,
 )
 from api import PolymarketAPI
 from processor import TradeProcessor
 from analyzer import PolymarketAnalyzer
 from notifier import TelegramNotifier
+from dispatcher import NotificationDispatcher, Subscriber
+from http_client import get_http_client
+from cache import get_shared_cache
+from server import ResultsServer
+from profiling import RunProfiler, profile_phase
+from scoring import top_markets
+from filter_profiles import load_profiles
+from filter_chain import FilterVerdicts
+from sweep import sweep_thresholds, SWEEP_PARAMETERS
+from latency import get_latency_tracker
+from ratings import get_trader_rating
+from streaming import StreamingIngest, streaming_available
+from scheduler import AdaptivePoller
+from watch import MarketWatcher, format_events
+from tracing import trace_span, traced_run
 import logging
 
 logging.basicConfig(
@@ -19,8 +42,459 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def main():
-    """Main execution function."""
+def report_results(analyzer: PolymarketAnalyzer, results_df: pd.DataFrame, only_changed: bool = False):
+    """
+    Print the trader summary and market table, export CSV and send notifications.
+    
+    Args:
+        analyzer: Analyzer that produced the results
+        results_df: DataFrame returned by analyzer.analyze
+        only_changed: Only notify markets that are new or changed since
+            they were last sent (--serve)
+    """
+    # Display results
+    if len(results_df) > 0:
+        logger.info("\nResults:")
+        
+        # Show trader summary if available
+        trader_stats = analyzer.processor.trader_stats
+        if trader_stats:
+            trader_results = []
+            for trader_name, stats in sorted(trader_stats.items(), key=lambda x: x[1]["total_size"], reverse=True):
+                rating = get_trader_rating(trader_name, "-")
+                rating_str = f"{rating}/10" if isinstance(rating, int) else rating
+                trader_results.append({
+                    "Trader": trader_name,
+                    "Rating": rating_str,
+                    "Bets": stats["trades"],
+                    "Avg Entry Price": f"${stats['avg_price']:.3f}",
+                    "Total Size": f"${stats['total_size']:.2f}",
+                })
+            trader_df = pd.DataFrame(trader_results)
+            print("\n" + "=" * 100)
+            print("TRADER SUMMARY")
+            print("=" * 100)
+            print(trader_df.to_string(index=False))
+        
+        # Show markets, best score first (hide Market ID and Latest Trade
+        # timestamp in console output)
+        print("\n" + "=" * 100)
+        print("MARKETS")
+        print("=" * 100)
+        printable_df = top_markets(results_df, CONSOLE_TOP_N)
+        columns_to_drop = []
+        if "Market ID" in printable_df.columns:
+            columns_to_drop.append("Market ID")
+        if "Latest Trade" in printable_df.columns:
+            columns_to_drop.append("Latest Trade")
+        if columns_to_drop:
+            printable_df = printable_df.drop(columns=columns_to_drop)
+
+        # Build rows and split outcomes into left/right for alignment
+        rows = printable_df.to_dict(orient="records")
+        parsed = []
+        for r in rows:
+            title = str(r.get("Market Title", ""))
+            outcomes = str(r.get("Outcomes", ""))
+            if "|" in outcomes:
+                parts = outcomes.split("|", 1)
+                left = parts[0].strip()
+                right = parts[1].strip()
+            else:
+                left = outcomes.strip()
+                right = ""
+            wallets = str(r.get("Total Wallets", ""))
+            parsed.append({"title": title, "left": left, "right": right, "wallets": wallets})
+
+        # Compute column widths
+        title_w = max([len(p["title"]) for p in parsed] + [12])
+        left_w = max([len(p["left"]) for p in parsed] + [4])
+        right_w = max([len(p["right"]) for p in parsed] + [0])
+        wallets_w = max([len(p["wallets"]) for p in parsed] + [13])
+
+        # Header
+        header_parts = [f"{'Market Title':<{title_w}}", f"{'Outcome':<{left_w}}"]
+        if right_w > 0:
+            header_parts.append(f"{'Opposite':<{right_w}}")
+        header_parts.append(f"{'Total Wallets':>{wallets_w}}")
+        print("  ".join(header_parts))
+        print("-" * (title_w + left_w + right_w + wallets_w + 6))
+
+        # Rows
+        for p in parsed:
+            if right_w > 0:
+                out_part = f"{p['left']:<{left_w}} | {p['right']:<{right_w}}"
+            else:
+                out_part = f"{p['left']:<{left_w}}"
+            print(f"{p['title']:<{title_w}}  {out_part}  {p['wallets']:>{wallets_w}}")
+        print("=" * 100)
+
+        # Export to CSV
+        analyzer.export_csv(results_df, OUTPUT_CSV)
+        print(f"\nCSV exported to: {OUTPUT_CSV}")
+        
+        # Send Telegram notification with top 4 markets (or fan out
+        # per-subscriber feeds when TELEGRAM_SUBSCRIBERS is configured)
+        if ENABLE_TELEGRAM_NOTIFICATIONS:
+            with trace_span("notify", "notify", markets=len(results_df)):
+                if TELEGRAM_SUBSCRIBERS:
+                    dispatch_results(analyzer, results_df, only_changed)
+                else:
+                    notify_top_markets(analyzer, results_df, TELEGRAM_CHAT_ID, "default", only_changed)
+    else:
+        print("\nNo LIVE markets found matching criteria.")
+        if only_changed:
+            analyzer.changed_markets("default", results_df)
+
+    report_partial(analyzer)
+    report_profiles(analyzer, only_changed)
+
+
+def notify_top_markets(
+    analyzer: PolymarketAnalyzer,
+    results_df: pd.DataFrame,
+    chat_id: str,
+    channel: str,
+    only_changed: bool = False,
+    top_n: int = 4,
+):
+    """
+    Send the top markets to one chat.
+    
+    Args:
+        analyzer: Analyzer that remembers what each channel was sent
+        results_df: Results to pick the top markets from
+        chat_id: Telegram chat ID
+        channel: Name the sent markets are remembered under
+        only_changed: Skip top markets sent before with the same lines
+        top_n: Number of top markets to consider
+    """
+    notifier = TelegramNotifier(TELEGRAM_BOT_TOKEN, chat_id)
+    if not only_changed:
+        notifier.send_top_markets(results_df, top_n=top_n)
+        return
+    changed = analyzer.changed_markets(channel, results_df)
+    best = top_markets(results_df, top_n)
+    best = best[best["Market ID"].isin(changed["Market ID"])]
+    if len(best) == 0:
+        logger.info(f"No new or changed top markets for {channel}; nothing sent")
+        return
+    if notifier.send_top_markets(best, top_n=top_n):
+        analyzer.mark_notified(channel, best)
+
+
+def dispatch_results(analyzer: PolymarketAnalyzer, results_df: pd.DataFrame, only_changed: bool = False):
+    """
+    Fan results out to TELEGRAM_SUBSCRIBERS.
+    
+    Args:
+        analyzer: Analyzer that remembers what was sent
+        results_df: Results to route
+        only_changed: Only route markets that are new or changed since they
+            were last routed
+    """
+    subscribers = [Subscriber.from_config(s) for s in TELEGRAM_SUBSCRIBERS]
+    dispatcher = NotificationDispatcher(TELEGRAM_BOT_TOKEN, subscribers)
+    if not only_changed:
+        dispatcher.dispatch(results_df)
+        return
+    changed = analyzer.changed_markets("default", results_df)
+    if len(changed) == 0:
+        logger.info("No new or changed markets for subscribers; nothing sent")
+        return
+    dispatcher.dispatch(changed)
+    # Markets a chat didn't get (failed or still queued) are routed again next run
+    analyzer.mark_notified("default", changed[changed["Market ID"].isin(dispatcher.delivered)])
+
+
+def report_partial(analyzer: PolymarketAnalyzer):
+    """
+    Print what the run went without because it hit its deadline or a
+    fetch failed.
+    
+    Args:
+        analyzer: Analyzer that produced the results
+    """
+    status = analyzer.run_status()
+    if not status["partial"]:
+        return
+    print("\n" + "=" * 100)
+    print("PARTIAL RESULTS (cycle deadline reached or fetches failed)")
+    print("=" * 100)
+    if status["missing_wallets"]:
+        print(f"Missing wallets ({len(status['missing_wallets'])}): {', '.join(status['missing_wallets'])}")
+    if status["partial_wallets"]:
+        print(f"Partially fetched wallets ({len(status['partial_wallets'])}): "
+              f"{', '.join(status['partial_wallets'])}")
+    if status["failed_wallets"]:
+        print(f"Failed fetches ({len(status['failed_wallets'])}): {', '.join(status['failed_wallets'])}")
+    for market_id, reason in status["stale_markets"].items():
+        print(f"Market {market_id}: {reason}")
+
+
+def report_profiles(analyzer: PolymarketAnalyzer, only_changed: bool = False):
+    """
+    Export CSVs and send notifications for each extra filter profile.
+    
+    Args:
+        analyzer: Analyzer whose last run evaluated the profiles
+        only_changed: Only notify markets new or changed since last sent
+    """
+    for profile in analyzer.profiles:
+        profile_df = analyzer.profile_results.get(profile.name, pd.DataFrame())
+        logger.info(f"Profile {profile.name}: {len(profile_df)} markets")
+        if len(profile_df) == 0:
+            if only_changed:
+                analyzer.changed_markets(profile.name, profile_df)
+            continue
+        analyzer.export_csv(profile_df, profile.csv)
+        if ENABLE_TELEGRAM_NOTIFICATIONS and profile.telegram_chat_id:
+            with trace_span("notify", "notify", profile=profile.name, markets=len(profile_df)):
+                notify_top_markets(analyzer, profile_df, profile.telegram_chat_id, profile.name, only_changed)
+
+
+def explain_market(market_id: str, path: str = FILTER_VERDICTS_PATH):
+    """
+    Print why a market was kept or dropped in the last run, from the saved
+    filter verdicts (nothing is fetched or recomputed).
+    
+    Args:
+        market_id: Market condition id
+        path: Verdicts file written by the last run
+    """
+    if not path or not os.path.exists(path):
+        print(f"No filter verdicts at {path}; run the analysis first")
+        return
+    verdicts = FilterVerdicts.load(path)
+    as_of = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(verdicts.created_at))
+    explained = verdicts.explain(market_id)
+    if explained is None:
+        print(f"{market_id} was not among the {len(verdicts.market_ids)} markets filtered at {as_of}: "
+              f"none of its trades were among the most recent, or trade metadata marked it resolved/closed")
+        return
+
+    print(f"{explained['title']} ({market_id}), run at {as_of}")
+    if explained["kept"]:
+        print("  KEPT: passed every filter")
+    else:
+        print(f"  DROPPED by {', '.join(explained['rejected_by'])} (later filters did not see it)")
+    if explained["traders"]:
+        print("  Traders:")
+        width = max(len(t["trader"]) for t in explained["traders"])
+        for trader in explained["traders"]:
+            if not trader["kept"]:
+                verdict = f"removed by {', '.join(trader['rejected_by'])}"
+            else:
+                verdict = "kept" if explained["kept"] else "not removed by a trader filter"
+            print(f"    {trader['trader']:<{width}}  {trader['outcome']:<20}  {verdict}")
+
+
+def report_latency():
+    """Log detection-latency percentiles and write the metrics export."""
+    tracker = get_latency_tracker()
+    tracker.log_summary()
+    if LATENCY_METRICS_PATH:
+        tracker.export_json(LATENCY_METRICS_PATH)
+
+
+def notify_watch_events(events: List[Dict]):
+    """Send market watch events to TELEGRAM_CHAT_ID, if notifications are enabled."""
+    if not ENABLE_TELEGRAM_NOTIFICATIONS:
+        return
+    with trace_span("notify_watch", "notify", events=len(events)):
+        TelegramNotifier(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID).send_message(format_events(events))
+
+
+def serve(
+    analyzer: PolymarketAnalyzer,
+    host: str,
+    port: int,
+    interval: float,
+    warm_results: Optional[pd.DataFrame] = None,
+    wallets: Optional[List[str]] = None,
+    trace_dir: Optional[str] = None,
+    watcher: Optional[MarketWatcher] = None,
+):
+    """
+    Long-running mode: rerun the analysis every `interval` seconds and publish
+    the latest results over HTTP from memory.
+    
+    Args:
+        analyzer: Analyzer to run each cycle
+        host: Interface to bind the results server to
+        port: Port for the results server
+        interval: Seconds between cycles
+        warm_results: Results recomputed from a checkpoint, published before
+            the first fetch completes
+        wallets: Wallets to track (defaults to TRACKED_WALLETS)
+        trace_dir: Write a trace of each cycle to this directory
+        watcher: Poll the surfaced markets with this between cycles
+    """
+    server = ResultsServer(host, port)
+    server.start()
+    if warm_results is not None:
+        server.publish(warm_results, analyzer.processor.trader_stats, analyzer.profile_results)
+    last_checkpoint = time.time()
+    try:
+        while True:
+            started = time.time()
+            try:
+                with traced_run(trace_dir, "cycle"):
+                    results_df = analyzer.analyze(wallets or TRACKED_WALLETS)
+                    with profile_phase("render"), trace_span("report", "render"):
+                        report_results(analyzer, results_df, only_changed=True)
+                if watcher is not None:
+                    watcher.update(results_df)
+                    server.publish_document("/watch", watcher.document())
+                server.publish(
+                    results_df, analyzer.processor.trader_stats, analyzer.profile_results, analyzer.run_status()
+                )
+                report_latency()
+                get_http_client().log_summary()
+                if get_shared_cache() is not None:
+                    get_shared_cache().log_summary()
+                if CHECKPOINT_PATH and time.time() - last_checkpoint >= CHECKPOINT_INTERVAL_SECONDS:
+                    analyzer.save_checkpoint(CHECKPOINT_PATH)
+                    last_checkpoint = time.time()
+            except Exception as e:
+                logger.error(f"Analysis cycle failed: {e}", exc_info=True)
+            if watcher is not None:
+                watcher.run_until(
+                    started + interval, on_poll=lambda: server.publish_document("/watch", watcher.document())
+                )
+            else:
+                time.sleep(max(0.0, interval - (time.time() - started)))
+    except KeyboardInterrupt:
+        logger.info("Stopping server")
+    finally:
+        server.stop()
+        if analyzer.stream is not None:
+            analyzer.stream.stop()
+
+
+def run_sweep(
+    analyzer: PolymarketAnalyzer,
+    grid: Dict[str, List[float]],
+    csv_path: str,
+    wallets: Optional[List[str]] = None,
+):
+    """
+    Fetch once and evaluate every threshold combination in the grid.
+    
+    Args:
+        analyzer: Analyzer to fetch and aggregate with
+        grid: Threshold values per sweep parameter
+        csv_path: Where to write the sweep table
+        wallets: Wallets to track (defaults to TRACKED_WALLETS)
+    """
+    analyzer.analyze(wallets or TRACKED_WALLETS)
+    table = sweep_thresholds(analyzer.processor, analyzer.pipeline.windowed_markets(), grid)
+    table.to_csv(csv_path, index=False)
+    
+    print("\n" + "=" * 100)
+    print(f"THRESHOLD SWEEP ({len(table)} combinations, most signals first)")
+    print("=" * 100)
+    best = table.sort_values(["signals", "markets"], ascending=False, kind="stable")
+    print(best.head(25).to_string(index=False))
+    print(f"\nFull table exported to: {csv_path}")
+
+
+def grid_entry(entry: str) -> Tuple[str, List[float]]:
+    """
+    argparse type of --grid: parse one NAME=V1,V2,... option.
+    
+    Args:
+        entry: Raw option value
+        
+    Returns:
+        (parameter name, values)
+    """
+    name, _, values = entry.partition("=")
+    try:
+        parsed = [float(v) for v in values.split(",") if v.strip()]
+    except ValueError:
+        parsed = []
+    if name not in SWEEP_PARAMETERS or not parsed:
+        raise argparse.ArgumentTypeError(
+            f"invalid value {entry!r}; expected NAME=V1,V2,... with numeric values and NAME in "
+            f"{', '.join(SWEEP_PARAMETERS)}"
+        )
+    return name, parsed
+
+
+def parse_grid(entries: List[Tuple[str, List[float]]]) -> Dict[str, List[float]]:
+    """
+    Apply parsed --grid options on top of SWEEP_GRID.
+    
+    Args:
+        entries: (name, values) pairs from grid_entry
+        
+    Returns:
+        Grid dict
+    """
+    grid = {name: values for name, values in SWEEP_GRID.items() if name in SWEEP_PARAMETERS}
+    grid.update(entries)
+    return grid
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Polymarket expert trader signal analyzer")
+    parser.add_argument("--serve", action="store_true",
+                        help="Run continuously and serve the latest results as JSON over HTTP")
+    parser.add_argument("--host", default=SERVER_HOST, help="Results server interface")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="Results server port")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL_SECONDS,
+                        help="Seconds between analysis cycles in --serve mode")
+    parser.add_argument("--profile", nargs="?", const="profile", default=None, metavar="DIR",
+                        help="Profile CPU and memory of the run and write reports to DIR (default: profile/)")
+    parser.add_argument("--sweep", nargs="?", const=SWEEP_CSV, default=None, metavar="CSV",
+                        help=f"Evaluate every SWEEP_GRID threshold combination and write the table to CSV "
+                             f"(default: {SWEEP_CSV}); no notifications are sent")
+    parser.add_argument("--stream", action="store_true",
+                        help="In --serve mode, fold trades pushed over the trade feed instead of "
+                             "polling every wallet each cycle")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="In --serve mode, poll each wallet on its own interval (by trade rate, rating "
+                             "and surfaced positions) within POLL_BUDGET_PER_SECOND instead of every cycle")
+    parser.add_argument("--watch", action="store_true",
+                        help="With --stream or --adaptive, poll the surfaced markets' trades every "
+                             "WATCH_INTERVAL_SECONDS between cycles and push entries, exits and price moves")
+    parser.add_argument("--stream-url", default=TRADE_STREAM_URL, help="Trade feed websocket URL")
+    parser.add_argument("--record-stream", default=None, metavar="JSONL",
+                        help="Append streamed trades from tracked wallets to JSONL for later replay")
+    parser.add_argument("--trace", nargs="?", const="traces", default=None, metavar="DIR",
+                        help="Write a Chrome trace JSON of each run to DIR (default: traces/)")
+    parser.add_argument("--explain", default=None, metavar="MARKET_ID",
+                        help="Show which filters dropped a market (and its traders) in the last run, then exit")
+    parser.add_argument("--grid", action="append", default=[], type=grid_entry, metavar="NAME=V1,V2,...",
+                        help="Override one SWEEP_GRID parameter (repeatable)")
+    args = parser.parse_args(argv)
+    if args.stream and not streaming_available():
+        parser.error("--stream needs the websockets package (pip install websockets)")
+    # Watched trades are folded into the kept state; a plain --serve cycle
+    # throws its state away and refetches everything
+    if args.watch and not (args.serve and (args.stream or args.adaptive)):
+        parser.error("--watch needs --serve with --stream or --adaptive")
+    return args
+
+
+def main(argv: Optional[List[str]] = None, wallets: Optional[List[str]] = None):
+    """
+    Main execution function.
+    
+    Args:
+        argv: Command line options (defaults to sys.argv)
+        wallets: Wallets to track instead of TRACKED_WALLETS (e.g. for load tests)
+    """
+    args = parse_args(argv)
+    if args.explain:
+        explain_market(args.explain)
+        return
+    wallets = wallets or TRACKED_WALLETS
+    profiler = RunProfiler(args.profile) if args.profile else None
+    if profiler:
+        profiler.start()
     try:
         logger.info("=" * 70)
         logger.info("Polymarket LIVE Trades Analysis - Top 600 Most Recent Trades")
@@ -29,104 +503,58 @@ def main():
         # Initialize components
         api = PolymarketAPI()
         processor = TradeProcessor(min_wallets=MIN_WALLETS_PER_MARKET)
-        analyzer = PolymarketAnalyzer(api, processor)
+        analyzer = PolymarketAnalyzer(api, processor, profiles=load_profiles())
         
-        # Run analysis
-        results_df = analyzer.analyze(TRACKED_WALLETS)
+        # Restore aggregates and status cache from the last checkpoint, so
+        # --serve can publish before its first cycle finishes (one-shot runs
+        # refetch everything anyway)
+        warm_results = None
+        if CHECKPOINT_PATH and args.serve and not args.sweep:
+            warm_results = analyzer.warm_start(CHECKPOINT_PATH, max_age_seconds=CHECKPOINT_MAX_AGE_SECONDS)
         
-        # Display results
-        if len(results_df) > 0:
-            logger.info("\nResults:")
-            
-            # Show trader summary if available
-            trader_stats = analyzer.processor.trader_stats
-            if trader_stats:
-                trader_results = []
-                for trader_name, stats in sorted(trader_stats.items(), key=lambda x: x[1]["total_size"], reverse=True):
-                    rating = TRADER_RATINGS.get(trader_name, "-")
-                    rating_str = f"{rating}/10" if isinstance(rating, int) else rating
-                    trader_results.append({
-                        "Trader": trader_name,
-                        "Rating": rating_str,
-                        "Bets": stats["trades"],
-                        "Avg Entry Price": f"${stats['avg_price']:.3f}",
-                        "Total Size": f"${stats['total_size']:.2f}",
-                    })
-                trader_df = pd.DataFrame(trader_results)
-                print("\n" + "=" * 100)
-                print("TRADER SUMMARY")
-                print("=" * 100)
-                print(trader_df.to_string(index=False))
-            
-            # Show markets (hide Market ID and Latest Trade timestamp in console output)
-            print("\n" + "=" * 100)
-            print("MARKETS")
-            print("=" * 100)
-            printable_df = results_df.copy()
-            columns_to_drop = []
-            if "Market ID" in printable_df.columns:
-                columns_to_drop.append("Market ID")
-            if "Latest Trade" in printable_df.columns:
-                columns_to_drop.append("Latest Trade")
-            if columns_to_drop:
-                printable_df = printable_df.drop(columns=columns_to_drop)
-
-            # Build rows and split outcomes into left/right for alignment
-            rows = printable_df.to_dict(orient="records")
-            parsed = []
-            for r in rows:
-                title = str(r.get("Market Title", ""))
-                outcomes = str(r.get("Outcomes", ""))
-                if "|" in outcomes:
-                    parts = outcomes.split("|", 1)
-                    left = parts[0].strip()
-                    right = parts[1].strip()
-                else:
-                    left = outcomes.strip()
-                    right = ""
-                wallets = str(r.get("Total Wallets", ""))
-                parsed.append({"title": title, "left": left, "right": right, "wallets": wallets})
-
-            # Compute column widths
-            title_w = max([len(p["title"]) for p in parsed] + [12])
-            left_w = max([len(p["left"]) for p in parsed] + [4])
-            right_w = max([len(p["right"]) for p in parsed] + [0])
-            wallets_w = max([len(p["wallets"]) for p in parsed] + [13])
-
-            # Header
-            header_parts = [f"{'Market Title':<{title_w}}", f"{'Outcome':<{left_w}}"]
-            if right_w > 0:
-                header_parts.append(f"{'Opposite':<{right_w}}")
-            header_parts.append(f"{'Total Wallets':>{wallets_w}}")
-            print("  ".join(header_parts))
-            print("-" * (title_w + left_w + right_w + wallets_w + 6))
-
-            # Rows
-            for p in parsed:
-                if right_w > 0:
-                    out_part = f"{p['left']:<{left_w}} | {p['right']:<{right_w}}"
-                else:
-                    out_part = f"{p['left']:<{left_w}}"
-                print(f"{p['title']:<{title_w}}  {out_part}  {p['wallets']:>{wallets_w}}")
-            print("=" * 100)
-
-            # Export to CSV
-            analyzer.export_csv(results_df, OUTPUT_CSV)
-            print(f"\nCSV exported to: {OUTPUT_CSV}")
-            
-            # Send Telegram notification with top 4 markets
-            if ENABLE_TELEGRAM_NOTIFICATIONS:
-                notifier = TelegramNotifier(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID)
-                notifier.send_top_markets(results_df, top_n=4)
+        # Run analysis
+        if args.sweep:
+            with traced_run(args.trace, "sweep"):
+                run_sweep(analyzer, parse_grid(args.grid), args.sweep, wallets)
+        elif args.serve:
+            if args.stream:
+                analyzer.stream = StreamingIngest(
+                    analyzer.pipeline, wallets, url=args.stream_url, record_path=args.record_stream
+                )
+                analyzer.stream.start()
+            elif args.adaptive:
+                analyzer.stream = AdaptivePoller(analyzer.pipeline, wallets)
+                analyzer.stream.start()
+            watcher = None
+            if args.watch:
+                watcher = MarketWatcher(
+                    api, analyzer.pipeline, wallets, lock=analyzer.stream.lock, on_events=notify_watch_events
+                )
+            serve(analyzer, args.host, args.port, args.interval, warm_results=warm_results,
+                  wallets=wallets, trace_dir=args.trace, watcher=watcher)
         else:
-            print("\nNo LIVE markets found matching criteria.")
+            with traced_run(args.trace):
+                results_df = analyzer.analyze(wallets)
+                with profile_phase("render"), trace_span("report", "render"):
+                    report_results(analyzer, results_df)
+            if CHECKPOINT_PATH:
+                analyzer.save_checkpoint(CHECKPOINT_PATH)
         
+        get_http_client().log_summary()
+        if get_shared_cache() is not None:
+            get_shared_cache().log_summary()
+        if not args.serve:
+            report_latency()
         api.close()
+        analyzer.close()
         logger.info("Analysis completed successfully")
         
     except Exception as e:
         logger.error(f"Analysis failed: {e}", exc_info=True)
         sys.exit(1)
+    finally:
+        if profiler:
+            profiler.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,207 @@
+"""Batched, cached market metadata lookups by condition id."""
+
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Iterable, Optional
+
+from config import (
+    MARKET_METADATA_API,
+    MARKET_METADATA_BATCH_SIZE,
+    MARKET_METADATA_CONCURRENCY,
+    MARKET_METADATA_CACHE_SIZE,
+    MARKET_METADATA_TTL,
+)
+from cache import TTLCache
+from dispatcher import market_categories
+from http_client import HttpClient, get_http_client
+from tracing import trace_span
+
+logger = logging.getLogger(__name__)
+
+
+def _json_list(value) -> list:
+    """Markets API list fields come either as lists or as JSON-encoded strings."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return []
+    return value if isinstance(value, list) else []
+
+
+def parse_timestamp(value) -> Optional[float]:
+    """ISO 8601 date (as used by the markets API) to a unix timestamp, or None."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def parse_winner(market: Dict[str, Any]) -> Optional[str]:
+    """
+    Winning outcome of a markets API entry, or None if not resolved.
+
+    Args:
+        market: Entry with closed, outcomes and outcomePrices
+    """
+    if not market.get("closed"):
+        return None
+    outcomes = _json_list(market.get("outcomes"))
+    try:
+        prices = [float(p) for p in _json_list(market.get("outcomePrices"))]
+    except (ValueError, TypeError):
+        return None
+    for outcome, price in zip(outcomes, prices):
+        if price >= 0.99:
+            return str(outcome)
+    return None
+
+
+def normalize_market(market: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce a markets API entry to the fields the analyzer uses.
+
+    Returns:
+        Dict with condition_id, title, slug, end_date (unix timestamp or
+        None), category (the API's), categories (MARKET_CATEGORIES names
+        matching the title), tags, outcomes, the resolved/closed/active/
+        archived/accepting_orders flags and winner (None until resolved)
+    """
+    title = market.get("question") or market.get("title") or ""
+    resolution = str(market.get("umaResolutionStatus", "")).lower()
+    events = market.get("events") or []
+    tags = [
+        tag.get("label") or tag.get("slug")
+        for event in events if isinstance(event, dict)
+        for tag in event.get("tags") or [] if isinstance(tag, dict)
+    ]
+    winner = parse_winner(market)
+    return {
+        "condition_id": market.get("conditionId"),
+        "title": title,
+        "slug": market.get("slug", ""),
+        "end_date": parse_timestamp(market.get("endDate") or market.get("endDateIso")),
+        "category": market.get("category"),
+        "categories": sorted(market_categories(title)),
+        "tags": [tag for tag in tags if tag],
+        "outcomes": _json_list(market.get("outcomes")),
+        "resolved": bool(market.get("resolved", False)) or resolution == "resolved" or winner is not None,
+        "closed": bool(market.get("closed", False)) or bool(market.get("archived", False)),
+        "active": bool(market.get("active", True)),
+        "archived": bool(market.get("archived", False)),
+        "accepting_orders": bool(market.get("acceptingOrders", True)),
+        "winner": winner,
+    }
+
+
+class MarketMetadataClient:
+    """
+    Looks up market metadata by condition id in batches, through an LRU+TTL cache.
+
+    Ids the API doesn't know are cached as unknown too, so they are not
+    asked for again until the entry expires.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = MARKET_METADATA_API,
+        batch_size: int = MARKET_METADATA_BATCH_SIZE,
+        concurrency: int = MARKET_METADATA_CONCURRENCY,
+        cache_size: int = MARKET_METADATA_CACHE_SIZE,
+        ttl: float = MARKET_METADATA_TTL,
+        http: Optional[HttpClient] = None,
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            base_url: Markets API endpoint (None = lookups return nothing)
+            batch_size: Condition ids per request
+            concurrency: Batches in flight at once
+            cache_size: Most markets kept in the cache
+            ttl: Seconds a cached entry is reused
+            http: HTTP client to use (defaults to the shared one)
+        """
+        self.base_url = base_url
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.cache = TTLCache(cache_size, ttl)
+        self.http = http or get_http_client()
+        self.requests = 0
+
+    def fetch(self, condition_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Metadata for the given markets, fetching whatever isn't cached.
+
+        Args:
+            condition_ids: Market condition IDs
+
+        Returns:
+            Dict mapping condition_id to normalized metadata (see
+            normalize_market); markets the API doesn't know are left out
+        """
+        if not self.base_url:
+            return {}
+        wanted = list(dict.fromkeys(cid for cid in condition_ids if cid))
+        found, missing = self.cache.get_many(wanted)
+        if missing:
+            batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+            with trace_span("metadata_lookup", "status", markets=len(missing), batches=len(batches)):
+                if len(batches) == 1:
+                    results = [self._fetch_batch(batches[0])]
+                else:
+                    with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches))) as executor:
+                        results = list(executor.map(self._fetch_batch, batches))
+            for batch, fetched in zip(batches, results):
+                if fetched is None:
+                    continue  # Request failed; don't cache, try again next time
+                for condition_id in batch:
+                    meta = fetched.get(condition_id)
+                    self.cache.set(condition_id, meta)
+                    found[condition_id] = meta
+        return {cid: meta for cid, meta in found.items() if meta is not None}
+
+    def _fetch_batch(self, condition_ids: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+        """One markets API request for up to batch_size ids (None on failure)."""
+        self.requests += 1
+        try:
+            resp = self.http.get(
+                self.base_url,
+                params={"condition_ids": condition_ids, "limit": len(condition_ids)},
+                timeout=10,
+                hedge=True,
+            )
+            resp.raise_for_status()
+            markets = resp.json()
+        except Exception as e:
+            logger.warning(f"Market metadata lookup failed for {len(condition_ids)} markets: {e}")
+            return None
+        if isinstance(markets, dict):
+            markets = markets.get("data") or [markets]
+        fetched = {}
+        for market in markets or []:
+            meta = normalize_market(market)
+            if meta["condition_id"]:
+                fetched[meta["condition_id"]] = meta
+        return fetched
+
+
+_shared_client: Optional[MarketMetadataClient] = None
+_shared_lock = threading.Lock()
+
+
+def get_metadata_client() -> MarketMetadataClient:
+    """Return the process-wide MarketMetadataClient, creating it on first use."""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = MarketMetadataClient()
+        return _shared_client
@@ -0,0 +1,310 @@
+"""Local stand-in for the Polymarket and Telegram endpoints, for load tests."""
+
+import json
+import logging
+import random
+import threading
+import time
+import zlib
+from collections import defaultdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Any, Optional
+from urllib.parse import urlsplit, parse_qs
+
+logger = logging.getLogger(__name__)
+
+# Upstream URL prefixes the mock stands in for (see HttpClient url_rewrites)
+MOCKED_BASES = (
+    "https://data-api.polymarket.com",
+    "https://gamma-api.polymarket.com",
+    "https://polymarket.com",
+    "https://api.telegram.org",
+)
+
+
+def mock_wallets(count: int) -> List[str]:
+    """`count` distinct fake wallet addresses."""
+    return [f"0x{i:040x}" for i in range(1, count + 1)]
+
+
+class MockPolymarketServer:
+    """
+    HTTP server implementing the endpoints the analyzer calls:
+
+    - GET /trades?user=&limit=&offset=   wallet trades, newest first
+    - GET /trades?condition_id=&limit=   market trades
+    - GET /markets?condition_ids=...     markets API metadata
+    - GET /market/<slug>                 market page with status flags
+    - POST /bot<token>/sendMessage       Telegram Bot API
+
+    Trades are synthetic (deterministic per wallet and seed) or loaded from a
+    JSONL recording (one trade per line, e.g. from --record-stream).
+    Latency, error and 429 rates and payload size are configurable.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        trades_per_wallet: int = 100,
+        markets: int = 100,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        payload_bytes: int = 0,
+        recorded_path: Optional[str] = None,
+        seed: int = 0,
+    ):
+        """
+        Initialize the server.
+
+        Args:
+            host: Interface to bind to
+            port: Port to bind to (0 = pick a free one)
+            trades_per_wallet: Synthetic trade history length per wallet
+            markets: Number of synthetic markets trades are spread over
+            latency: Seconds added to every response
+            jitter: Extra uniformly random delay of up to this many seconds
+            error_rate: Fraction of requests answered with 500
+            rate_limit_rate: Fraction of requests answered with 429
+            payload_bytes: Filler bytes added to every trade (and market page)
+            recorded_path: JSONL file of recorded trades to serve instead
+            seed: Seed for synthetic data and injected failures
+        """
+        self.host = host
+        self.port = port
+        self.trades_per_wallet = trades_per_wallet
+        self.markets = max(1, markets)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.payload_bytes = payload_bytes
+        self.seed = seed
+        self.started_at = int(time.time())
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._wallet_trades: Dict[str, List[Dict[str, Any]]] = {}
+        self._market_trades: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self.recorded = recorded_path is not None
+        if recorded_path:
+            self._load_recording(recorded_path)
+
+        self.stats = defaultdict(lambda: {"requests": 0, "errors": 0, "rate_limited": 0, "bytes": 0})
+        self.trades_served = 0
+        self.messages: List[Dict[str, Any]] = []
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def url_rewrites(self) -> Dict[str, str]:
+        """HttpClient url_rewrites sending every mocked upstream here."""
+        return {base: self.url for base in MOCKED_BASES}
+
+    def _load_recording(self, path: str):
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                trade = json.loads(line)
+                trade = trade.get("payload", trade) if isinstance(trade, dict) else trade
+                wallet = (trade.get("proxyWallet") or "").lower()
+                self._wallet_trades.setdefault(wallet, []).append(trade)
+                self._market_trades[trade.get("conditionId")].append(trade)
+        for trades in list(self._wallet_trades.values()) + list(self._market_trades.values()):
+            trades.sort(key=lambda t: -t.get("timestamp", 0))
+        logger.info(f"Loaded recorded trades for {len(self._wallet_trades)} wallets")
+
+    def recorded_wallets(self) -> List[str]:
+        """Wallets present in the recording."""
+        return list(self._wallet_trades)
+
+    def wallet_trades(self, wallet: str) -> List[Dict[str, Any]]:
+        """Trade history of a wallet, newest first (generated on first use)."""
+        wallet = wallet.lower()
+        with self._lock:
+            trades = self._wallet_trades.get(wallet)
+            if trades is None and not self.recorded:
+                trades = self._wallet_trades[wallet] = self._generate(wallet)
+                for trade in trades:
+                    self._market_trades[trade["conditionId"]].append(trade)
+            return trades or []
+
+    def add_trade(self, trade: Dict[str, Any]):
+        """Make a new trade visible on the wallet and market endpoints."""
+        wallet = (trade.get("proxyWallet") or "").lower()
+        self.wallet_trades(wallet)
+        with self._lock:
+            self._wallet_trades.setdefault(wallet, []).insert(0, trade)
+            self._market_trades[trade.get("conditionId")].insert(0, trade)
+
+    def _generate(self, wallet: str) -> List[Dict[str, Any]]:
+        rng = random.Random(zlib.crc32(wallet.encode()) ^ self.seed)
+        name = f"mock{wallet[-6:]}"
+        filler = "x" * self.payload_bytes
+        trades = []
+        for i in range(self.trades_per_wallet):
+            market = rng.randrange(self.markets)
+            # Each market has a favoured side most wallets pick
+            favoured = market % 2
+            outcome_index = favoured if rng.random() < 0.85 else 1 - favoured
+            # Entry prices stay near a per-market level, as on a quiet market
+            base = 0.3 + (market % 5) * 0.1
+            price = base if outcome_index == favoured else 1 - base
+            trade = {
+                "proxyWallet": wallet,
+                "side": "SELL" if rng.random() < 0.03 else "BUY",
+                "asset": f"{market}-{outcome_index}",
+                "conditionId": f"0xmock{market:06d}",
+                "size": rng.choice([5, 20, 50, 100, 250, 600]),
+                "price": round(price + rng.uniform(-0.05, 0.05), 3),
+                "timestamp": self.started_at - rng.randint(0, 6 * 3600),
+                "title": f"LoL: Team {market} vs Team {market + 1}",
+                "slug": f"mock-market-{market}",
+                "outcome": f"Team {market + outcome_index}",
+                "outcomeIndex": outcome_index,
+                "name": name,
+                "pseudonym": name,
+                "transactionHash": f"0x{rng.getrandbits(128):032x}",
+            }
+            if filler:
+                trade["bio"] = filler
+            trades.append(trade)
+        trades.sort(key=lambda t: -t["timestamp"])
+        return trades
+
+    def _market_metadata(self, condition_id: str) -> Dict[str, Any]:
+        market = int(condition_id[len("0xmock"):]) if condition_id.startswith("0xmock") else 0
+        return {
+            "conditionId": condition_id,
+            "question": f"LoL: Team {market} vs Team {market + 1}",
+            "slug": f"mock-market-{market}",
+            "endDate": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started_at + 86400)),
+            "category": "Esports",
+            "active": True,
+            "closed": False,
+            "outcomes": json.dumps([f"Team {market}", f"Team {market + 1}"]),
+            "outcomePrices": '["0.5", "0.5"]',
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def _send(self, endpoint: str, status: int, body: bytes, content_type: str = "application/json"):
+                with server._lock:
+                    stats = server.stats[endpoint]
+                    stats["requests"] += 1
+                    stats["bytes"] += len(body)
+                    if status == 429:
+                        stats["rate_limited"] += 1
+                    elif status >= 400:
+                        stats["errors"] += 1
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _delay_or_fail(self, endpoint: str) -> bool:
+                delay = server.latency + (server._random.uniform(0, server.jitter) if server.jitter else 0.0)
+                if delay:
+                    time.sleep(delay)
+                roll = server._random.random()
+                if roll < server.rate_limit_rate:
+                    self._send(endpoint, 429, b'{"error":"rate limited"}')
+                    return True
+                if roll < server.rate_limit_rate + server.error_rate:
+                    self._send(endpoint, 500, b'{"error":"internal error"}')
+                    return True
+                return False
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                query = parse_qs(parts.query)
+                path = parts.path.rstrip("/")
+
+                if path == "/trades":
+                    endpoint = "trades" if "user" in query else "market_trades"
+                    if self._delay_or_fail(endpoint):
+                        return
+                    limit = int(query.get("limit", ["100"])[0])
+                    offset = int(query.get("offset", ["0"])[0])
+                    if "user" in query:
+                        trades = server.wallet_trades(query["user"][0])
+                    else:
+                        trades = server._market_trades.get(query.get("condition_id", [""])[0], [])
+                    page = trades[offset:offset + limit]
+                    with server._lock:
+                        server.trades_served += len(page)
+                    self._send(endpoint, 200, json.dumps(page).encode("utf-8"))
+                elif path == "/markets":
+                    if self._delay_or_fail("markets"):
+                        return
+                    ids = query.get("condition_ids", [])
+                    markets = [server._market_metadata(cid) for cid in ids]
+                    self._send("markets", 200, json.dumps(markets).encode("utf-8"))
+                elif path.startswith("/market/"):
+                    if self._delay_or_fail("market_page"):
+                        return
+                    page = (
+                        "<html><body>" + "x" * server.payload_bytes
+                        + '<script>{"resolved":false,"closed":false}</script></body></html>'
+                    )
+                    self._send("market_page", 200, page.encode("utf-8"), content_type="text/html")
+                else:
+                    self._send("unknown", 404, b'{"error":"not found"}')
+
+            def do_POST(self):
+                path = urlsplit(self.path).path
+                length = int(self.headers.get("Content-Length", 0) or 0)
+                body = self.rfile.read(length) if length else b""
+                if not (path.startswith("/bot") and path.endswith("/sendMessage")):
+                    self._send("unknown", 404, b'{"error":"not found"}')
+                    return
+                if self._delay_or_fail("telegram"):
+                    return
+                try:
+                    payload = json.loads(body or b"{}")
+                except ValueError:
+                    payload = {}
+                with server._lock:
+                    server.messages.append(payload)
+                    message_id = len(server.messages)
+                self._send("telegram", 200, json.dumps({"ok": True, "result": {"message_id": message_id}}).encode())
+
+        return Handler
+
+    def start(self):
+        """Start serving in a background thread."""
+        self._httpd = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Mock Polymarket/Telegram server on {self.url}")
+
+    def stop(self):
+        """Stop the server."""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def snapshot_stats(self) -> Dict[str, Dict[str, int]]:
+        """Copy of the per-endpoint counters."""
+        with self._lock:
+            return {endpoint: dict(stats) for endpoint, stats in self.stats.items()}
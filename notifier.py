@@ -1,27 +1,60 @@
 """Notification module for sending alerts via Telegram."""
 
-import requests
 import logging
 from typing import Optional
 import pandas as pd
+from http_client import HttpClient, get_http_client
+from scoring import top_markets
+from latency import get_latency_tracker
+from config import TELEGRAM_API_BASE
 
 logger = logging.getLogger(__name__)
 
 
+def format_market_body(row) -> str:
+    """
+    Format the outcome and wallet lines shown under a market title.
+    
+    Args:
+        row: Result row (dict or pandas Series) with Outcomes and Total Wallets
+        
+    Returns:
+        Message fragment, one line per outcome side plus the trader count
+    """
+    outcomes = row.get("Outcomes", "")
+    wallets = row.get("Total Wallets", "")
+    
+    body = ""
+    if "|" in str(outcomes):
+        # Split outcomes into YES and NO sides
+        parts = str(outcomes).split("|", 1)
+        yes_side = parts[0].strip()
+        no_side = parts[1].strip()
+        body += f"   ✅ {yes_side}\n"
+        body += f"   ❌ {no_side}\n"
+    else:
+        body += f"   📊 {outcomes}\n"
+    
+    body += f"   👥 {wallets} traders\n"
+    return body
+
+
 class TelegramNotifier:
     """Send notifications via Telegram bot."""
     
-    def __init__(self, bot_token: str, chat_id: str):
+    def __init__(self, bot_token: str, chat_id: str, http: Optional[HttpClient] = None):
         """
         Initialize Telegram notifier.
         
         Args:
             bot_token: Telegram bot token from @BotFather
             chat_id: Your Telegram chat ID
+            http: HTTP client to send through (defaults to the shared one)
         """
         self.bot_token = bot_token
         self.chat_id = chat_id
-        self.base_url = f"https://api.telegram.org/bot{bot_token}"
+        self.http = http or get_http_client()
+        self.base_url = f"{TELEGRAM_API_BASE}/bot{bot_token}"
     
     def send_message(self, message: str) -> bool:
         """
@@ -46,7 +79,7 @@ class TelegramNotifier:
         }
         
         try:
-            response = requests.post(url, json=payload, timeout=10)
+            response = self.http.post(url, json=payload, timeout=10)
             response.raise_for_status()
             logger.info("Telegram notification sent successfully")
             return True
@@ -68,30 +101,20 @@ class TelegramNotifier:
         if len(df) == 0:
             return self.send_message("⚠️ Ingen markets funnet i denne kjøringen.")
         
-        # Take top N markets
-        top_markets = df.head(top_n)
-        
+        # Take top N markets by signal score
+        best = top_markets(df, top_n)
+
         # Build message
-        message = f"🎯 <b>TOP {min(top_n, len(top_markets))} POLYMARKET BETS</b>\n\n"
-        
-        for idx, row in top_markets.iterrows():
+        message = f"🎯 <b>TOP {min(top_n, len(best))} POLYMARKET BETS</b>\n\n"
+
+        for idx, row in best.iterrows():
             market_num = idx + 1
             title = row.get("Market Title", "Unknown")
-            outcomes = row.get("Outcomes", "")
-            wallets = row.get("Total Wallets", "")
             
             message += f"<b>{market_num}. {title}</b>\n"
-            
-            if "|" in str(outcomes):
-                # Split outcomes into YES and NO sides
-                parts = str(outcomes).split("|", 1)
-                yes_side = parts[0].strip()
-                no_side = parts[1].strip()
-                message += f"   ✅ {yes_side}\n"
-                message += f"   ❌ {no_side}\n"
-            else:
-                message += f"   📊 {outcomes}\n"
-            
-            message += f"   👥 {wallets} traders\n\n"
+            message += format_market_body(row) + "\n"
         
-        return self.send_message(message)
+        sent = self.send_message(message)
+        if sent and "Market ID" in best.columns:
+            get_latency_tracker().record_delivery(best["Market ID"])
+        return sent
@@ -0,0 +1,603 @@
+"""Overlapped fetch/process pipeline for Polymarket analysis."""
+
+import asyncio
+import heapq
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from typing import Dict, List, Any, Optional, Tuple
+
+from config import CHECK_LIVE_STATUS, PREFETCH_CURRENT_PRICES
+from profiling import profile_phase
+from tracing import trace_span
+from filter_profiles import FilterProfile
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def trade_key(trade: Dict[str, Any]) -> Tuple:
+    """Identity of a fill, shared by the data API and the trade stream."""
+    return (
+        trade.get("transactionHash"),
+        (trade.get("proxyWallet") or "").lower(),
+        trade.get("asset"),
+        trade.get("side"),
+        trade.get("size"),
+        trade.get("price"),
+        trade.get("timestamp"),
+    )
+
+
+class TradePipeline:
+    """
+    Fetches wallets concurrently and folds each wallet's trades into the
+    market aggregates as soon as its response lands.
+
+    The result is the same as fetching everything, keeping the
+    `max_recent_trades` most recent trades and running TradeProcessor.process:
+    every trade is folded into its market aggregate on arrival, and the recency
+    window (a bounded heap) only decides which markets reach the filter stage.
+    Ties are broken by wallet order and trade position, so arrival order never
+    changes the output.
+
+    With paging enabled, pages go out newest-first across wallets and every
+    wallet is paged down to `max_trades_per_wallet`, the depth of a single
+    unpaged request. A wallet's older fills can belong to markets that are
+    in the window (and matter to the exit and both-sides filters), so no
+    wallet stops early.
+    """
+
+    # Aggregates that make up a run's result, see export_state()
+    STATE_FIELDS = (
+        "market_data", "market_info", "market_rank", "trader_rank",
+        "trader_market_stats", "recent", "total_trades",
+    )
+
+    def __init__(
+        self,
+        api,
+        processor,
+        max_recent_trades: int = 600,
+        concurrency: int = 8,
+        deadline_seconds: Optional[float] = None,
+        page_size: Optional[int] = None,
+        max_trades_per_wallet: int = 100,
+        dedupe_trades: bool = False,
+        rating_engine=None,
+        archive=None,
+    ):
+        """
+        Initialize the pipeline.
+
+        Args:
+            api: PolymarketAPI instance
+            processor: TradeProcessor instance
+            max_recent_trades: Size of the cross-wallet recency window
+            concurrency: Number of wallet fetches in flight at once
+            deadline_seconds: Cycle time budget; when it runs out the filter
+                stage runs with whatever wallets have arrived, and live status
+                checks still to do by then are skipped (None = no limit)
+            page_size: Trades per page when paging wallets (None = one
+                request per wallet with the API's default size)
+            max_trades_per_wallet: Stop paging a wallet after this many trades
+            dedupe_trades: Skip trades that were already folded (for sources
+                that overlap, like a trade stream plus gap-recovery polling)
+            rating_engine: RatingEngine that every folded trade is also fed to
+            archive: ArchiveWriter that every folded trade is appended to
+        """
+        self.api = api
+        self.processor = processor
+        self.max_recent_trades = max_recent_trades
+        self.concurrency = concurrency
+        self.deadline_seconds = deadline_seconds
+        self.page_size = page_size
+        self.max_trades_per_wallet = max_trades_per_wallet
+        self.dedupe_trades = dedupe_trades
+        self.rating_engine = rating_engine
+        self.archive = archive
+        self.reset()
+
+    def reset(self):
+        """Clear all per-run state."""
+        self.market_data: Dict[str, Dict[str, Any]] = {}
+        # condition_id -> (rank, market info) of the first signal trade
+        self.market_info: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+        # condition_id -> rank of the first trade seen for the market
+        self.market_rank: Dict[str, Tuple[int, int]] = {}
+        # (condition_id, outcome, trader) -> rank of first appearance
+        self.trader_rank: Dict[Tuple[str, str, str], Tuple[int, int]] = {}
+        # trader -> condition_id -> running stats for the trader summary
+        self.trader_market_stats: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # Min-heap of (timestamp, -wallet_index, -position, condition_id)
+        self.recent: List[Tuple[Any, int, int, Optional[str]]] = []
+        self.total_trades = 0
+        # Wallets with nothing fetched / only some pages fetched by the
+        # deadline or because a fetch failed, and the wallets whose fetch failed
+        self.missing_wallets: List[str] = []
+        self.partial_wallets: List[str] = []
+        self.failed_wallets: List[str] = []
+        # Monotonic time the current cycle's budget runs out (None = no budget)
+        self.deadline_at: Optional[float] = None
+        self.prefetched = set()
+        self.prefetch_futures: Dict[asyncio.Future, Tuple[str, str]] = {}
+        self.pages_fetched = 0
+        # FilterProfile name -> filtered market data from the last finalize
+        self.profile_results: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # Identities of folded trades, when dedupe_trades is set
+        self.seen_trades: set = set()
+
+    def fold_wallet_trades(
+        self,
+        wallet_index: int,
+        wallet: str,
+        trades: List[Dict[str, Any]],
+        offset: int = 0,
+    ) -> set:
+        """
+        Fold one wallet's trades (or one page of them) into the market aggregates.
+
+        Args:
+            wallet_index: Position of the wallet in the tracked list
+            wallet: Wallet address
+            trades: Trades returned for the wallet
+            offset: Position of the first trade in the wallet's history
+
+        Returns:
+            Set of condition ids touched by these trades
+        """
+        processor = self.processor
+        touched = set()
+        folded = []
+
+        for position, trade in enumerate(trades, start=offset):
+            if self.dedupe_trades:
+                key = trade_key(trade)
+                if key in self.seen_trades:
+                    continue
+                self.seen_trades.add(key)
+            self.total_trades += 1
+            folded.append(trade)
+            trader_name = trade.get("name") or trade.get("pseudonym") or wallet[:8]
+            if self.rating_engine is not None:
+                self.rating_engine.record_trade(trader_name, trade)
+
+            condition_id = trade.get("conditionId")
+            rank = (wallet_index, position)
+
+            window_entry = (trade.get("timestamp", 0), -wallet_index, -position, condition_id)
+            if len(self.recent) < self.max_recent_trades:
+                heapq.heappush(self.recent, window_entry)
+            elif window_entry > self.recent[0]:
+                heapq.heapreplace(self.recent, window_entry)
+
+            if not condition_id:
+                continue
+            touched.add(condition_id)
+
+            entry = self.market_data.get(condition_id)
+            if entry is None:
+                entry = self.market_data[condition_id] = processor.new_market_entry()
+            if condition_id not in self.market_rank or rank < self.market_rank[condition_id]:
+                self.market_rank[condition_id] = rank
+            processor.add_trade_to_market(entry, wallet, trade, {
+                "title": trade.get("title", "Unknown Market"),
+                "slug": trade.get("slug", ""),
+            })
+
+            outcome = trade.get("outcome", "").upper()
+            key = (condition_id, outcome, trader_name)
+            if key not in self.trader_rank or rank < self.trader_rank[key]:
+                self.trader_rank[key] = rank
+
+            if not processor.is_signal_trade(trade):
+                continue
+
+            known = self.market_info.get(condition_id)
+            if known is None or rank < known[0]:
+                info = processor.extract_market_info_from_trades([trade])[condition_id]
+                self.market_info[condition_id] = (rank, info)
+
+            per_market = self.trader_market_stats.setdefault(trader_name, {})
+            stats = per_market.get(condition_id)
+            if stats is None:
+                stats = per_market[condition_id] = {
+                    "wallet": wallet,
+                    "rank": rank,
+                    "trades": 0,
+                    "total_size": 0,
+                    "price_sum": 0.0,
+                }
+            stats["trades"] += 1
+            stats["total_size"] += trade.get("size", 0)
+            stats["price_sum"] += trade.get("price", 0.5)
+
+        if self.archive is not None and folded:
+            try:
+                self.archive.append(folded)
+            except Exception as e:
+                logger.error(f"Archiving {len(folded)} trades failed: {e}")
+        return touched
+
+    def window_condition_ids(self) -> set:
+        """Condition ids that appear among the most recent trades so far."""
+        return {entry[3] for entry in self.recent}
+
+    def is_candidate(self, condition_id: str) -> bool:
+        """
+        Whether a market is likely to reach the filter stage and is worth
+        looking up speculatively.
+        """
+        known = self.market_info.get(condition_id)
+        if known is None:
+            return False
+        info = known[1]
+        if info.get("resolved") or info.get("closed"):
+            return False
+
+        entry = self.market_data[condition_id]
+        # Once the window is full its cut-off only moves forward, so a market
+        # whose latest trade is already below it can never get back in.
+        if len(self.recent) >= self.max_recent_trades:
+            if entry["latest_timestamp"] < self.recent[0][0]:
+                return False
+        return len(entry["wallet_outcomes"]) >= self.processor.min_wallets
+
+    def start_prefetches(self, loop, executor, condition_ids: set):
+        """
+        Start live-status/metadata and price lookups for new candidate markets.
+
+        Args:
+            loop: Running event loop
+            executor: Executor to run the blocking lookups in
+            condition_ids: Markets touched by the latest wallet
+        """
+        if not CHECK_LIVE_STATUS and not PREFETCH_CURRENT_PRICES:
+            return
+
+        # With a metadata source, the live status of all new candidates is
+        # fetched in one batched lookup that fills its cache
+        use_metadata = CHECK_LIVE_STATUS and bool(self.processor.metadata.base_url)
+        candidates = []
+        for condition_id in condition_ids:
+            if condition_id in self.prefetched or not self.is_candidate(condition_id):
+                continue
+            self.prefetched.add(condition_id)
+            candidates.append(condition_id)
+
+            slug = self.market_info[condition_id][1].get("slug")
+            if CHECK_LIVE_STATUS and slug and not use_metadata:
+                future = loop.run_in_executor(executor, self.processor.get_market_live_status, slug)
+                self.prefetch_futures[future] = ("status", slug)
+            if PREFETCH_CURRENT_PRICES:
+                future = loop.run_in_executor(executor, self.api.fetch_current_market_price, condition_id)
+                self.prefetch_futures[future] = ("price", condition_id)
+
+        if use_metadata and candidates:
+            future = loop.run_in_executor(executor, self.processor.metadata.fetch, candidates)
+            self.prefetch_futures[future] = ("metadata", None)
+
+    async def collect_prefetches(self, timeout: Optional[float]):
+        """
+        Wait for outstanding speculative lookups and store their results.
+
+        Args:
+            timeout: Seconds to wait at most (None = until all are done)
+        """
+        if not self.prefetch_futures:
+            return
+
+        done, pending = await asyncio.wait(list(self.prefetch_futures), timeout=timeout)
+        for future in done:
+            kind, key = self.prefetch_futures[future]
+            if future.exception() is not None:
+                continue
+            if kind in ("metadata", "status"):
+                continue  # Already cached by the metadata client / processor
+            if key in self.market_data:
+                self.market_data[key]["current_prices"] = future.result()
+
+        if pending:
+            logger.warning(f"{len(pending)} speculative lookups still running at the deadline")
+
+    def build_trader_stats(self, window: set) -> Dict[str, Dict[str, Any]]:
+        """
+        Trader summary restricted to markets in the recency window.
+
+        Args:
+            window: Condition ids in the recency window
+
+        Returns:
+            Dict in the same shape as TradeProcessor.trader_stats
+        """
+        ranked = []
+        for trader_name, per_market in self.trader_market_stats.items():
+            rows = [stats for cid, stats in per_market.items() if cid in window]
+            if not rows:
+                continue
+            first = min(rows, key=lambda r: r["rank"])
+            trades = sum(r["trades"] for r in rows)
+            price_sum = sum(r["price_sum"] for r in rows)
+            ranked.append((first["rank"], trader_name, {
+                "wallet": first["wallet"],
+                "trades": trades,
+                "total_size": sum(r["total_size"] for r in rows),
+                "avg_price": price_sum / trades if trades else 0,
+            }))
+
+        ranked.sort(key=lambda x: x[0])
+        return {name: stats for _, name, stats in ranked}
+
+    def build_live_markets(self, window: set) -> Dict[str, Dict[str, Any]]:
+        """
+        Grouped market data for unresolved, open markets in the recency window.
+
+        Args:
+            window: Condition ids in the recency window
+
+        Returns:
+            Dict in the same shape as TradeProcessor.group_trades_by_market
+        """
+        candidates = [cid for cid in self.market_info if cid in window]
+        logger.info(f"Extracted {len(candidates)} unique markets from trades")
+
+        live_markets = {}
+        for condition_id in sorted(candidates, key=lambda cid: self.market_rank[cid]):
+            info = self.market_info[condition_id][1]
+            if info.get("resolved", False) or info.get("closed", False):
+                continue
+
+            entry = self.market_data[condition_id]
+            entry["market_title"] = info.get("title", "N/A")
+            entry["market_id"] = condition_id
+            entry["slug"] = info.get("slug", "")
+
+            # Restore first-appearance order so display order does not depend
+            # on which wallet answered first
+            def first_seen(outcome, trader_name, cid=condition_id):
+                return self.trader_rank[(cid, outcome, trader_name)]
+
+            detailed = entry["outcome_traders_detailed"]
+            outcomes = sorted(detailed, key=lambda o: min(first_seen(o, t) for t in detailed[o]))
+            entry["outcome_traders_detailed"] = {
+                outcome: dict(sorted(detailed[outcome].items(), key=lambda kv, o=outcome: first_seen(o, kv[0])))
+                for outcome in outcomes
+            }
+            live_markets[condition_id] = entry
+
+        logger.info(f"Filtered to {len(live_markets)} markets (not resolved/closed from trade metadata)")
+        return live_markets
+
+    def fetch_page(self, wallet: str, offset: int) -> List[Dict[str, Any]]:
+        """One page of a wallet's trades (runs in the fetch executor)."""
+        # The last page stops at max_trades_per_wallet
+        limit = min(self.page_size, self.max_trades_per_wallet - offset) if self.page_size else None
+        with trace_span("fetch_wallet", "fetch", wallet=wallet, offset=offset) as span:
+            trades = self.api.fetch_trades(wallet, limit, offset, raise_errors=True)
+            if span is not None:
+                span["trades"] = len(trades)
+        return trades
+
+    async def run(
+        self,
+        wallets: List[str],
+        profiles: Optional[List[FilterProfile]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch all wallets, folding trades as they arrive, then filter.
+
+        Args:
+            wallets: List of wallet addresses to track
+            profiles: Extra filter profiles to evaluate (see finalize)
+
+        Returns:
+            Processed and filtered market data (see TradeProcessor.process)
+        """
+        await self.fetch(wallets)
+        if self.total_trades == 0:
+            return {}
+        # Status checks share the cycle budget with the fetch
+        return self.finalize(profiles, deadline_at=self.deadline_at)
+
+    async def fetch(self, wallets: List[str]):
+        """
+        Reset and fetch all wallets, folding trades as they arrive.
+
+        Args:
+            wallets: List of wallet addresses to track
+        """
+        self.reset()
+        started = time.monotonic()
+        if self.deadline_seconds is not None:
+            self.deadline_at = started + self.deadline_seconds
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=max(1, self.concurrency))
+
+        # Pages are fetched newest-first across all wallets, each wallet down
+        # to max_trades_per_wallet
+        queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        for index in range(len(wallets)):
+            queue.put_nowait((-math.inf, index, 0))
+        arrived = set()
+        # Wallets with a page still queued or in flight
+        unfinished = set(range(len(wallets)))
+        # Wallets a page fetch failed for; their remaining pages are dropped
+        failed = set()
+
+        async def fetch_wallet_page(index: int, offset: int):
+            wallet = wallets[index]
+            trades = await loop.run_in_executor(executor, self.fetch_page, wallet, offset)
+            arrived.add(wallet)
+            self.pages_fetched += 1
+            touched = self.fold_wallet_trades(index, wallet, trades, offset=offset)
+            self.start_prefetches(loop, executor, touched)
+
+            next_offset = offset + len(trades)
+            if not self.page_size or len(trades) < self.page_size:
+                unfinished.discard(index)
+                return  # Wallet exhausted (or paging disabled)
+            if next_offset >= self.max_trades_per_wallet:
+                unfinished.discard(index)
+                return
+            oldest = min(t.get("timestamp", 0) for t in trades)
+            queue.put_nowait((-oldest, index, next_offset))
+
+        async def worker():
+            while True:
+                _, index, offset = await queue.get()
+                try:
+                    await fetch_wallet_page(index, offset)
+                except Exception as e:
+                    # One failed page must not take the worker down with it
+                    logger.error(f"Fetching {wallets[index]} (offset {offset}) failed: {e}")
+                    failed.add(index)
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(max(1, self.concurrency))]
+        with profile_phase("fetch"), trace_span("fetch", "fetch", wallets=len(wallets)):
+            timed_out = False
+            try:
+                await asyncio.wait_for(queue.join(), timeout=self.deadline_seconds)
+            except asyncio.TimeoutError:
+                timed_out = True
+            finally:
+                for task in workers:
+                    task.cancel()
+
+        self.failed_wallets = [wallets[i] for i in sorted(failed)]
+        self.missing_wallets = [w for w in wallets if w not in arrived]
+        self.partial_wallets = [
+            wallets[i] for i in sorted(unfinished) if wallets[i] in arrived and (timed_out or i in failed)
+        ]
+        if timed_out:
+            logger.warning(
+                f"Deadline of {self.deadline_seconds}s reached, continuing without "
+                f"{len(self.missing_wallets)} wallets: {', '.join(self.missing_wallets)}"
+                + (f"; {len(self.partial_wallets)} only partially fetched" if self.partial_wallets else "")
+            )
+        if self.failed_wallets:
+            logger.warning(
+                f"Fetching failed for {len(self.failed_wallets)} wallets: {', '.join(self.failed_wallets)}"
+            )
+
+        logger.info(f"Fetched {self.total_trades} total trades from {len(arrived)} wallets")
+
+        try:
+            if self.total_trades == 0:
+                return
+
+            remaining = None
+            if self.deadline_seconds is not None:
+                remaining = max(0.0, self.deadline_seconds - (time.monotonic() - started))
+            with trace_span("collect_prefetches", "fetch", pending=len(self.prefetch_futures)):
+                await self.collect_prefetches(remaining)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def windowed_markets(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Unfiltered grouped market data for the current recency window.
+
+        Returns:
+            Dict in the same shape as TradeProcessor.group_trades_by_market
+        """
+        return self.build_live_markets(self.window_condition_ids())
+
+    def finalize(
+        self,
+        profiles: Optional[List[FilterProfile]] = None,
+        deadline_at: Optional[float] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Apply the recency window and run the filter stage over the folded state.
+
+        The window and grouped markets are built once; each extra filter
+        profile is run over them and its result stored in profile_results.
+
+        Args:
+            profiles: Extra filter profiles to evaluate
+            deadline_at: Monotonic time live status checks must be done by
+                (None = deadline_seconds from now, if set)
+
+        Returns:
+            Processed and filtered market data (see TradeProcessor.process)
+        """
+        with profile_phase("process"), trace_span("process", "process", trades=self.total_trades):
+            if deadline_at is None and self.deadline_seconds is not None:
+                deadline_at = time.monotonic() + self.deadline_seconds
+            self.processor.deadline = deadline_at
+            self.processor.stale_markets = {}
+            window = self.window_condition_ids()
+            if self.total_trades > self.max_recent_trades:
+                logger.info(
+                    f"Filtering to {self.max_recent_trades} most recent trades "
+                    f"(out of {self.total_trades} total)"
+                )
+
+            self.processor.trader_stats = self.build_trader_stats(window)
+            live_markets = self.build_live_markets(window)
+            self.profile_results = {profile.name: {} for profile in profiles or []}
+            if not live_markets:
+                return {}
+            for profile in profiles or []:
+                self.profile_results[profile.name] = self.processor.filter_markets(live_markets, profile)
+            return self.processor.filter_markets(live_markets)
+
+    def spawn(self) -> "TradePipeline":
+        """A new, empty pipeline with the same settings and hooks, deduplicating."""
+        return TradePipeline(
+            self.api,
+            self.processor,
+            max_recent_trades=self.max_recent_trades,
+            concurrency=self.concurrency,
+            deadline_seconds=self.deadline_seconds,
+            page_size=self.page_size,
+            max_trades_per_wallet=self.max_trades_per_wallet,
+            dedupe_trades=True,
+            rating_engine=self.rating_engine,
+            archive=self.archive,
+        )
+
+    def snapshot(self) -> "TradePipeline":
+        """
+        A spawned pipeline holding a deep copy of the folded aggregates, to
+        filter while this one keeps folding (finalize changes the entries it
+        filters).
+        """
+        copied = self.spawn()
+        copied.restore_state(deepcopy(self.export_state()))
+        return copied
+
+    def adopt(self, fresh: "TradePipeline"):
+        """
+        Take over the aggregates and fetch bookkeeping of another pipeline
+        (one from spawn() that has just fetched everything).
+
+        Args:
+            fresh: Pipeline to take the state from
+        """
+        self.restore_state(fresh.export_state())
+        self.seen_trades = fresh.seen_trades
+        self.missing_wallets = fresh.missing_wallets
+        self.partial_wallets = fresh.partial_wallets
+        self.failed_wallets = fresh.failed_wallets
+        self.pages_fetched = fresh.pages_fetched
+
+    def export_state(self) -> Dict[str, Any]:
+        """Folded aggregates of the last run, for checkpointing."""
+        return {field: getattr(self, field) for field in self.STATE_FIELDS}
+
+    def restore_state(self, state: Dict[str, Any]):
+        """
+        Replace the folded aggregates with checkpointed ones.
+
+        Args:
+            state: Dict from export_state()
+        """
+        self.reset()
+        for field in self.STATE_FIELDS:
+            if field in state:
+                setattr(self, field, state[field])
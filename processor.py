@@ -1,32 +1,176 @@
 """Data processing module for Polymarket analysis."""
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 from collections import defaultdict
+from functools import partial
+import codecs
 import logging
-import requests
 import time
 import re
+from cache import shared_fetch
+from http_client import HttpClient, get_http_client
+from stats import RunningStats
+from filter_chain import FilterChain, FilterStage
+from filter_profiles import FilterProfile
+from ratings import get_trader_rating
+from metadata import MarketMetadataClient, get_metadata_client
+from tracing import trace_span
 from config import (
     CHECK_LIVE_STATUS,
     ONLY_SHOW_MARKET_KEYWORDS,
     MAX_MARKET_AGE_HOURS,
     CHECK_EXTERNAL_RESULTS,
-    TRADER_RATINGS,
     MIN_BET_SIZE_PER_TRADER,
-    ENABLE_VOLATILITY_FILTER,
     MAX_OUTCOME_PRICE_SPREAD,
     MIN_PRICES_FOR_VOLATILITY_CHECK,
+    MAX_OUTCOME_PRICE_STDDEV,
+    MARKET_STATUS_API,
+    LIVE_STATUS_CACHE_TTL,
+    LIVE_STATUS_STALE_SECONDS,
+    ADAPTIVE_FILTER_ORDER,
+    MAJORITY_THRESHOLD,
+    MARKET_EXPIRY_GRACE_HOURS,
 )
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Trades below this size are ignored when extracting markets and trader stats
+MIN_BET_SIZE = 10
+GAME_NUMBER_PATTERN = re.compile(r"\bgame\s*\d+\b", re.IGNORECASE)
+MAP_NUMBER_PATTERN = re.compile(r"\bmap\s*\d+\b", re.IGNORECASE)
+
+# Streamed market-page scanning for get_market_live_status
+STATUS_SCAN_CHUNK_SIZE = 16 * 1024
+# Characters of the previous chunk kept for matches split across chunks;
+# the longest flag ('"resolved": false') is well under this
+STATUS_SCAN_OVERLAP = 64
+STATUS_FLAG_PATTERNS = {
+    "resolved": re.compile(r'"resolved"\s*:\s*(true|false)', re.IGNORECASE),
+    "closed": re.compile(r'"closed"\s*:\s*(true|false)', re.IGNORECASE),
+}
+
+
+def is_expired(meta: Dict[str, Any], now: Optional[float] = None) -> bool:
+    """
+    Whether a market is more than MARKET_EXPIRY_GRACE_HOURS past its end date.
+
+    Args:
+        meta: Market metadata (see MarketMetadataClient)
+        now: Current unix time (defaults to now)
+    """
+    end_date = meta.get("end_date")
+    if MARKET_EXPIRY_GRACE_HOURS is None or end_date is None:
+        return False
+    now = time.time() if now is None else now
+    return now > end_date + MARKET_EXPIRY_GRACE_HOURS * 3600
+
+
+def outcome_price_stats(traders: Dict[str, Dict[str, Any]]) -> RunningStats:
+    """
+    Entry-price stats of one outcome: one price per trader still listed for
+    it (the trader's latest fill), so the count is a number of traders.
+
+    Args:
+        traders: {trader_name: info} from outcome_traders_detailed
+
+    Returns:
+        RunningStats over the traders' latest prices
+    """
+    stats = RunningStats()
+    for info in traders.values():
+        price = info.get("price")
+        if isinstance(price, (int, float)):
+            stats.add(price)
+    return stats
+
 
 class TradeProcessor:
     """Processes trade data and aggregates by market."""
     
-    def __init__(self, min_wallets: int = 2):
+    def __init__(
+        self,
+        min_wallets: int = 2,
+        http: Optional[HttpClient] = None,
+        metadata: Optional[MarketMetadataClient] = None,
+    ):
         self.min_wallets = min_wallets
+        self.http = http or get_http_client()
+        self.metadata = metadata or get_metadata_client()
+        self.trader_stats = {}
+        # slug -> (fetched_at, {"resolved", "closed"}), fetched ahead of the
+        # filter stage or restored from a checkpoint
+        self.live_status_cache: Dict[str, Tuple[float, Dict[str, bool]]] = {}
+        self.live_status_pruned_at = time.time()
+        # Monotonic time by which the filter stage should be done (None = no
+        # budget); live status checks past it are skipped
+        self.deadline: Optional[float] = None
+        # market_id -> "stale status" / "status unchecked" for markets whose
+        # live status could not be checked before the deadline
+        self.stale_markets: Dict[str, str] = {}
+        self.filter_chain = self.build_filter_chain()
+        # Filter chains (and their measurements) per FilterProfile name
+        self.profile_chains: Dict[str, FilterChain] = {}
+
+    def cache_live_status(self, slug: str, status: Dict[str, bool]):
+        """
+        Remember a market's live status for LIVE_STATUS_CACHE_TTL seconds
+        (and as a stale fallback for LIVE_STATUS_STALE_SECONDS after that).
+
+        Entries past both are dropped, at most once per LIVE_STATUS_CACHE_TTL.
+        """
+        now = time.time()
+        self.live_status_cache[slug] = (now, status)
+        if now - self.live_status_pruned_at > LIVE_STATUS_CACHE_TTL:
+            self.live_status_pruned_at = now
+            cutoff = now - LIVE_STATUS_CACHE_TTL - LIVE_STATUS_STALE_SECONDS
+            for cached_slug, (fetched_at, _) in list(self.live_status_cache.items()):
+                if fetched_at < cutoff:
+                    self.live_status_cache.pop(cached_slug, None)
+
+    def get_cached_live_status(self, slug: str, allow_stale: bool = False) -> Optional[Dict[str, bool]]:
+        """
+        Look up a cached live status.
+        
+        Args:
+            slug: Market URL slug
+            allow_stale: Also return entries older than LIVE_STATUS_CACHE_TTL
+                (kept for up to LIVE_STATUS_STALE_SECONDS more)
+            
+        Returns:
+            Status dict, or None if not cached or older than LIVE_STATUS_CACHE_TTL
+        """
+        cached = self.live_status_cache.get(slug)
+        if cached is None:
+            return None
+        fetched_at, status = cached
+        if not allow_stale and time.time() - fetched_at > LIVE_STATUS_CACHE_TTL:
+            return None
+        return status
+
+    def is_signal_trade(self, trade: Dict[str, Any]) -> bool:
+        """
+        Check whether a trade counts towards signals: not a single game/map
+        market, matches ONLY_SHOW_MARKET_KEYWORDS (if set) and is at least
+        MIN_BET_SIZE dollars.
+        
+        Args:
+            trade: Trade dictionary
+            
+        Returns:
+            True if the trade should be considered
+        """
+        # Optionally restrict to markets whose title matches a keyword
+        title = trade.get("title", "").lower()
+        if GAME_NUMBER_PATTERN.search(title) or MAP_NUMBER_PATTERN.search(title):
+            return False
+        if ONLY_SHOW_MARKET_KEYWORDS:
+            if not any(k.lower() in title for k in ONLY_SHOW_MARKET_KEYWORDS):
+                # Skip trades that are not in the requested market categories
+                return False
+        
+        # Filter out small bets
+        return trade.get("size", 0) >= MIN_BET_SIZE
     
     def extract_market_info_from_trades(
         self,
@@ -70,111 +214,131 @@ class TradeProcessor:
         Returns:
             Dict with market data including YES/NO counts and wallets involved
         """
-        market_data = defaultdict(lambda: {
+        market_data = defaultdict(self.new_market_entry)
+        
+        for wallet, trades in wallet_trades.items():
+            for trade in trades:
+                condition_id = trade.get("conditionId")
+                
+                # Skip if not in live markets
+                if condition_id not in live_markets:
+                    continue
+                
+                self.add_trade_to_market(market_data[condition_id], wallet, trade, live_markets[condition_id])
+        
+        return market_data
+
+    @staticmethod
+    def new_market_entry() -> Dict[str, Any]:
+        """Empty per-market aggregate, filled in by add_trade_to_market."""
+        return {
             "market_title": "",
             "market_id": "",
             "slug": "",
-            "yes_wallets": [],
-            "no_wallets": [],
+            "yes_wallets": set(),
+            "no_wallets": set(),
             "wallet_outcomes": {},
             "yes_count": 0,
             "no_count": 0,
             "outcome_votes": {},  # Track actual outcomes and their vote counts
-            "outcome_prices": {},  # Track prices separately per outcome
             "outcome_traders": {},  # Track trader names per outcome
             "outcome_traders_detailed": {},  # Track {outcome: {trader_name: {size, price, rating}}}
             "latest_timestamp": 0,  # Track most recent trade timestamp for sorting
-            "prices": [],  # Track all entry prices for computing average
+            "latest_fetched_at": 0.0,  # When the trade behind latest_timestamp was fetched
+            "prices": RunningStats(),  # Running stats over all entry prices
             "current_prices": {},  # Current market prices (will be fetched later)
-        })
+        }
+
+    def add_trade_to_market(
+        self,
+        entry: Dict[str, Any],
+        wallet: str,
+        trade: Dict[str, Any],
+        market: Dict[str, Any]
+    ):
+        """
+        Fold a single trade into a market aggregate.
         
-        for wallet, trades in wallet_trades.items():
-            for trade in trades:
-                condition_id = trade.get("conditionId")
-                
-                # Skip if not in live markets
-                if condition_id not in live_markets:
-                    continue
-                
-                market = live_markets[condition_id]
-                outcome = trade.get("outcome", "").upper()
-                if wallet not in market_data[condition_id]["wallet_outcomes"]:
-                    market_data[condition_id]["wallet_outcomes"][wallet] = set()
-                market_data[condition_id]["wallet_outcomes"][wallet].add(outcome)
-                
-                # Update market data
-                if condition_id not in market_data or not market_data[condition_id]["market_title"]:
-                    market_data[condition_id]["market_title"] = market.get("title", "N/A")
-                    market_data[condition_id]["market_id"] = condition_id
-                    market_data[condition_id]["slug"] = market.get("slug", "")
-                
-                # Track most recent trade timestamp for this market
-                trade_ts = trade.get("timestamp", 0)
-                if trade_ts > market_data[condition_id]["latest_timestamp"]:
-                    market_data[condition_id]["latest_timestamp"] = trade_ts
-                
-                # Collect entry price
-                price = trade.get("price", 0)
-                if price:
-                    market_data[condition_id]["prices"].append(price)
-                    # Also track price per outcome
-                    if outcome not in market_data[condition_id]["outcome_prices"]:
-                        market_data[condition_id]["outcome_prices"][outcome] = []
-                    market_data[condition_id]["outcome_prices"][outcome].append(price)
-                
-                # Count votes (outcome can be Yes/No or team name for sports/esports)
-                # For binary markets: YES/NO
-                # For multi-outcome: team name or outcome text
-                if outcome in ["YES", "YES "]:
-                    if wallet not in market_data[condition_id]["yes_wallets"]:
-                        market_data[condition_id]["yes_wallets"].append(wallet)
-                        market_data[condition_id]["yes_count"] += 1
-                elif outcome in ["NO", "NO "]:
-                    if wallet not in market_data[condition_id]["no_wallets"]:
-                        market_data[condition_id]["no_wallets"].append(wallet)
-                        market_data[condition_id]["no_count"] += 1
-                else:
-                    # For non-binary outcomes (team names, etc), count as YES vote
-                    if wallet not in market_data[condition_id]["yes_wallets"]:
-                        market_data[condition_id]["yes_wallets"].append(wallet)
-                        market_data[condition_id]["yes_count"] += 1
-                    
-                    # Track the actual outcome
-                    if outcome not in market_data[condition_id]["outcome_votes"]:
-                        market_data[condition_id]["outcome_votes"][outcome] = 0
-                    market_data[condition_id]["outcome_votes"][outcome] += 1
-                    
-                    # Track trader name per outcome
-                    trader_name = trade.get("name") or trade.get("pseudonym") or wallet[:8]
-                    if outcome not in market_data[condition_id]["outcome_traders"]:
-                        market_data[condition_id]["outcome_traders"][outcome] = []
-                    if trader_name not in market_data[condition_id]["outcome_traders"][outcome]:
-                        market_data[condition_id]["outcome_traders"][outcome].append(trader_name)
-                    
-                    # Track detailed trader info (size, price, rating)
-                    if outcome not in market_data[condition_id]["outcome_traders_detailed"]:
-                        market_data[condition_id]["outcome_traders_detailed"][outcome] = {}
-                    
-                    trader_size = trade.get("size", 0)
-                    trader_price = trade.get("price", 0.5)
-                    trader_rating = TRADER_RATINGS.get(trader_name, "-")
-                    trader_side = trade.get("side", "BUY")  # BUY or SELL
-                    
-                    if trader_name not in market_data[condition_id]["outcome_traders_detailed"][outcome]:
-                        market_data[condition_id]["outcome_traders_detailed"][outcome][trader_name] = {
-                            "size": 0,
-                            "price": 0,
-                            "rating": trader_rating,
-                            "count": 0,
-                            "sides": []  # Track BUY/SELL
-                        }
-                    
-                    market_data[condition_id]["outcome_traders_detailed"][outcome][trader_name]["size"] += trader_size
-                    market_data[condition_id]["outcome_traders_detailed"][outcome][trader_name]["price"] = trader_price
-                    market_data[condition_id]["outcome_traders_detailed"][outcome][trader_name]["count"] += 1
-                    market_data[condition_id]["outcome_traders_detailed"][outcome][trader_name]["sides"].append(trader_side)
+        Args:
+            entry: Market aggregate from new_market_entry()
+            wallet: Wallet address that made the trade
+            trade: Trade dictionary
+            market: Market metadata (title, slug)
+        """
+        condition_id = trade.get("conditionId")
+        outcome = trade.get("outcome", "").upper()
+        if wallet not in entry["wallet_outcomes"]:
+            entry["wallet_outcomes"][wallet] = set()
+        entry["wallet_outcomes"][wallet].add(outcome)
         
-        return market_data
+        # Update market data
+        if not entry["market_title"]:
+            entry["market_title"] = market.get("title", "N/A")
+            entry["market_id"] = condition_id
+            entry["slug"] = market.get("slug", "")
+        
+        # Track most recent trade timestamp for this market
+        trade_ts = trade.get("timestamp", 0)
+        if trade_ts > entry["latest_timestamp"]:
+            entry["latest_timestamp"] = trade_ts
+            entry["latest_fetched_at"] = time.time()
+        
+        # Collect entry price
+        price = trade.get("price", 0)
+        if price:
+            entry["prices"].add(price)
+        
+        # Count votes (outcome can be Yes/No or team name for sports/esports)
+        # For binary markets: YES/NO
+        # For multi-outcome: team name or outcome text
+        if outcome in ["YES", "YES "]:
+            if wallet not in entry["yes_wallets"]:
+                entry["yes_wallets"].add(wallet)
+                entry["yes_count"] += 1
+        elif outcome in ["NO", "NO "]:
+            if wallet not in entry["no_wallets"]:
+                entry["no_wallets"].add(wallet)
+                entry["no_count"] += 1
+        else:
+            # For non-binary outcomes (team names, etc), count as YES vote
+            if wallet not in entry["yes_wallets"]:
+                entry["yes_wallets"].add(wallet)
+                entry["yes_count"] += 1
+            
+            # Track the actual outcome
+            if outcome not in entry["outcome_votes"]:
+                entry["outcome_votes"][outcome] = 0
+            entry["outcome_votes"][outcome] += 1
+            
+            # Track trader name per outcome
+            trader_name = trade.get("name") or trade.get("pseudonym") or wallet[:8]
+            if outcome not in entry["outcome_traders"]:
+                entry["outcome_traders"][outcome] = []
+            if trader_name not in entry["outcome_traders"][outcome]:
+                entry["outcome_traders"][outcome].append(trader_name)
+            
+            # Track detailed trader info (size, price, rating)
+            if outcome not in entry["outcome_traders_detailed"]:
+                entry["outcome_traders_detailed"][outcome] = {}
+            
+            trader_size = trade.get("size", 0)
+            trader_price = trade.get("price", 0.5)
+            trader_rating = get_trader_rating(trader_name, "-")
+            trader_side = trade.get("side", "BUY")  # BUY or SELL
+            
+            if trader_name not in entry["outcome_traders_detailed"][outcome]:
+                entry["outcome_traders_detailed"][outcome][trader_name] = {
+                    "size": 0,
+                    "price": 0,
+                    "rating": trader_rating,
+                    "count": 0,
+                    "sides": set(),  # Track BUY/SELL
+                }
+            
+            entry["outcome_traders_detailed"][outcome][trader_name]["size"] += trader_size
+            entry["outcome_traders_detailed"][outcome][trader_name]["price"] = trader_price
+            entry["outcome_traders_detailed"][outcome][trader_name]["count"] += 1
+            entry["outcome_traders_detailed"][outcome][trader_name]["sides"].add(trader_side)
     
     def filter_traders_on_both_sides(
         self,
@@ -334,30 +498,31 @@ class TradeProcessor:
         market_data: Dict[str, Dict[str, Any]],
         max_spread: float,
         min_prices: int,
+        max_stddev: Optional[float] = None,
     ) -> Dict[str, Dict[str, Any]]:
         """
         Remove markets where at least one outcome has a large entry-price spread.
 
         This catches fast-moving / highly volatile markets where traders entered
-        at very different prices in a short window.
+        at very different prices in a short window. Spread and standard deviation
+        are taken over the latest price of each trader the earlier stages kept
+        (see outcome_price_stats), and outcomes with fewer than `min_prices`
+        such traders are not checked.
         """
         filtered = {}
         for market_id, data in market_data.items():
             outcome_traders = data.get("outcome_traders_detailed", {})
             is_volatile = False
 
-            for _, traders_dict in outcome_traders.items():
-                prices = [
-                    info.get("price")
-                    for info in traders_dict.values()
-                    if isinstance(info.get("price"), (int, float))
-                ]
-
-                if len(prices) < min_prices:
+            for traders in outcome_traders.values():
+                stats = outcome_price_stats(traders)
+                if stats.count < min_prices:
                     continue
 
-                spread = max(prices) - min(prices)
-                if spread > max_spread:
+                if stats.spread > max_spread:
+                    is_volatile = True
+                    break
+                if max_stddev is not None and stats.stddev > max_stddev:
                     is_volatile = True
                     break
 
@@ -368,24 +533,27 @@ class TradeProcessor:
     
     def filter_by_minimum_wallets(
         self,
-        market_data: Dict[str, Dict[str, Any]]
+        market_data: Dict[str, Dict[str, Any]],
+        min_wallets: Optional[int] = None
     ) -> Dict[str, Dict[str, Any]]:
         """
         Filter markets to only include those with >= min_wallets involved.
         
         Args:
             market_data: Market data dictionary
+            min_wallets: Minimum wallets (defaults to the processor's)
             
         Returns:
             Filtered market data
         """
+        min_wallets = self.min_wallets if min_wallets is None else min_wallets
         filtered = {}
         for market_id, data in market_data.items():
             if data.get("wallet_outcomes"):
                 total_wallets = len(data["wallet_outcomes"].keys())
             else:
-                total_wallets = len(set(data["yes_wallets"] + data["no_wallets"]))
-            if total_wallets >= self.min_wallets:
+                total_wallets = len(data["yes_wallets"] | data["no_wallets"])
+            if total_wallets >= min_wallets:
                 data["total_wallets"] = total_wallets
                 filtered[market_id] = data
         
@@ -502,48 +670,131 @@ class TradeProcessor:
         
         return filtered
     
-    def get_market_live_status(self, slug: str) -> Dict[str, bool]:
+    def get_market_live_status(self, slug: str, timeout: float = 5.0) -> Dict[str, bool]:
         """
-        Fetch current market status (resolved/closed) from polymarket.com page.
+        Fetch current market status (resolved/closed).
+
+        The structured status API is tried first; if it is not configured or
+        has no answer, the polymarket.com market page is streamed and scanned
+        until both flags have been seen. Answers are cached (see
+        cache_live_status); a failed check counts as not live but is not
+        cached, so the market is checked again next time.
         
         Args:
             slug: Market URL slug
+            timeout: Seconds to wait for each request
             
         Returns:
             Dict with 'resolved' and 'closed' booleans
         """
         if not slug:
             return {"resolved": False, "closed": False}
+
+        with trace_span("status_check", "status", slug=slug) as span:
+            try:
+                # Other instances sharing the cache reuse this answer
+                status = shared_fetch("status", slug, lambda: self._fetch_live_status(slug, timeout), wait=timeout)
+            except Exception as e:
+                logger.debug(f"Error fetching market status for {slug}: {e}")
+                # On error, assume market is not live
+                status = {"resolved": True, "closed": True}
+            else:
+                self.cache_live_status(slug, status)
+            if span is not None:
+                span.update(status)
+        return status
+
+    def _fetch_live_status(self, slug: str, timeout: float) -> Dict[str, bool]:
+        status = self.fetch_structured_market_status(slug, timeout)
+        if status is not None:
+            return status
         
         url = f"https://polymarket.com/market/{slug}"
-        try:
-            headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
-            resp = requests.get(url, headers=headers, timeout=5)
-            
-            if resp.status_code != 200:
+        headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+        with self.http.get(url, headers=headers, timeout=timeout, stream=True, hedge=True) as resp:
+            if resp.status_code in (404, 410):
                 # Page doesn't exist = market removed/archived
                 return {"resolved": True, "closed": True}
-            
-            text = resp.text
-            
-            # Extract resolved and closed status from HTML
-            resolved = False
-            closed = False
-            
-            resolved_match = re.search(r'"resolved"\s*:\s*(true|false)', text, re.IGNORECASE)
-            if resolved_match:
-                resolved = resolved_match.group(1).lower() == 'true'
-            
-            closed_match = re.search(r'"closed"\s*:\s*(true|false)', text, re.IGNORECASE)
-            if closed_match:
-                closed = closed_match.group(1).lower() == 'true'
-            
-            return {"resolved": resolved, "closed": closed}
-        
+            # Anything else is a failed check, which must not be cached
+            resp.raise_for_status()
+            if resp.status_code != 200:
+                raise ValueError(f"Unexpected status {resp.status_code} for market page {slug}")
+
+            return self._scan_status_flags(resp.iter_content(chunk_size=STATUS_SCAN_CHUNK_SIZE))
+
+    def fetch_structured_market_status(self, slug: str, timeout: float = 5.0) -> Optional[Dict[str, bool]]:
+        """
+        Look up market status from the JSON markets API.
+
+        Args:
+            slug: Market URL slug
+            timeout: Seconds to wait for the response
+
+        Returns:
+            Dict with 'resolved' and 'closed' booleans, or None if the
+            structured source is disabled or doesn't know the market
+        """
+        if not MARKET_STATUS_API:
+            return None
+
+        try:
+            resp = self.http.get(MARKET_STATUS_API, params={"slug": slug}, timeout=timeout, hedge=True)
+            resp.raise_for_status()
+            markets = resp.json()
         except Exception as e:
-            logger.debug(f"Error fetching market status for {slug}: {e}")
-            # On error, assume market is not live
-            return {"resolved": True, "closed": True}
+            logger.debug(f"Structured status lookup failed for {slug}: {e}")
+            return None
+
+        if isinstance(markets, dict):
+            markets = [markets]
+        if not markets:
+            return None
+
+        market = markets[0]
+        resolved = bool(market.get("resolved", False)) or (
+            str(market.get("umaResolutionStatus", "")).lower() == "resolved"
+        )
+        closed = bool(market.get("closed", False)) or bool(market.get("archived", False))
+        return {"resolved": resolved, "closed": closed}
+
+    @staticmethod
+    def _scan_status_flags(chunks) -> Dict[str, bool]:
+        """
+        Scan streamed page chunks for the "resolved"/"closed" JSON flags.
+
+        Stops reading as soon as both flags have been found; a small tail of
+        the previous chunk is kept so matches split across chunks are caught.
+        Bytes are decoded incrementally, so a multibyte character split
+        across chunks is decoded once both halves have arrived.
+
+        Args:
+            chunks: Iterable of bytes/str chunks
+
+        Returns:
+            Dict with 'resolved' and 'closed' booleans (False when not found)
+        """
+        found = {}
+        tail = ""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if isinstance(chunk, bytes):
+                chunk = decoder.decode(chunk)
+            window = tail + chunk
+
+            for flag in ("resolved", "closed"):
+                if flag in found:
+                    continue
+                match = STATUS_FLAG_PATTERNS[flag].search(window)
+                if match:
+                    found[flag] = match.group(1).lower() == "true"
+
+            if len(found) == 2:
+                break
+            tail = window[-STATUS_SCAN_OVERLAP:]
+
+        return {"resolved": found.get("resolved", False), "closed": found.get("closed", False)}
     
     def check_external_result(self, title: str) -> bool:
         """
@@ -601,28 +852,15 @@ class TradeProcessor:
             Processed and filtered market data
         """
         # Extract all markets from trades, filtering by minimum size ($10)
-        MIN_BET_SIZE = 10
         all_trades = []
         trader_stats = {}  # Track per-trader stats
-        game_number_pattern = re.compile(r"\bgame\s*\d+\b", re.IGNORECASE)
-        map_number_pattern = re.compile(r"\bmap\s*\d+\b", re.IGNORECASE)
         
         for wallet, trades in wallet_trades.items():
             for trade in trades:
-                # Optionally restrict to markets whose title matches a keyword
-                title = trade.get("title", "").lower()
-                if game_number_pattern.search(title) or map_number_pattern.search(title):
+                if not self.is_signal_trade(trade):
                     continue
-                if ONLY_SHOW_MARKET_KEYWORDS:
-                    if not any(k.lower() in title for k in ONLY_SHOW_MARKET_KEYWORDS):
-                        # Skip trades that are not in the requested market categories
-                        continue
                 size = trade.get("size", 0)
                 
-                # Filter out small bets
-                if size < MIN_BET_SIZE:
-                    continue
-                
                 all_trades.append(trade)
                 
                 # Track trader stats
@@ -664,48 +902,147 @@ class TradeProcessor:
 
         # Group trades by market and count (market_data entries include slug)
         market_data = self.group_trades_by_market(wallet_trades, live_markets)
+        return self.filter_markets(market_data)
 
-        # Filter by minimum wallets
-        filtered_data = self.filter_by_minimum_wallets(market_data)
-        if not filtered_data:
-            return {}
+    def build_filter_chain(self, profile: Optional[FilterProfile] = None) -> FilterChain:
+        """
+        Build the market/trader filter chain for a filter profile.
 
-        # Filter by minimum bet size per trader
-        filtered_data = self.filter_by_minimum_bet_size(filtered_data)
-        if not filtered_data:
-            return {}
+        Stages are listed in their reference order. Trader-level stages
+        rewrite outcome_traders_detailed and keep their relative order; the
+        market-level checks on time, title and slug only read fields fixed at
+        grouping time, so the chain is free to run them wherever they are
+        cheapest.
         
-        # Remove traders who betted on both outcomes (no signal)
-        filtered_data = self.filter_traders_on_both_sides(filtered_data)
-        if not filtered_data:
-            return {}
+        Args:
+            profile: Filter thresholds (defaults to the config values and
+                this processor's min_wallets)
+            
+        Returns:
+            FilterChain over the configured filters
+        """
+        profile = profile or FilterProfile(min_wallets=self.min_wallets)
+        TRADERS = "outcome_traders_detailed"
+        stages = [
+            FilterStage("minimum_wallets", partial(self.filter_by_minimum_wallets, min_wallets=profile.min_wallets),
+                        reads={"wallet_outcomes", "yes_wallets", "no_wallets"}, writes={"total_wallets"}),
+            FilterStage("minimum_bet_size", self.filter_by_minimum_bet_size,
+                        reads={TRADERS}, writes={TRADERS}),
+            # Remove traders who betted on both outcomes (no signal)
+            FilterStage("both_sides", self.filter_traders_on_both_sides,
+                        reads={TRADERS}, writes={TRADERS}),
+            # Remove traders who have exited their position (bought and sold)
+            FilterStage("exits", self.filter_traders_with_exits,
+                        reads={TRADERS}, writes={TRADERS}),
+        ]
+        if profile.volatility_filter:
+            volatility = partial(
+                self.filter_volatile_markets,
+                max_spread=profile.max_price_spread,
+                min_prices=profile.min_prices_for_volatility,
+                max_stddev=profile.max_price_stddev,
+            )
+            stages.append(FilterStage("volatility", volatility, reads={TRADERS}))
+        stages += [
+            # Majority vote runs after all trader-level filters, so markets
+            # that become 1v1 later in the pipeline don't slip through
+            FilterStage("majority_vote", partial(self.filter_majority_markets, threshold=profile.majority_threshold),
+                        reads={TRADERS}),
+            FilterStage("wallet_recount", partial(self.filter_by_surviving_wallets, min_wallets=profile.min_wallets),
+                        reads={TRADERS}, writes={"total_wallets"}),
+        ]
+        if profile.keywords:
+            stages.append(FilterStage("keywords", partial(self.filter_by_keywords, keywords=profile.keywords),
+                                      reads={"market_title"}))
+        if profile.max_market_age_hours is not None:
+            stages.append(FilterStage("market_age",
+                                      partial(self.filter_by_market_age, max_age_hours=profile.max_market_age_hours),
+                                      reads={"latest_timestamp"}))
+        if CHECK_EXTERNAL_RESULTS:
+            stages.append(FilterStage("external_results", self.filter_by_external_results,
+                                      reads={"market_title"}))
+        stages.append(FilterStage("live_status", self.filter_by_live_status, reads={"slug"}))
+        return FilterChain(stages, adaptive=ADAPTIVE_FILTER_ORDER, pair_field=TRADERS)
+
+    def filter_markets(
+        self,
+        market_data: Dict[str, Dict[str, Any]],
+        profile: Optional[FilterProfile] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Run the market/trader filter chain over grouped market data.
         
-        # Remove traders who have exited their position (bought and sold)
-        filtered_data = self.filter_traders_with_exits(filtered_data)
-        if not filtered_data:
-            return {}
+        The input is not modified beyond total_wallets, so the same grouped
+        data can be filtered under several profiles.
+        
+        Args:
+            market_data: Grouped market data from group_trades_by_market
+            profile: Filter profile (None = the default chain)
+            
+        Returns:
+            Filtered market data
+        """
+        if profile is None:
+            return self.filter_chain.run(market_data)
+        chain = self.profile_chains.get(profile.name)
+        if chain is None:
+            chain = self.profile_chains[profile.name] = self.build_filter_chain(profile)
+        logger.info(f"Filtering {len(market_data)} markets for profile {profile.name}")
+        return chain.run(market_data)
 
-        # Remove highly volatile markets based on outcome entry-price spread
-        if ENABLE_VOLATILITY_FILTER:
-            filtered_data = self.filter_by_outcome_price_volatility(
-                filtered_data,
-                max_spread=MAX_OUTCOME_PRICE_SPREAD,
-                min_prices=MIN_PRICES_FOR_VOLATILITY_CHECK,
-            )
-            logger.info(f"{len(filtered_data)} markets remain after volatility filtering")
-            if not filtered_data:
-                return {}
-
-        # Filter by majority vote (65%+ on one side) after all trader-level filters.
-        # This prevents markets that become 1v1 later in the pipeline from slipping through.
-        filtered_data = self.filter_by_majority_vote(filtered_data, threshold=0.65)
-        if not filtered_data:
-            return {}
+    def filter_volatile_markets(
+        self,
+        market_data: Dict[str, Dict[str, Any]],
+        max_spread: float = MAX_OUTCOME_PRICE_SPREAD,
+        min_prices: int = MIN_PRICES_FOR_VOLATILITY_CHECK,
+        max_stddev: Optional[float] = MAX_OUTCOME_PRICE_STDDEV,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Remove highly volatile markets based on outcome entry-price spread."""
+        filtered_data = self.filter_by_outcome_price_volatility(
+            market_data,
+            max_spread=max_spread,
+            min_prices=min_prices,
+            max_stddev=max_stddev,
+        )
+        logger.info(f"{len(filtered_data)} markets remain after volatility filtering")
+        return filtered_data
+
+    def filter_majority_markets(
+        self,
+        market_data: Dict[str, Dict[str, Any]],
+        threshold: float = MAJORITY_THRESHOLD
+    ) -> Dict[str, Dict[str, Any]]:
+        """Filter by majority vote (MAJORITY_THRESHOLD+ on one side)."""
+        filtered_data = self.filter_by_majority_vote(market_data, threshold=threshold)
         logger.info(f"{len(filtered_data)} markets remain after majority-vote filtering")
+        return filtered_data
 
-        # Refresh total_wallets based on currently surviving traders.
-        # This avoids stale counts from earlier in the pipeline.
-        for _, data in filtered_data.items():
+    def filter_by_keywords(
+        self,
+        market_data: Dict[str, Dict[str, Any]],
+        keywords: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Keep markets whose title contains any of the keywords (case-insensitive)."""
+        filtered_data = {
+            mid: data
+            for mid, data in market_data.items()
+            if any(k.lower() in data.get("market_title", "").lower() for k in keywords)
+        }
+        logger.info(f"{len(filtered_data)} markets remain after keyword filtering")
+        return filtered_data
+
+    def filter_by_surviving_wallets(
+        self,
+        market_data: Dict[str, Dict[str, Any]],
+        min_wallets: Optional[int] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Refresh total_wallets from the traders that survived the trader-level
+        filters and re-apply the minimum-wallet rule. Without this, markets
+        can shrink to 1 wallet and still pass through.
+        """
+        min_wallets = self.min_wallets if min_wallets is None else min_wallets
+        for _, data in market_data.items():
             outcome_traders = data.get("outcome_traders_detailed", {})
             unique_traders = {
                 trader_name
@@ -714,66 +1051,96 @@ class TradeProcessor:
             }
             data["total_wallets"] = len(unique_traders)
 
-        # Re-apply minimum-wallet rule after trader-level filters.
-        # Without this, markets can shrink to 1 wallet and still pass through.
-        filtered_data = {
+        return {
             mid: data
-            for mid, data in filtered_data.items()
-            if data.get("total_wallets", 0) >= self.min_wallets
+            for mid, data in market_data.items()
+            if data.get("total_wallets", 0) >= min_wallets
         }
-        if not filtered_data:
-            return {}
-
 
-        
-        # Filter by trade age if MAX_MARKET_AGE_HOURS is set
-        if MAX_MARKET_AGE_HOURS is not None:
-            current_time = time.time()
-            max_age_seconds = MAX_MARKET_AGE_HOURS * 3600
-            age_filtered = {}
-            for mid, data in filtered_data.items():
-                latest_ts = data.get("latest_timestamp", 0)
-                age_seconds = current_time - latest_ts
-                age_hours = age_seconds / 3600
-                
-                if age_seconds <= max_age_seconds:
-                    age_filtered[mid] = data
-                    logger.debug(f"✓ {mid} has recent trade ({age_hours:.1f}h ago)")
-                else:
-                    logger.info(f"✗ {mid} filtered: last trade {age_hours:.1f}h ago (limit: {MAX_MARKET_AGE_HOURS}h)")
-            
-            filtered_data = age_filtered
-            logger.info(f"{len(filtered_data)} markets remain after time-based filtering")
+    def filter_by_market_age(
+        self,
+        market_data: Dict[str, Dict[str, Any]],
+        max_age_hours: float = MAX_MARKET_AGE_HOURS
+    ) -> Dict[str, Dict[str, Any]]:
+        """Filter by trade age (MAX_MARKET_AGE_HOURS)."""
+        current_time = time.time()
+        max_age_seconds = max_age_hours * 3600
+        age_filtered = {}
+        for mid, data in market_data.items():
+            latest_ts = data.get("latest_timestamp", 0)
+            age_seconds = current_time - latest_ts
+            age_hours = age_seconds / 3600
             
-            if not filtered_data:
-                return {}
+            if age_seconds <= max_age_seconds:
+                age_filtered[mid] = data
+                logger.debug(f"✓ {mid} has recent trade ({age_hours:.1f}h ago)")
+            else:
+                logger.info(f"✗ {mid} filtered: last trade {age_hours:.1f}h ago (limit: {max_age_hours}h)")
         
-        # Check external sources to filter out markets that are actually finished
-        if CHECK_EXTERNAL_RESULTS:
-            external_filtered = {}
-            for mid, data in filtered_data.items():
-                title = data.get("market_title", "")
-                if self.check_external_result(title):
-                    logger.info(f"✗ {title[:80]} - appears finished based on external check")
-                else:
-                    external_filtered[mid] = data
-            
-            filtered_data = external_filtered
-            logger.info(f"{len(filtered_data)} markets remain after external result filtering")
-            
-            if not filtered_data:
-                return {}
+        logger.info(f"{len(age_filtered)} markets remain after time-based filtering")
+        return age_filtered
+
+    def filter_by_external_results(
+        self,
+        market_data: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Check external sources to filter out markets that are actually finished."""
+        external_filtered = {}
+        for mid, data in market_data.items():
+            title = data.get("market_title", "")
+            if self.check_external_result(title):
+                logger.info(f"✗ {title[:80]} - appears finished based on external check")
+            else:
+                external_filtered[mid] = data
         
-        # Further filter by checking LIVE status from market pages (optional)
+        logger.info(f"{len(external_filtered)} markets remain after external result filtering")
+        return external_filtered
+
+    def filter_by_live_status(
+        self,
+        market_data: Dict[str, Dict[str, Any]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Further filter by LIVE status (optional).
+
+        Status flags come from one batched metadata lookup for all markets;
+        only markets it doesn't know fall back to the market page. Markets
+        past their end date by MARKET_EXPIRY_GRACE_HOURS are dropped too.
+
+        Once the deadline has passed, markets without a fresh status use a
+        stale cached one, or are kept unchecked; both are recorded in
+        stale_markets.
+        """
+        metadata = self.metadata.fetch(list(market_data)) if CHECK_LIVE_STATUS else {}
+        now = time.time()
         live_only = {}
-        for mid, data in filtered_data.items():
+        for mid, data in market_data.items():
             slug = data.get("slug")
             if not slug:
                 logger.debug(f"Skipping {mid} — no slug to check live status")
                 continue
             if CHECK_LIVE_STATUS:
-                # Fetch current market status from page
-                status = self.get_market_live_status(slug)
+                meta = metadata.get(mid)
+                if meta is not None and is_expired(meta, now):
+                    logger.info(f"✗ {mid} NOT LIVE: past end date (slug={slug})")
+                    continue
+                # Use metadata or a status fetched ahead of time if there is
+                # one, otherwise fetch current market status from page
+                status = meta if meta is not None else self.get_cached_live_status(slug)
+                remaining = None if self.deadline is None else self.deadline - time.monotonic()
+                if status is None and remaining is not None and remaining <= 0:
+                    status = self.get_cached_live_status(slug, allow_stale=True)
+                    if status is None:
+                        # Out of time: keep the market, flagged as unchecked
+                        self.stale_markets[mid] = "status unchecked"
+                        live_only[mid] = data
+                        continue
+                    self.stale_markets[mid] = "stale status"
+                elif status is None:
+                    timeout = 5.0 if remaining is None else max(0.5, min(5.0, remaining))
+                    status = self.get_market_live_status(slug, timeout=timeout)
+                    # Polite but faster pacing
+                    time.sleep(0.05)
 
                 # Only include if NOT resolved AND NOT closed (i.e., LIVE)
                 if not status["resolved"] and not status["closed"]:
@@ -786,9 +1153,6 @@ class TradeProcessor:
                     if status["closed"]:
                         reason.append("closed")
                     logger.info(f"✗ {mid} NOT LIVE: {', '.join(reason)} (slug={slug})")
-
-                # Polite but faster pacing
-                time.sleep(0.05)
             else:
                 # If not checking page status, include the market as-is
                 live_only[mid] = data
@@ -0,0 +1,172 @@
+"""CPU and memory profiling for a full run (main.py --profile)."""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+_active: Optional["RunProfiler"] = None
+
+
+def profile_phase(name: str):
+    """
+    Context manager marking a pipeline phase (fetch, process, render) for
+    memory profiling. Does nothing unless a RunProfiler is running.
+
+    Args:
+        name: Phase name
+    """
+    if _active is None:
+        return nullcontext()
+    return _active.phase(name)
+
+
+class RunProfiler:
+    """
+    Profiles a whole run.
+
+    - cProfile on the main thread, written as a pstats file (cpu.prof, load
+      with `python -m pstats`) and a text report sorted by cumulative time
+      (cpu.txt).
+    - A sampling thread that records every thread's stack at a fixed interval
+      and writes them in collapsed "frame;frame;frame count" form
+      (stacks.txt) for flamegraph.pl / speedscope. This also covers the
+      fetch worker threads, which cProfile does not see.
+    - tracemalloc snapshots around each phase, reporting its peak traced
+      memory and top allocation sites (memory.txt).
+    """
+
+    def __init__(self, output_dir: str, sample_interval: float = 0.005, top_n: int = 15):
+        """
+        Initialize the profiler.
+
+        Args:
+            output_dir: Directory for report files (created if missing)
+            sample_interval: Seconds between stack samples
+            top_n: Allocation sites / functions to list per report
+        """
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.top_n = top_n
+
+        self.cpu = cProfile.Profile()
+        self.stacks: Counter = Counter()
+        self.phases: Dict[str, Dict[str, Any]] = defaultdict(lambda: {
+            "runs": 0,
+            "seconds": 0.0,
+            "peak": 0,
+            "sites": Counter(),
+        })
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start all profilers."""
+        global _active
+        os.makedirs(self.output_dir, exist_ok=True)
+        tracemalloc.start(10)
+        self._sampler = threading.Thread(target=self._sample, name="profiler-sampler", daemon=True)
+        self._sampler.start()
+        self.cpu.enable()
+        _active = self
+        logger.info(f"Profiling enabled, reports go to {self.output_dir}/")
+
+    def stop(self):
+        """Stop profiling and write all reports."""
+        global _active
+        self.cpu.disable()
+        _active = None
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        tracemalloc.stop()
+        self.write_reports()
+
+    def _sample(self):
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.sample_interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+                    stack.append(f"{module}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Record time, peak traced memory and allocation sites of a phase.
+
+        Args:
+            name: Phase name
+        """
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+
+            record = self.phases[name]
+            record["runs"] += 1
+            record["seconds"] += elapsed
+            record["peak"] = max(record["peak"], peak - base)
+            for stat in after.compare_to(before, "lineno")[: self.top_n * 2]:
+                if stat.size_diff > 0:
+                    frame = stat.traceback[0]
+                    record["sites"][f"{frame.filename}:{frame.lineno}"] += stat.size_diff
+
+    def write_reports(self):
+        """Write cpu.prof, cpu.txt, stacks.txt and memory.txt."""
+        prof_path = os.path.join(self.output_dir, "cpu.prof")
+        self.cpu.dump_stats(prof_path)
+
+        text = io.StringIO()
+        stats = pstats.Stats(self.cpu, stream=text)
+        stats.sort_stats("cumulative").print_stats(50)
+        stats.sort_stats("tottime").print_stats(25)
+        with open(os.path.join(self.output_dir, "cpu.txt"), "w") as f:
+            f.write(text.getvalue())
+
+        with open(os.path.join(self.output_dir, "stacks.txt"), "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        with open(os.path.join(self.output_dir, "memory.txt"), "w") as f:
+            for name, record in self.phases.items():
+                f.write(
+                    f"== {name}: {record['runs']} runs, {record['seconds']:.3f}s total, "
+                    f"peak {record['peak'] / 1024:.1f} KiB above phase start\n"
+                )
+                for site, size in record["sites"].most_common(self.top_n):
+                    f.write(f"   {size / 1024:10.1f} KiB  {site}\n")
+                f.write("\n")
+
+        for name, record in self.phases.items():
+            logger.info(
+                f"Phase {name}: {record['seconds']:.3f}s over {record['runs']} runs, "
+                f"peak {record['peak'] / 1024:.1f} KiB"
+            )
+        logger.info(f"Profile written to {self.output_dir}/ (cpu.prof, cpu.txt, stacks.txt, memory.txt)")
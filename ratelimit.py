@@ -0,0 +1,62 @@
+"""Rate limiting helpers."""
+
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens refill continuously at `rate` per second up to `burst`; each
+    acquire takes one token.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        Initialize the bucket (starts full).
+
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity (defaults to rate, minimum 1)
+        """
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens if available.
+
+        Args:
+            tokens: Number of tokens to take
+
+        Returns:
+            0.0 if the tokens were taken, otherwise seconds until they will be available
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            if self.rate <= 0:
+                return float("inf")
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0):
+        """Block until tokens are available, then take them."""
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0.0:
+                return
+            time.sleep(wait)
@@ -0,0 +1,352 @@
+"""Trader ratings computed incrementally from trades and market resolutions."""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from config import (
+    TRADER_RATINGS,
+    USE_COMPUTED_RATINGS,
+    RATING_MIN_RESOLVED_BETS,
+    RATING_PRIOR_BETS,
+    RATING_EDGE_SCALE,
+    RATINGS_STATE_PATH,
+    RATING_RESOLUTION_CHECK_SECONDS,
+    RATING_MAX_RESOLUTION_CHECKS,
+)
+from checkpoint import save_checkpoint, load_checkpoint
+from metadata import get_metadata_client
+from pipeline import trade_key
+
+logger = logging.getLogger(__name__)
+
+
+class TraderRecord:
+    """
+    Running aggregates for one trader.
+
+    Open positions are kept per (condition_id, outcome) as
+    [shares bought, cost, shares sold, proceeds]. These are plain sums, so
+    fills can be folded in any order (pages arrive newest first); PnL is
+    realized when the market resolves. Everything else is a counter that
+    settled positions are folded into.
+    """
+
+    __slots__ = (
+        "trades", "volume", "realized_pnl", "settled_cost",
+        "resolved_bets", "wins", "entry_price_sum", "brier_sum", "positions",
+    )
+
+    def __init__(self):
+        self.trades = 0
+        self.volume = 0.0
+        self.realized_pnl = 0.0
+        self.settled_cost = 0.0
+        self.resolved_bets = 0
+        self.wins = 0
+        self.entry_price_sum = 0.0
+        self.brier_sum = 0.0
+        self.positions: Dict[Tuple[str, str], List[float]] = {}
+
+    def add_trade(self, condition_id: str, outcome: str, side: str, size: float, price: float):
+        """Fold one fill into its open position."""
+        self.trades += 1
+        self.volume += size * price
+        position = self.positions.setdefault((condition_id, outcome), [0.0, 0.0, 0.0, 0.0])
+        if side == "SELL":
+            position[2] += size
+            position[3] += size * price
+        else:
+            position[0] += size
+            position[1] += size * price
+
+    def settle(self, condition_id: str, winner: str) -> bool:
+        """
+        Settle all positions in a resolved market.
+
+        Shares sold beyond what was seen bought are ignored, since their
+        cost is unknown. A position counts as a bet for hit rate and
+        calibration at its average entry price.
+
+        Args:
+            condition_id: Resolved market
+            winner: Winning outcome (upper case)
+
+        Returns:
+            True if the trader bought anything there
+        """
+        held = [key for key in self.positions if key[0] == condition_id]
+        settled = False
+        for key in held:
+            bought, cost, sold, proceeds = self.positions.pop(key)
+            if bought <= 0:
+                continue
+            if sold > bought:
+                proceeds *= bought / sold
+                sold = bought
+            won = 1 if key[1] == winner else 0
+            entry = cost / bought
+            self.realized_pnl += proceeds + (bought - sold) * won - cost
+            self.settled_cost += cost
+            self.resolved_bets += 1
+            self.wins += won
+            self.entry_price_sum += entry
+            self.brier_sum += (entry - won) ** 2
+            settled = True
+        return settled
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        return self.wins / self.resolved_bets if self.resolved_bets else None
+
+    @property
+    def edge(self) -> float:
+        """Wins minus the wins implied by entry prices, per (shrunk) bet."""
+        return (self.wins - self.entry_price_sum) / (self.resolved_bets + RATING_PRIOR_BETS)
+
+    def rating(self) -> Optional[int]:
+        """1-10 rating, or None until there are enough settled bets."""
+        if self.resolved_bets < RATING_MIN_RESOLVED_BETS:
+            return None
+        return max(1, min(10, round(5.5 + self.edge * RATING_EDGE_SCALE)))
+
+    def summary(self) -> Dict[str, Any]:
+        n = self.resolved_bets
+        return {
+            "trades": self.trades,
+            "volume": self.volume,
+            "realized_pnl": self.realized_pnl,
+            "roi": self.realized_pnl / self.settled_cost if self.settled_cost else None,
+            "resolved_bets": n,
+            "hit_rate": self.hit_rate,
+            "avg_entry_price": self.entry_price_sum / n if n else None,
+            "brier": self.brier_sum / n if n else None,
+            "edge": self.edge if n else None,
+            "rating": self.rating(),
+            "open_positions": sum(1 for position in self.positions.values() if position[0] > position[2]),
+        }
+
+
+class RatingEngine:
+    """
+    Per-trader running aggregates, updated as trades and resolutions arrive.
+
+    Trades are keyed by trader name like TRADER_RATINGS. Each fill is
+    counted once (the same trades come back on every poll), and a
+    resolution only touches the traders holding that market, so keeping
+    ratings current never rescans history.
+    """
+
+    def __init__(self):
+        self.traders: Dict[str, TraderRecord] = {}
+        # condition_id -> traders with open positions there
+        self.open_markets: Dict[str, set] = {}
+        # condition_id -> identities of the fills folded for it (dropped on resolution)
+        self.market_fills: Dict[str, set] = {}
+        # condition_id -> last time its resolution was checked
+        self.checked_at: Dict[str, float] = {}
+        # condition_id -> winning outcome
+        self.resolved: Dict[str, str] = {}
+        self.computed: Dict[str, int] = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    def record_trade(self, trader_name: str, trade: Dict[str, Any]) -> bool:
+        """
+        Fold one trade into its trader's positions.
+
+        Args:
+            trader_name: Display name the trade is attributed to
+            trade: Trade dict from the data API or trade stream
+
+        Returns:
+            True if the trade was new
+        """
+        condition_id = trade.get("conditionId")
+        if not condition_id or condition_id in self.resolved:
+            return False
+        key = trade_key(trade)
+        with self._lock:
+            fills = self.market_fills.setdefault(condition_id, set())
+            if key in fills:
+                return False
+            fills.add(key)
+            record = self.traders.get(trader_name)
+            if record is None:
+                record = self.traders[trader_name] = TraderRecord()
+            record.add_trade(
+                condition_id,
+                (trade.get("outcome") or "").upper(),
+                trade.get("side", "BUY"),
+                float(trade.get("size", 0) or 0),
+                float(trade.get("price", 0.5) or 0),
+            )
+            self.open_markets.setdefault(condition_id, set()).add(trader_name)
+            self.dirty = True
+        return True
+
+    def record_resolution(self, condition_id: str, winner: str) -> int:
+        """
+        Settle a resolved market and update the ratings of its traders.
+
+        Args:
+            condition_id: Resolved market
+            winner: Winning outcome name
+
+        Returns:
+            Number of traders whose positions were settled
+        """
+        winner = winner.upper()
+        with self._lock:
+            self.resolved[condition_id] = winner
+            self.market_fills.pop(condition_id, None)
+            self.checked_at.pop(condition_id, None)
+            settled = 0
+            for name in self.open_markets.pop(condition_id, ()):
+                record = self.traders[name]
+                if record.settle(condition_id, winner):
+                    settled += 1
+                rating = record.rating()
+                if rating is None:
+                    self.computed.pop(name, None)
+                else:
+                    self.computed[name] = rating
+            self.dirty = True
+        return settled
+
+    def refresh_resolutions(
+        self,
+        lookup: Callable[[List[str]], Dict[str, Optional[str]]],
+        max_checks: int = RATING_MAX_RESOLUTION_CHECKS,
+        check_interval: float = RATING_RESOLUTION_CHECK_SECONDS,
+    ) -> int:
+        """
+        Check open markets for resolutions, least recently checked first.
+
+        Args:
+            lookup: Maps a list of condition ids to their winning outcomes
+                (None for unresolved markets)
+            max_checks: Most markets to look up
+            check_interval: Skip markets checked more recently than this
+
+        Returns:
+            Number of markets newly resolved
+        """
+        now = time.time()
+        with self._lock:
+            due = [cid for cid in self.open_markets if now - self.checked_at.get(cid, 0) >= check_interval]
+            due.sort(key=lambda cid: self.checked_at.get(cid, 0))
+        due = due[:max_checks]
+        if not due:
+            return 0
+        winners = lookup(due)
+        resolved = 0
+        for condition_id in due:
+            self.checked_at[condition_id] = now
+            winner = winners.get(condition_id)
+            if winner:
+                self.record_resolution(condition_id, winner)
+                resolved += 1
+        if resolved:
+            logger.info(f"Settled {resolved} resolved markets, {len(self.computed)} traders now rated")
+        return resolved
+
+    def rating(self, trader_name: str, default=None):
+        """Computed rating of a trader, or `default` if not rated yet."""
+        return self.computed.get(trader_name, default)
+
+    def summary_records(self) -> List[Dict[str, Any]]:
+        """Per-trader aggregates, most settled bets first."""
+        with self._lock:
+            records = [{"trader": name, **record.summary()} for name, record in self.traders.items()]
+        records.sort(key=lambda r: (-r["resolved_bets"], r["trader"]))
+        return records
+
+    def export_state(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "traders": {
+                    name: {slot: getattr(record, slot) for slot in TraderRecord.__slots__}
+                    for name, record in self.traders.items()
+                },
+                "open_markets": self.open_markets,
+                "market_fills": self.market_fills,
+                "checked_at": self.checked_at,
+                "resolved": self.resolved,
+            }
+
+    def restore_state(self, state: Dict[str, Any]):
+        with self._lock:
+            self.traders = {}
+            for name, fields in state.get("traders", {}).items():
+                record = self.traders[name] = TraderRecord()
+                for slot, value in fields.items():
+                    setattr(record, slot, value)
+            self.open_markets = state.get("open_markets", {})
+            self.market_fills = state.get("market_fills", {})
+            self.checked_at = state.get("checked_at", {})
+            self.resolved = state.get("resolved", {})
+            self.computed = {}
+            for name, record in self.traders.items():
+                rating = record.rating()
+                if rating is not None:
+                    self.computed[name] = rating
+
+    def save(self, path: str = RATINGS_STATE_PATH):
+        """Write the engine state to `path` if it changed since the last save."""
+        if not path or not self.dirty:
+            return
+        save_checkpoint(path, self.export_state())
+        self.dirty = False
+
+    def load(self, path: str = RATINGS_STATE_PATH) -> bool:
+        """Restore the engine state from `path`; False if there is none."""
+        state = load_checkpoint(path) if path else None
+        if state is None:
+            return False
+        self.restore_state(state)
+        logger.info(f"Loaded ratings state: {len(self.traders)} traders, {len(self.computed)} rated")
+        return True
+
+
+def fetch_market_winners(condition_ids: List[str]) -> Dict[str, Optional[str]]:
+    """
+    Winning outcomes of markets, from the batched metadata lookup.
+
+    Args:
+        condition_ids: Market condition IDs
+
+    Returns:
+        Dict mapping condition_id to its winning outcome (None if unresolved
+        or unknown)
+    """
+    metadata = get_metadata_client().fetch(condition_ids)
+    return {cid: metadata.get(cid, {}).get("winner") for cid in condition_ids}
+
+
+_shared_engine: Optional[RatingEngine] = None
+_shared_lock = threading.Lock()
+
+
+def get_rating_engine() -> RatingEngine:
+    """Return the process-wide RatingEngine, creating it on first use."""
+    global _shared_engine
+    with _shared_lock:
+        if _shared_engine is None:
+            _shared_engine = RatingEngine()
+        return _shared_engine
+
+
+def get_trader_rating(trader_name: str, default=None):
+    """
+    Rating to show and score a trader with.
+
+    The computed rating when USE_COMPUTED_RATINGS is on and the trader has
+    enough settled bets, otherwise the TRADER_RATINGS entry.
+    """
+    if USE_COMPUTED_RATINGS:
+        rating = get_rating_engine().rating(trader_name)
+        if rating is not None:
+            return rating
+    return TRADER_RATINGS.get(trader_name, default)
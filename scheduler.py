@@ -0,0 +1,491 @@
+"""Adaptive per-wallet polling within a global request budget."""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+from config import (
+    POLL_INTERVAL_SECONDS,
+    POLL_BUDGET_PER_SECOND,
+    POLL_BUDGET_BURST,
+    POLL_MIN_INTERVAL_SECONDS,
+    POLL_MAX_INTERVAL_SECONDS,
+    POLL_RATE_WINDOW_SECONDS,
+    POLL_SURFACED_BOOST,
+    POLL_RESYNC_SECONDS,
+    SCORE_UNRATED_RATING,
+)
+from filter_profiles import FilterProfile
+from pipeline import TradePipeline
+from ratelimit import TokenBucket
+from ratings import get_trader_rating
+from tracing import trace_span
+
+logger = logging.getLogger(__name__)
+
+
+class WalletScheduler:
+    """
+    Decides when each wallet is polled next.
+
+    A wallet's interval is `base_interval` divided by its weight:
+
+        (1 + trades per base_interval over the last rate_window)
+        * rating / SCORE_UNRATED_RATING
+        * surfaced_boost if it holds a position in a surfaced market
+
+    clamped to [min_interval, max_interval]. The request rate the intervals
+    add up to (one request per poll) is kept at or below `budget` by
+    stretching every interval by the same factor, so an active, high-rated
+    wallet keeps its lead over a quiet one however many wallets are tracked.
+    """
+
+    def __init__(
+        self,
+        wallets: List[str],
+        base_interval: float = POLL_INTERVAL_SECONDS,
+        budget: float = POLL_BUDGET_PER_SECOND,
+        min_interval: float = POLL_MIN_INTERVAL_SECONDS,
+        max_interval: float = POLL_MAX_INTERVAL_SECONDS,
+        rate_window: float = POLL_RATE_WINDOW_SECONDS,
+        surfaced_boost: float = POLL_SURFACED_BOOST,
+    ):
+        """
+        Initialize the scheduler; first polls are spread over each wallet's
+        initial interval.
+
+        Args:
+            wallets: Tracked wallet addresses
+            base_interval: Interval of an unrated wallet with no recent trades
+            budget: Most polls per second the intervals may add up to
+            min_interval: Shortest interval before the budget stretch
+            max_interval: Longest interval before the budget stretch
+            rate_window: Seconds of trade history the trade rate is taken over
+            surfaced_boost: Weight multiplier for wallets in surfaced markets
+        """
+        self.wallets = list(wallets)
+        self.base_interval = base_interval
+        self.budget = budget
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.rate_window = rate_window
+        self.surfaced_boost = surfaced_boost
+
+        # wallet -> timestamps of its trades within rate_window
+        self.trade_times: Dict[str, List[float]] = {wallet: [] for wallet in self.wallets}
+        # wallet -> trader name, for the rating lookup
+        self.names: Dict[str, str] = {}
+        self.surfaced: set = set()
+        # wallet -> interval before the budget stretch, and their summed rates
+        self.intervals: Dict[str, float] = {}
+        self.demand = 0.0
+        # wallet -> time it is due; heap entries not matching it are stale
+        self.due: Dict[str, float] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+        now = time.time()
+        count = max(1, len(self.wallets))
+        for wallet in self.wallets:
+            self._set_interval(wallet)
+        for i, wallet in enumerate(self.wallets):
+            self._push(wallet, now + self.interval(wallet) * i / count)
+
+    def weight(self, wallet: str, now: Optional[float] = None) -> float:
+        """Polling weight of a wallet (see the class docstring)."""
+        now = time.time() if now is None else now
+        recent = [t for t in self.trade_times.get(wallet, []) if t >= now - self.rate_window]
+        activity = 1.0 + len(recent) * self.base_interval / self.rate_window
+        rating = get_trader_rating(self.names.get(wallet, ""), default=SCORE_UNRATED_RATING)
+        weight = activity * max(rating, 1) / SCORE_UNRATED_RATING
+        if wallet in self.surfaced:
+            weight *= self.surfaced_boost
+        return weight
+
+    @property
+    def stretch(self) -> float:
+        """Factor every interval is stretched by to stay within the budget."""
+        if self.budget <= 0:
+            return 1.0
+        return max(1.0, self.demand / self.budget)
+
+    def interval(self, wallet: str) -> float:
+        """Seconds between polls of a wallet, within the budget."""
+        return self.intervals[wallet] * self.stretch
+
+    def _set_interval(self, wallet: str, now: Optional[float] = None):
+        interval = self.base_interval / self.weight(wallet, now)
+        interval = min(self.max_interval, max(self.min_interval, interval))
+        self.demand += 1.0 / interval - 1.0 / self.intervals.get(wallet, float("inf"))
+        self.intervals[wallet] = interval
+
+    def _push(self, wallet: str, due_at: float):
+        self.due[wallet] = due_at
+        heapq.heappush(self._heap, (due_at, next(self._counter), wallet))
+
+    def next_due(self) -> Optional[float]:
+        """When the next wallet is due (None if all are being polled)."""
+        with self._lock:
+            while self._heap and self.due.get(self._heap[0][2]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> Optional[str]:
+        """
+        Take the most overdue wallet, if any is due. It is not scheduled
+        again until record_poll() is called for it.
+
+        Args:
+            now: Current Unix time
+
+        Returns:
+            Wallet address, or None if nothing is due yet
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            while self._heap:
+                due_at, _, wallet = self._heap[0]
+                if self.due.get(wallet) != due_at:
+                    heapq.heappop(self._heap)
+                    continue
+                if due_at > now:
+                    return None
+                heapq.heappop(self._heap)
+                del self.due[wallet]
+                return wallet
+        return None
+
+    def record_poll(
+        self,
+        wallet: str,
+        trades: Iterable[Dict[str, Any]],
+        now: Optional[float] = None,
+    ):
+        """
+        Update a wallet's trade rate from a poll and schedule its next one.
+
+        Args:
+            wallet: Wallet that was polled
+            trades: Trades the poll returned (old ones included; only their
+                timestamps are counted, each once)
+            now: Current Unix time
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            times = set(self.trade_times.get(wallet, []))
+            for trade in trades:
+                timestamp = trade.get("timestamp")
+                if timestamp is not None and timestamp >= now - self.rate_window:
+                    times.add(timestamp)
+                name = trade.get("name") or trade.get("pseudonym")
+                if name:
+                    self.names[wallet] = name
+            self.trade_times[wallet] = sorted(t for t in times if t >= now - self.rate_window)
+            self._set_interval(wallet, now)
+            self._push(wallet, now + self.interval(wallet))
+
+    def set_surfaced(self, wallets: Iterable[str], now: Optional[float] = None):
+        """
+        Mark the wallets holding positions in currently surfaced markets.
+        Newly marked wallets are brought forward to their shorter interval.
+
+        Args:
+            wallets: Wallets in surfaced markets (replaces the previous set)
+            now: Current Unix time
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            wallets = set(wallets) & set(self.intervals)
+            changed = wallets ^ self.surfaced
+            self.surfaced = wallets
+            for wallet in changed:
+                self._set_interval(wallet, now)
+            for wallet in changed & wallets:
+                due_at = self.due.get(wallet)
+                if due_at is not None and due_at > now + self.interval(wallet):
+                    self._push(wallet, now + self.interval(wallet))
+
+    def summary(self) -> Dict[str, Any]:
+        """Demand, stretch and interval spread, for logging."""
+        with self._lock:
+            intervals = [interval * self.stretch for interval in self.intervals.values()]
+        return {
+            "wallets": len(intervals),
+            "surfaced": len(self.surfaced),
+            "demand_per_second": self.demand,
+            "budget_per_second": self.budget,
+            "stretch": self.stretch,
+            "min_interval": min(intervals, default=0.0),
+            "median_interval": statistics.median(intervals) if intervals else 0.0,
+            "max_interval": max(intervals, default=0.0),
+        }
+
+
+class AdaptivePoller:
+    """
+    Keeps a TradePipeline's aggregates current by polling each wallet on
+    its WalletScheduler interval.
+
+    A full poll seeds the state. After that, due wallets are polled
+    newest-first until a page reaches trades already seen (or one page if
+    the wallet hasn't been polled yet), and new trades are folded in through
+    TradePipeline.fold_wallet_trades. Every page takes a token from the
+    budget bucket. As with StreamingIngest, the state is rebuilt from a full
+    poll every `resync_seconds`, and finalize() can be called from any thread
+    while polling runs on its own event loop thread: folds run under `lock`
+    on a single fold thread, and finalize() filters a copy of the state.
+    """
+
+    def __init__(
+        self,
+        pipeline: TradePipeline,
+        wallets: List[str],
+        scheduler: Optional[WalletScheduler] = None,
+        budget_burst: float = POLL_BUDGET_BURST,
+        resync_seconds: Optional[float] = POLL_RESYNC_SECONDS,
+    ):
+        """
+        Initialize the poller.
+
+        Args:
+            pipeline: Pipeline whose aggregates to maintain
+            wallets: Tracked wallet addresses
+            scheduler: Scheduler to use (defaults to one over `wallets`)
+            budget_burst: Requests that may go out at once within the budget
+            resync_seconds: Rebuild the state from a full poll this often (None = never)
+        """
+        self.pipeline = pipeline
+        self.pipeline.dedupe_trades = True
+        self.wallets = list(wallets)
+        self.wallet_index = {wallet: i for i, wallet in enumerate(self.wallets)}
+        self.scheduler = scheduler or WalletScheduler(self.wallets)
+        self.bucket = TokenBucket(self.scheduler.budget, budget_burst)
+        self.resync_seconds = resync_seconds
+
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.stats = {"polls": 0, "requests": 0, "folded": 0, "errors": 0, "resyncs": 0}
+        # wallet -> newest trade timestamp folded for it
+        self.newest: Dict[str, Any] = {}
+        # Polled trades get ever smaller positions, so they rank as newer
+        # than everything fetched before them
+        self._next_position = 0
+        self._resync_buffer: Optional[List[Tuple[str, Dict[str, Any]]]] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._fold_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="adaptive-poll-fold")
+        self._stopping = False
+
+    def start(self):
+        """Start the seed poll and the polling workers on a background thread."""
+        self._thread = threading.Thread(target=self._run_loop, name="adaptive-poll", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop polling and the background thread."""
+        self._stopping = True
+        if self._loop is not None and not self._loop.is_closed():
+            try:
+                self._loop.call_soon_threadsafe(self._cancel_tasks)
+            except RuntimeError:
+                pass  # the loop finished meanwhile
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._fold_executor.shutdown(wait=False)
+
+    def _cancel_tasks(self):
+        for task in asyncio.all_tasks(self._loop):
+            task.cancel()
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._main())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    async def _main(self):
+        await self.resync()
+        self.ready.set()
+        executor = ThreadPoolExecutor(max_workers=max(1, self.pipeline.concurrency))
+        workers = [asyncio.ensure_future(self._worker(executor)) for _ in range(max(1, self.pipeline.concurrency))]
+        try:
+            while self.resync_seconds:
+                await asyncio.sleep(self.resync_seconds)
+                await self.resync()
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def finalize(self, profiles: Optional[List[FilterProfile]] = None, timeout: Optional[float] = None):
+        """
+        Filter the current state (see TradePipeline.finalize) and mark the
+        wallets in the surfaced markets for more frequent polling.
+
+        Waits for the seed poll on first use.
+
+        Args:
+            profiles: Extra filter profiles to evaluate
+            timeout: Seconds to wait for the seed poll (None = forever)
+
+        Returns:
+            Filtered market data
+        """
+        if not self.ready.wait(timeout):
+            logger.warning("Adaptive polling not seeded yet, no results this cycle")
+            return {}
+        with self.lock:
+            if self.pipeline.total_trades == 0:
+                return {}
+            snapshot = self.pipeline.snapshot()
+        # Filtering (live status checks included) runs on the copy, so polling
+        # keeps folding meanwhile
+        market_data = snapshot.finalize(profiles)
+        self.pipeline.profile_results = snapshot.profile_results
+        surfaced = set()
+        for condition_id in market_data:
+            entry = snapshot.market_data.get(condition_id, {})
+            surfaced.update(entry.get("wallet_outcomes", {}))
+        self.scheduler.set_surfaced(surfaced)
+        summary = self.scheduler.summary()
+        logger.info(
+            f"Adaptive polling: {self.stats['polls']} polls, {self.stats['requests']} requests, "
+            f"{self.stats['folded']} new trades; intervals {summary['min_interval']:.0f}s"
+            f"/{summary['median_interval']:.0f}s/{summary['max_interval']:.0f}s (min/median/max), "
+            f"{summary['surfaced']} wallets in surfaced markets, demand "
+            f"{summary['demand_per_second']:.2f}/s of {summary['budget_per_second']:.2f}/s budget"
+        )
+        return market_data
+
+    async def run_locked(self, function, *args):
+        """
+        Run function(*args) under the lock on the fold thread.
+
+        Args:
+            function: Callable touching the pipeline
+            *args: Its arguments
+
+        Returns:
+            What function returned
+        """
+        def call():
+            with self.lock:
+                return function(*args)
+
+        return await asyncio.get_running_loop().run_in_executor(self._fold_executor, call)
+
+    async def resync(self):
+        """Rebuild the aggregates from a full poll, keeping trades polled meanwhile."""
+        pipeline = self.pipeline
+        fresh = pipeline.spawn()
+        self._resync_buffer = []
+        started = time.monotonic()
+        try:
+            await fresh.fetch(self.wallets)
+        except Exception as e:
+            logger.error(f"Adaptive polling resync failed: {e}")
+            self._resync_buffer = None
+            return
+
+        # Trades polled while the full poll ran go on top of the new state;
+        # later ones are queued on the fold thread behind it
+        buffered, self._resync_buffer = self._resync_buffer, None
+
+        def adopt():
+            pipeline.adopt(fresh)
+            self._fold_all(buffered)
+
+        await self.run_locked(adopt)
+        self.stats["resyncs"] += 1
+        logger.info(
+            f"Adaptive polling state rebuilt from {fresh.total_trades} polled trades "
+            f"in {time.monotonic() - started:.1f}s ({len(buffered)} trades polled meanwhile re-applied)"
+        )
+
+    async def _worker(self, executor: ThreadPoolExecutor):
+        loop = asyncio.get_running_loop()
+        while not self._stopping:
+            wallet = self.scheduler.pop_due()
+            if wallet is None:
+                next_due = self.scheduler.next_due()
+                wait = 1.0 if next_due is None else next_due - time.time()
+                await asyncio.sleep(min(1.0, max(0.01, wait)))
+                continue
+            trades: List[Dict[str, Any]] = []
+            try:
+                with trace_span("poll_wallet", "fetch", wallet=wallet) as span:
+                    trades = await self.poll(loop, executor, wallet)
+                    if span is not None:
+                        span["trades"] = len(trades)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Polling {wallet} failed: {e}")
+            finally:
+                self.scheduler.record_poll(wallet, trades)
+
+    async def poll(self, loop, executor: ThreadPoolExecutor, wallet: str) -> List[Dict[str, Any]]:
+        """
+        Fetch a wallet's trades newer than the last poll and fold them in.
+
+        Args:
+            loop: Running event loop
+            executor: Executor the blocking requests run in
+            wallet: Wallet to poll
+
+        Returns:
+            All trades fetched (already folded ones included)
+        """
+        page_size = self.pipeline.page_size or 100
+        since = self.newest.get(wallet)
+        trades, offset = [], 0
+        while offset < self.pipeline.max_trades_per_wallet:
+            wait = self.bucket.try_acquire()
+            while wait:
+                await asyncio.sleep(wait)
+                wait = self.bucket.try_acquire()
+            page = await loop.run_in_executor(executor, self.pipeline.api.fetch_trades, wallet, page_size, offset)
+            self.stats["requests"] += 1
+            trades.extend(page)
+            offset += len(page)
+            if since is None or len(page) < page_size or min(t.get("timestamp", 0) for t in page) < since:
+                break
+        self.stats["polls"] += 1
+
+        # Oldest first, so newer trades end up with smaller positions
+        fresh = [(wallet, t) for t in reversed(trades) if since is None or t.get("timestamp", 0) >= since]
+        for _, trade in fresh:
+            trade.setdefault("proxyWallet", wallet)
+        if self._resync_buffer is not None:
+            self._resync_buffer.extend(fresh)
+        await self.run_locked(self._fold_all, fresh)
+        return trades
+
+    def _fold_all(self, trades: List[Tuple[str, Dict[str, Any]]]) -> int:
+        """Fold (wallet, trade) pairs in order (caller holds the lock); returns how many were new."""
+        return sum(self._fold(wallet, trade) for wallet, trade in trades)
+
+    def _fold(self, wallet: str, trade: Dict[str, Any]) -> bool:
+        """Fold one trade into the pipeline (caller holds the lock)."""
+        timestamp = trade.get("timestamp", 0)
+        if timestamp > self.newest.get(wallet, 0):
+            self.newest[wallet] = timestamp
+        self._next_position -= 1
+        before = self.pipeline.total_trades
+        self.pipeline.fold_wallet_trades(self.wallet_index[wallet], wallet, [trade], offset=self._next_position)
+        folded = self.pipeline.total_trades > before
+        if folded:
+            self.stats["folded"] += 1
+        return folded
@@ -0,0 +1,184 @@
+"""Signal scoring and top-K market selection."""
+
+import heapq
+import time
+from typing import Dict, List, Any, Optional, Iterator
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    SCORE_WEIGHTS,
+    SCORE_RECENCY_HALF_LIFE_HOURS,
+    SCORE_UNRATED_RATING,
+)
+
+FEATURES = ("rated_size", "majority_margin", "wallet_count", "recency")
+
+
+def market_features(
+    market_data: Dict[str, Dict[str, Any]],
+    now: Optional[float] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Compute scoring features for every market in one pass.
+
+    Traders are flattened into arrays once; per-outcome and per-market
+    aggregates are then taken with bincount/lexsort instead of Python loops.
+
+    Features (all in [0, 1]):
+        rated_size: log(1 + sum(size * rating/10)) on the majority outcome,
+            relative to the largest market
+        majority_margin: (top outcome traders - runner-up traders) / traders
+        wallet_count: log(1 + total_wallets), relative to the largest market
+        recency: 0.5 ** (hours since latest trade / SCORE_RECENCY_HALF_LIFE_HOURS)
+
+    Args:
+        market_data: Filtered market data from the processor
+        now: Reference time for recency (defaults to time.time())
+
+    Returns:
+        Dict mapping feature name to an array aligned with market_data order
+    """
+    now = time.time() if now is None else now
+    n = len(market_data)
+
+    wallets = np.zeros(n)
+    latest = np.zeros(n)
+    group_market = []   # market index per (market, outcome) group
+    trader_group = []   # group index per trader entry
+    trader_size = []
+    trader_rating = []
+
+    for m, data in enumerate(market_data.values()):
+        wallets[m] = data.get("total_wallets", 0) or 0
+        latest[m] = data.get("latest_timestamp", 0) or 0
+        for traders in data.get("outcome_traders_detailed", {}).values():
+            g = len(group_market)
+            group_market.append(m)
+            for info in traders.values():
+                rating = info.get("rating")
+                trader_group.append(g)
+                trader_size.append(info.get("size", 0) or 0)
+                trader_rating.append(rating if isinstance(rating, int) else SCORE_UNRATED_RATING)
+
+    features = {name: np.zeros(n) for name in FEATURES}
+    if n == 0:
+        return features
+
+    group_market = np.asarray(group_market, dtype=np.int64)
+    groups = len(group_market)
+    if groups:
+        trader_group = np.asarray(trader_group, dtype=np.int64)
+        rated = np.asarray(trader_size, dtype=float) * np.asarray(trader_rating, dtype=float) / 10.0
+        group_count = np.bincount(trader_group, minlength=groups).astype(float)
+        group_weight = np.bincount(trader_group, weights=rated, minlength=groups)
+
+        # Sort groups by market, then trader count, then weight: the last
+        # group of each market is its majority outcome, the one before it
+        # (if in the same market) the runner-up.
+        order = np.lexsort((group_weight, group_count, group_market))
+        gm = group_market[order]
+        gc = group_count[order]
+        gw = group_weight[order]
+        last = np.nonzero(np.r_[gm[1:] != gm[:-1], True])[0]
+        markets = gm[last]
+
+        top_count = np.zeros(n)
+        second_count = np.zeros(n)
+        majority_weight = np.zeros(n)
+        top_count[markets] = gc[last]
+        majority_weight[markets] = gw[last]
+        prev = last - 1
+        has_second = prev >= 0
+        has_second[has_second] = gm[prev[has_second]] == markets[has_second]
+        second_count[markets[has_second]] = gc[prev[has_second]]
+
+        total = np.bincount(group_market, weights=group_count, minlength=n)
+        np.divide(top_count - second_count, total, out=features["majority_margin"], where=total > 0)
+
+        log_weight = np.log1p(majority_weight)
+        if log_weight.max() > 0:
+            features["rated_size"] = log_weight / log_weight.max()
+
+    log_wallets = np.log1p(wallets)
+    if log_wallets.max() > 0:
+        features["wallet_count"] = log_wallets / log_wallets.max()
+
+    age_hours = np.maximum(now - latest, 0) / 3600.0
+    features["recency"] = np.power(0.5, age_hours / SCORE_RECENCY_HALF_LIFE_HOURS)
+    return features
+
+
+def score_markets(
+    market_data: Dict[str, Dict[str, Any]],
+    weights: Optional[Dict[str, float]] = None,
+    now: Optional[float] = None,
+) -> Dict[str, float]:
+    """
+    Weighted signal score per market.
+
+    Args:
+        market_data: Filtered market data from the processor
+        weights: Feature weights (defaults to SCORE_WEIGHTS)
+        now: Reference time for recency
+
+    Returns:
+        Dict mapping condition_id to score
+    """
+    weights = SCORE_WEIGHTS if weights is None else weights
+    features = market_features(market_data, now=now)
+    scores = np.zeros(len(market_data))
+    for name, weight in weights.items():
+        if weight:
+            scores += weight * features[name]
+    return dict(zip(market_data.keys(), scores.tolist()))
+
+
+def top_k_indices(scores: List[float], k: Optional[int]) -> List[int]:
+    """
+    Indices of the k highest scores, best first, via a bounded heap
+    (O(n log k)). Ties keep the original order.
+
+    Args:
+        scores: Scores in original order
+        k: Number to select (None = all)
+
+    Returns:
+        List of indices into scores
+    """
+    n = len(scores)
+    k = n if k is None else min(k, n)
+    return heapq.nlargest(k, range(n), key=lambda i: (scores[i], -i))
+
+
+def iter_ranked_indices(scores: List[float]) -> Iterator[int]:
+    """
+    Lazily yield indices best-first (heapify once, pop on demand), for
+    callers that stop after an unknown number of matches.
+
+    Args:
+        scores: Scores in original order
+    """
+    heap = [(-score, i) for i, score in enumerate(scores)]
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)[1]
+
+
+def top_markets(df: pd.DataFrame, k: Optional[int], column: str = "Score") -> pd.DataFrame:
+    """
+    The k best rows of a results DataFrame by score, best first.
+
+    Args:
+        df: Results DataFrame (falls back to df.head(k) without a score column)
+        k: Number of rows (None = all)
+        column: Score column name
+
+    Returns:
+        DataFrame with a fresh 0..k-1 index
+    """
+    if column not in df.columns:
+        return (df if k is None else df.head(k)).reset_index(drop=True)
+    indices = top_k_indices(df[column].tolist(), k)
+    return df.iloc[indices].reset_index(drop=True)
@@ -0,0 +1,210 @@
+"""Local HTTP endpoint serving the latest analysis results from memory."""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, Optional
+
+import pandas as pd
+
+from http_client import get_http_client
+from latency import get_latency_tracker
+from ratings import get_trader_rating
+
+logger = logging.getLogger(__name__)
+
+
+class ResultsSnapshot:
+    """
+    Immutable, pre-serialized view of one analysis cycle.
+
+    Bodies and ETags are computed once at publish time, so serving a request
+    is a dictionary lookup and a socket write.
+    """
+
+    def __init__(self, documents: Dict[str, Any], generated_at: Optional[float] = None):
+        """
+        Serialize documents for serving.
+
+        Args:
+            documents: Dict mapping URL path to a JSON-serializable document
+            generated_at: When the underlying analysis ran (sent as a header
+                so unchanged results keep the same ETag across cycles)
+        """
+        self.generated_at = generated_at
+        self.bodies: Dict[str, bytes] = {}
+        self.etags: Dict[str, str] = {}
+        for path, document in documents.items():
+            body = json.dumps(document, separators=(",", ":")).encode("utf-8")
+            self.bodies[path] = body
+            self.etags[path] = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+    def with_document(self, path: str, document: Any) -> "ResultsSnapshot":
+        """Copy of this snapshot with one document added or replaced."""
+        snapshot = ResultsSnapshot({path: document}, generated_at=self.generated_at)
+        snapshot.bodies = {**self.bodies, **snapshot.bodies}
+        snapshot.etags = {**self.etags, **snapshot.etags}
+        return snapshot
+
+
+def market_records(results_df: pd.DataFrame) -> list:
+    """Results DataFrame as JSON-friendly records."""
+    return json.loads(results_df.to_json(orient="records")) if len(results_df) else []
+
+
+def trader_summary_records(trader_stats: Dict[str, Dict[str, Any]]) -> list:
+    """
+    Trader summary as JSON-friendly records, largest total size first.
+
+    Args:
+        trader_stats: TradeProcessor.trader_stats
+
+    Returns:
+        List of dicts with trader, rating, bets, avg_entry_price and total_size
+    """
+    records = []
+    for trader_name, stats in sorted(trader_stats.items(), key=lambda x: x[1]["total_size"], reverse=True):
+        rating = get_trader_rating(trader_name)
+        records.append({
+            "trader": trader_name,
+            "rating": rating,
+            "bets": stats["trades"],
+            "avg_entry_price": round(stats["avg_price"], 6),
+            "total_size": round(stats["total_size"], 2),
+        })
+    return records
+
+
+class ResultsServer:
+    """
+    Serves the latest published results as JSON.
+
+    Endpoints: /results (markets), /results/<profile> (markets of a filter
+    profile), /traders (trader summary), /status (wallets missing and
+    markets stale when the cycle hit its deadline), /watch (watched markets
+    and their recent events, with --watch), /metrics (detection latency and
+    per-endpoint HTTP histograms in Prometheus text format), /health.
+    Responses carry an ETag; a matching If-None-Match gets 304 Not Modified.
+    The current snapshot is swapped with a single reference assignment after
+    each cycle, so request threads never wait on the pipeline.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080):
+        self.host = host
+        self.port = port
+        self.snapshot = ResultsSnapshot({"/results": [], "/traders": []})
+        # Documents updated between cycles (publish_document), kept across publish()
+        self.live_documents: Dict[str, Any] = {}
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(
+        self,
+        results_df: pd.DataFrame,
+        trader_stats: Dict[str, Dict[str, Any]],
+        profile_results: Optional[Dict[str, pd.DataFrame]] = None,
+        run_status: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Replace the served snapshot with new results.
+
+        Args:
+            results_df: DataFrame returned by PolymarketAnalyzer.analyze
+            trader_stats: TradeProcessor.trader_stats from the same cycle
+            profile_results: PolymarketAnalyzer.profile_results from the same cycle
+            run_status: PolymarketAnalyzer.run_status() from the same cycle
+        """
+        markets = market_records(results_df)
+        documents = {
+            "/results": markets,
+            "/traders": trader_summary_records(trader_stats or {}),
+            "/status": run_status or {"partial": False},
+        }
+        for name, profile_df in (profile_results or {}).items():
+            documents[f"/results/{name}"] = market_records(profile_df)
+        documents.update(self.live_documents)
+        self.snapshot = ResultsSnapshot(documents, generated_at=time.time())
+        logger.info(f"Published {len(markets)} markets to results server")
+
+    def publish_document(self, path: str, document: Any):
+        """
+        Replace one served document without touching the rest of the snapshot.
+
+        Args:
+            path: URL path, e.g. /watch
+            document: JSON-serializable document
+        """
+        self.live_documents[path] = document
+        self.snapshot = self.snapshot.with_document(path, document)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def _send(self, status: int, body: bytes = b"", etag: Optional[str] = None,
+                      generated_at: Optional[float] = None, content_type: str = "application/json"):
+                self.send_response(status)
+                if generated_at is not None:
+                    self.send_header("X-Generated-At", f"{generated_at:.3f}")
+                if etag:
+                    self.send_header("ETag", etag)
+                    self.send_header("Cache-Control", "no-cache")
+                if body:
+                    self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body and self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                snapshot = server.snapshot  # one read; later swaps don't affect this request
+                path = self.path.split("?", 1)[0].rstrip("/") or "/"
+
+                if path == "/health":
+                    body = json.dumps({"status": "ok", "generated_at": snapshot.generated_at}).encode("utf-8")
+                    self._send(200, body)
+                    return
+
+                if path == "/metrics":
+                    metrics = get_latency_tracker().to_prometheus() + get_http_client().to_prometheus()
+                    body = metrics.encode("utf-8")
+                    self._send(200, body, content_type="text/plain; version=0.0.4")
+                    return
+
+                body = snapshot.bodies.get(path)
+                if body is None:
+                    self._send(404, b'{"error":"not found"}')
+                    return
+
+                etag = snapshot.etags[path]
+                if_none_match = self.headers.get("If-None-Match", "")
+                if etag in [t.strip() for t in if_none_match.split(",")] or if_none_match.strip() == "*":
+                    self._send(304, etag=etag, generated_at=snapshot.generated_at)
+                    return
+                self._send(200, body, etag=etag, generated_at=snapshot.generated_at)
+
+            do_HEAD = do_GET
+
+        return Handler
+
+    def start(self):
+        """Start serving in a background thread."""
+        self._httpd = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="results-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Serving results on http://{self.host}:{self.port}/results")
+
+    def stop(self):
+        """Stop the server."""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
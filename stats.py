@@ -0,0 +1,115 @@
+"""Streaming statistics used by the market aggregates."""
+
+import math
+from typing import Optional
+
+
+class RunningStats:
+    """
+    Constant-memory accumulator for a stream of numbers.
+
+    Tracks count, sum, min, max and variance (Welford's algorithm) without
+    keeping the individual values around.
+    """
+
+    __slots__ = ("count", "total", "min", "max", "_mean", "_m2")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value: float):
+        """
+        Fold a single value into the accumulator.
+
+        Args:
+            value: Observed value
+        """
+        value = float(value)
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (value - self._mean)
+
+    def merge(self, other: "RunningStats"):
+        """
+        Combine another accumulator into this one (parallel Welford update).
+
+        Args:
+            other: Accumulator to merge in
+        """
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count = other.count
+            self.total = other.total
+            self.min = other.min
+            self.max = other.max
+            self._mean = other._mean
+            self._m2 = other._m2
+            return
+
+        count = self.count + other.count
+        delta = other._mean - self._mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self._mean += delta * other.count / count
+        self.count = count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def export_state(self) -> list:
+        """The accumulator's fields as a list, for checkpointing."""
+        return [self.count, self.total, self.min, self.max, self._mean, self._m2]
+
+    @classmethod
+    def from_state(cls, state: list) -> "RunningStats":
+        """
+        Rebuild an accumulator from export_state() output.
+
+        Args:
+            state: List from export_state()
+        """
+        stats = cls()
+        stats.count, stats.total, stats.min, stats.max, stats._mean, stats._m2 = state
+        stats.count = int(stats.count)
+        return stats
+
+    @property
+    def mean(self) -> float:
+        return self._mean if self.count else 0.0
+
+    @property
+    def variance(self) -> float:
+        """Population variance of the values seen so far."""
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.variance)
+
+    @property
+    def spread(self) -> float:
+        """max - min of the values seen so far (0 when empty)."""
+        if self.count == 0:
+            return 0.0
+        return self.max - self.min
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __repr__(self) -> str:
+        return (
+            f"RunningStats(count={self.count}, mean={self.mean:.4f}, "
+            f"min={self.min}, max={self.max}, stddev={self.stddev:.4f})"
+        )
@@ -0,0 +1,454 @@
+"""Push-based trade ingest from a streaming feed, with polling for gap recovery."""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
+
+from config import (
+    TRADE_STREAM_URL,
+    TRADE_STREAM_SUBSCRIPTION,
+    STREAM_RECONNECT_DELAY,
+    STREAM_MAX_RECONNECT_DELAY,
+    STREAM_RESYNC_SECONDS,
+    STREAM_GAP_MARGIN_SECONDS,
+)
+from filter_profiles import FilterProfile
+from pipeline import TradePipeline
+
+try:
+    import websockets
+except ImportError:  # optional: only needed for --stream
+    websockets = None
+
+logger = logging.getLogger(__name__)
+
+
+def streaming_available() -> bool:
+    """Whether the websockets package streaming needs is installed."""
+    return websockets is not None
+
+
+def extract_trades(message: Any) -> List[Dict[str, Any]]:
+    """
+    Pull trade payloads out of a feed message.
+
+    Accepts a bare trade, a list of messages, or an envelope with the trade
+    (or a list of trades) under "payload"/"data", as sent by the Polymarket
+    real-time data feed ({"topic": "activity", "type": "trades", "payload": {...}}).
+
+    Args:
+        message: Decoded JSON message
+
+    Returns:
+        List of trade dicts in the data API's shape
+    """
+    if isinstance(message, list):
+        return [trade for item in message for trade in extract_trades(item)]
+    if not isinstance(message, dict):
+        return []
+    if "proxyWallet" in message:
+        return [message]
+    if message.get("type") not in (None, "trades"):
+        return []
+    for field in ("payload", "data"):
+        if field in message:
+            return extract_trades(message[field])
+    return []
+
+
+class StreamingIngest:
+    """
+    Keeps a TradePipeline's aggregates current from a trade stream.
+
+    A full poll (the same paged fetch as a normal run) seeds the state. After
+    that, trades from the stream are filtered to the tracked wallets and
+    folded in through TradePipeline.fold_wallet_trades as they arrive. After
+    a disconnect, each wallet's newest trades are polled back to the moment
+    the stream went quiet, and every STREAM_RESYNC_SECONDS the state is
+    rebuilt from a full poll in the background so it can't drift or grow
+    without bound. Trades seen by both paths are folded once.
+
+    The stream runs on its own event loop thread; analysis cycles call
+    finalize() from any thread. The loop never waits on `lock` itself: every
+    fold runs on a single fold thread (so folds keep their arrival order),
+    and finalize() filters a copy of the state taken under the lock.
+    """
+
+    def __init__(
+        self,
+        pipeline: TradePipeline,
+        wallets: List[str],
+        url: str = TRADE_STREAM_URL,
+        subscription: Optional[Dict[str, Any]] = TRADE_STREAM_SUBSCRIPTION,
+        reconnect_delay: float = STREAM_RECONNECT_DELAY,
+        max_reconnect_delay: float = STREAM_MAX_RECONNECT_DELAY,
+        resync_seconds: Optional[float] = STREAM_RESYNC_SECONDS,
+        gap_margin_seconds: float = STREAM_GAP_MARGIN_SECONDS,
+        record_path: Optional[str] = None,
+    ):
+        """
+        Initialize the ingest.
+
+        Args:
+            pipeline: Pipeline whose aggregates to maintain
+            wallets: Tracked wallet addresses
+            url: Websocket URL of the trade feed
+            subscription: Message sent after connecting (None = send nothing)
+            reconnect_delay: First delay before reconnecting, doubled per failure
+            max_reconnect_delay: Cap on the reconnect delay
+            resync_seconds: Rebuild the state from a full poll this often (None = never)
+            gap_margin_seconds: Extra history polled before a disconnect
+            record_path: Append every trade message from tracked wallets to
+                this JSONL file (replayable with TradeReplayServer)
+        """
+        if websockets is None:
+            raise RuntimeError("Trade streaming needs the websockets package (pip install websockets)")
+
+        self.pipeline = pipeline
+        self.pipeline.dedupe_trades = True
+        self.wallets = list(wallets)
+        self.wallet_index = {wallet.lower(): i for i, wallet in enumerate(self.wallets)}
+        self.url = url
+        self.subscription = subscription
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.resync_seconds = resync_seconds
+        self.gap_margin_seconds = gap_margin_seconds
+        self.record_path = record_path
+
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.stats = {
+            "messages": 0,
+            "trades": 0,
+            "tracked": 0,
+            "folded": 0,
+            "reconnects": 0,
+            "gap_trades": 0,
+            "resyncs": 0,
+        }
+        # Streamed trades get ever smaller positions, so they rank as newer
+        # than everything polled before them
+        self._next_position = 0
+        self._resync_buffer: Optional[List[Dict[str, Any]]] = None
+        self._disconnected_at: Optional[float] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._fold_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trade-stream-fold")
+        self._stopping = False
+
+    def start(self):
+        """Start the seed poll and the stream on a background thread."""
+        self._thread = threading.Thread(target=self._run_loop, name="trade-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Disconnect and stop the background thread."""
+        self._stopping = True
+        if self._loop is not None and not self._loop.is_closed():
+            try:
+                self._loop.call_soon_threadsafe(self._cancel_tasks)
+            except RuntimeError:
+                pass  # the loop finished meanwhile
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._fold_executor.shutdown(wait=False)
+
+    def _cancel_tasks(self):
+        for task in asyncio.all_tasks(self._loop):
+            task.cancel()
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._main())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    async def _main(self):
+        consumer = asyncio.ensure_future(self._consume())
+        try:
+            await self.resync()
+            self.ready.set()
+            while self.resync_seconds:
+                await asyncio.sleep(self.resync_seconds)
+                await self.resync()
+            await consumer
+        finally:
+            consumer.cancel()
+
+    def finalize(self, profiles: Optional[List[FilterProfile]] = None, timeout: Optional[float] = None):
+        """
+        Filter the current state (see TradePipeline.finalize).
+
+        Waits for the seed poll on first use.
+
+        Args:
+            profiles: Extra filter profiles to evaluate
+            timeout: Seconds to wait for the seed poll (None = forever)
+
+        Returns:
+            Filtered market data
+        """
+        if not self.ready.wait(timeout):
+            logger.warning("Trade stream not seeded yet, no results this cycle")
+            return {}
+        with self.lock:
+            if self.pipeline.total_trades == 0:
+                return {}
+            snapshot = self.pipeline.snapshot()
+        # Filtering (live status checks included) runs on the copy, so the
+        # stream keeps folding meanwhile
+        market_data = snapshot.finalize(profiles)
+        self.pipeline.profile_results = snapshot.profile_results
+        return market_data
+
+    async def run_locked(self, function, *args):
+        """
+        Run function(*args) under the lock on the fold thread.
+
+        Args:
+            function: Callable touching the pipeline
+            *args: Its arguments
+
+        Returns:
+            What function returned
+        """
+        def call():
+            with self.lock:
+                return function(*args)
+
+        return await asyncio.get_running_loop().run_in_executor(self._fold_executor, call)
+
+    async def resync(self):
+        """Rebuild the aggregates from a full poll, keeping streamed trades."""
+        pipeline = self.pipeline
+        fresh = pipeline.spawn()
+        self._resync_buffer = []
+        started = time.monotonic()
+        try:
+            await fresh.fetch(self.wallets)
+        except Exception as e:
+            logger.error(f"Trade stream resync failed: {e}")
+            self._resync_buffer = None
+            return
+
+        # Trades streamed or recovered while the poll ran go on top of the
+        # new state; later ones are queued on the fold thread behind it
+        buffered, self._resync_buffer = self._resync_buffer, None
+
+        def adopt():
+            pipeline.adopt(fresh)
+            for trade in buffered:
+                self._fold(trade)
+
+        await self.run_locked(adopt)
+        self.stats["resyncs"] += 1
+        logger.info(
+            f"Trade stream state rebuilt from {fresh.total_trades} polled trades "
+            f"in {time.monotonic() - started:.1f}s ({len(buffered)} trades received meanwhile re-applied)"
+        )
+
+    async def _consume(self):
+        delay = self.reconnect_delay
+        while not self._stopping:
+            try:
+                async with websockets.connect(self.url, ping_interval=20, max_size=None) as ws:
+                    if self.subscription is not None:
+                        await ws.send(json.dumps(self.subscription))
+                    logger.info(f"Trade stream connected to {self.url}")
+                    if self._disconnected_at is not None:
+                        self.stats["reconnects"] += 1
+                        await self.recover_gap(self._disconnected_at - self.gap_margin_seconds)
+                        self._disconnected_at = None
+                    delay = self.reconnect_delay
+                    async for raw in ws:
+                        await self.handle_message(raw)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Trade stream disconnected ({e}), reconnecting in {delay:.0f}s")
+            if self._disconnected_at is None:
+                self._disconnected_at = time.time()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def handle_message(self, raw):
+        """
+        Decode a feed message and fold trades by tracked wallets.
+
+        Args:
+            raw: Message text or bytes
+        """
+        self.stats["messages"] += 1
+        if raw in ("ping", "pong", b"ping", b"pong", ""):
+            return
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            logger.debug(f"Ignoring non-JSON stream message: {str(raw)[:80]}")
+            return
+
+        tracked = []
+        for trade in extract_trades(message):
+            self.stats["trades"] += 1
+            if (trade.get("proxyWallet") or "").lower() not in self.wallet_index:
+                continue
+            self.stats["tracked"] += 1
+            if self.record_path:
+                with open(self.record_path, "a") as f:
+                    f.write(json.dumps(trade) + "\n")
+            if self._resync_buffer is not None:
+                self._resync_buffer.append(trade)
+            tracked.append(trade)
+        if tracked:
+            await self.run_locked(self._fold_all, tracked)
+
+    def _fold_all(self, trades: List[Dict[str, Any]]) -> int:
+        """Fold trades in order (caller holds the lock); returns how many were new."""
+        return sum(self._fold(trade) for trade in trades)
+
+    def _fold(self, trade: Dict[str, Any], position: Optional[int] = None) -> bool:
+        """Fold one trade into the pipeline (caller holds the lock)."""
+        index = self.wallet_index[(trade.get("proxyWallet") or "").lower()]
+        if position is None:
+            self._next_position -= 1
+            position = self._next_position
+        before = self.pipeline.total_trades
+        self.pipeline.fold_wallet_trades(index, self.wallets[index], [trade], offset=position)
+        folded = self.pipeline.total_trades > before
+        if folded:
+            self.stats["folded"] += 1
+        return folded
+
+    async def recover_gap(self, since: float):
+        """
+        Poll each wallet's newest trades back to `since` and fold any the
+        stream missed.
+
+        Args:
+            since: Unix timestamp the stream was last known to be complete
+        """
+        page_size = self.pipeline.page_size or 100
+        loop = asyncio.get_running_loop()
+
+        with ThreadPoolExecutor(max_workers=max(1, self.pipeline.concurrency)) as executor:
+            async def poll(wallet: str) -> List[Dict[str, Any]]:
+                trades, offset = [], 0
+                while offset < self.pipeline.max_trades_per_wallet:
+                    page = await loop.run_in_executor(
+                        executor, self.pipeline.api.fetch_trades, wallet, page_size, offset
+                    )
+                    trades.extend(page)
+                    offset += len(page)
+                    if len(page) < page_size or min(t.get("timestamp", 0) for t in page) < since:
+                        break
+                return trades
+
+            results = await asyncio.gather(*(poll(w) for w in self.wallets), return_exceptions=True)
+
+        missed = []
+        for wallet, trades in zip(self.wallets, results):
+            if isinstance(trades, Exception):
+                logger.warning(f"Gap recovery failed for {wallet}: {trades}")
+                continue
+            # Oldest first, so newer trades end up with smaller positions
+            for trade in reversed([t for t in trades if t.get("timestamp", 0) >= since]):
+                trade.setdefault("proxyWallet", wallet)
+                if self._resync_buffer is not None:
+                    self._resync_buffer.append(trade)
+                missed.append(trade)
+        recovered = await self.run_locked(self._fold_all, missed)
+        self.stats["gap_trades"] += recovered
+        logger.info(f"Gap recovery folded {recovered} trades missed while disconnected")
+
+
+class TradeReplayServer:
+    """
+    Local stand-in for the trade feed that replays recorded messages.
+
+    Every client gets the messages of a JSONL file (one feed message or
+    trade per line, as written by StreamingIngest's record_path) in order.
+    Point StreamingIngest at `url` to exercise streaming end to end.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        interval: float = 0.0,
+        disconnect_after: Optional[int] = None,
+    ):
+        """
+        Initialize the server.
+
+        Args:
+            path: JSONL file of recorded messages
+            host: Interface to bind to
+            port: Port to bind to (0 = pick a free one)
+            interval: Seconds between replayed messages
+            disconnect_after: Drop each connection after this many messages,
+                resuming where it left off on the next one (None = never)
+        """
+        if websockets is None:
+            raise RuntimeError("The replay server needs the websockets package (pip install websockets)")
+        with open(path) as f:
+            self.messages = [line.strip() for line in f if line.strip()]
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.disconnect_after = disconnect_after
+        self.sent = 0
+        self.connections = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+        self._stop: Optional[asyncio.Future] = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handler(self, websocket, path=None):
+        self.connections += 1
+        sent_here = 0
+        while self.sent < len(self.messages):
+            if self.disconnect_after is not None and sent_here >= self.disconnect_after:
+                return
+            await websocket.send(self.messages[self.sent])
+            self.sent += 1
+            sent_here += 1
+            if self.interval:
+                await asyncio.sleep(self.interval)
+        await websocket.wait_closed()
+
+    async def _serve(self):
+        self._stop = asyncio.get_running_loop().create_future()
+        async with websockets.serve(self._handler, self.host, self.port) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            self._started.set()
+            await self._stop
+
+    def start(self):
+        """Serve on a background thread; returns once the port is bound."""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_until_complete, args=(self._serve(),), name="trade-replay", daemon=True
+        )
+        self._thread.start()
+        self._started.wait()
+        logger.info(f"Replaying {len(self.messages)} recorded trade messages on {self.url}")
+
+    def stop(self):
+        """Shut the server down."""
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set_result, None)
+        if self._thread is not None:
+            self._thread.join(5)
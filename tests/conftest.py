@@ -0,0 +1,39 @@
+"""Shared test setup: the modules live at the repository root; mock server fixture."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def mock_polymarket():
+    """
+    Start a MockPolymarketServer and wire a PolymarketAPI and TradeProcessor
+    to it: start(**server_kwargs) -> (server, api, processor).
+    """
+    from api import PolymarketAPI
+    from http_client import HttpClient
+    from metadata import MarketMetadataClient
+    from mock_server import MockPolymarketServer
+    from processor import TradeProcessor
+
+    started = []
+
+    def start(**server_kwargs):
+        server = MockPolymarketServer(**server_kwargs)
+        server.start()
+        http = HttpClient(url_rewrites=server.url_rewrites(), hedge_percentile=None)
+        started.append((server, http))
+        before = server.snapshot_stats().get("trades", {}).get("requests", 0)
+        http.get("https://data-api.polymarket.com/trades", params={"user": "0xprobe", "limit": 1})
+        assert server.snapshot_stats()["trades"]["requests"] > before, "requests are not reaching the mock"
+        metadata = MarketMetadataClient(http=http)
+        return server, PolymarketAPI(http=http, metadata=metadata), TradeProcessor(min_wallets=2, http=http, metadata=metadata)
+
+    yield start
+    for server, http in started:
+        http.close()
+        server.stop()
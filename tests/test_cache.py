@@ -0,0 +1,78 @@
+"""SharedCache leases and single-flight fetches over one SQLite file."""
+
+import threading
+import time
+
+import pytest
+
+from cache import SharedCache
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache.sqlite3")
+
+
+def test_contended_lease_fetches_once(path):
+    # Two instances: separate connections, as two processes would have
+    first, second = SharedCache(path, poll_interval=0.01), SharedCache(path, poll_interval=0.01)
+    fetching, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_fetch():
+        calls.append("first")
+        fetching.set()
+        assert release.wait(10)
+        return {"price": 0.42}
+
+    results = {}
+    owner = threading.Thread(target=lambda: results.update(first=first.get_or_fetch("k", 60, slow_fetch)))
+    owner.start()
+    assert fetching.wait(10)
+
+    # The lease is held: the second caller waits for the value instead of fetching
+    waiter = threading.Thread(target=lambda: results.update(
+        second=second.get_or_fetch("k", 60, lambda: calls.append("second") or {"price": 0.0})
+    ))
+    waiter.start()
+    time.sleep(0.1)
+    assert waiter.is_alive()
+    release.set()
+    owner.join(10)
+    waiter.join(10)
+
+    assert calls == ["first"]
+    assert results == {"first": {"price": 0.42}, "second": {"price": 0.42}}
+    assert (first.stats["fetches"], second.stats["waits"], second.stats["fetches"]) == (1, 1, 0)
+    assert second.get_or_fetch("k", 60, lambda: {"price": 0.0}) == {"price": 0.42}
+    assert second.stats["hits"] == 1
+
+
+def test_expired_lease_of_a_crashed_owner_is_taken_over(path):
+    crashed = SharedCache(path, lease_seconds=0.2)
+    _, leased = crashed._claim("k", "crashed-owner")
+    assert leased
+
+    cache = SharedCache(path, lease_seconds=0.2, poll_interval=0.01)
+    started = time.monotonic()
+    assert cache.get_or_fetch("k", 60, lambda: "fresh", wait=5) == "fresh"
+    # Waited for the lease to expire, then fetched and stored under its own lease
+    assert 0.15 <= time.monotonic() - started < 2
+    assert cache.stats["fetches"] == 1
+    assert crashed.get("k") == "fresh"
+
+
+def test_failed_fetch_is_not_cached_and_releases_the_lease(path):
+    cache = SharedCache(path, poll_interval=0.01)
+
+    def failing():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_fetch("k", 60, failing)
+    assert cache.get("k") is None
+    other = SharedCache(path)
+    started = time.monotonic()
+    assert other.get_or_fetch("k", 60, lambda: [1, 2]) == [1, 2]
+    assert time.monotonic() - started < 1
+    assert other.stats["misses"] == 1
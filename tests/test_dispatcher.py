@@ -0,0 +1,218 @@
+"""NotificationDispatcher against a local stand-in for the Telegram Bot API."""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from dispatcher import NotificationDispatcher, Subscriber, fit_market_part
+from http_client import HttpClient
+
+
+class FakeBotApi:
+    """
+    Records sendMessage calls; answers 429 to the first `rate_limited` sends
+    per chat and 500 to every send to a `failing` chat.
+    """
+
+    def __init__(self, rate_limited=None, retry_after=0.3, failing=()):
+        self.rate_limited = dict(rate_limited or {})
+        self.failing = set(failing)
+        self.retry_after = retry_after
+        self.requests = []
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def sent(self, chat_id):
+        """Texts delivered (answered 200) to a chat, in order."""
+        return [r["text"] for r in self.requests if r["chat_id"] == chat_id and r["status"] == 200]
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                chat_id = payload["chat_id"]
+                with api.lock:
+                    limited = api.rate_limited.get(chat_id, 0) > 0
+                    if limited:
+                        api.rate_limited[chat_id] -= 1
+                    status = 429 if limited else 500 if chat_id in api.failing else 200
+                    api.requests.append({**payload, "status": status, "at": time.monotonic()})
+                if limited:
+                    body = {"ok": False, "error_code": 429, "parameters": {"retry_after": api.retry_after}}
+                elif status == 500:
+                    body = {"ok": False, "error_code": 500}
+                else:
+                    body = {"ok": True, "result": {"message_id": len(api.requests)}}
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def bot_api():
+    api = FakeBotApi()
+    yield api
+    api.stop()
+
+
+@pytest.fixture
+def http():
+    client = HttpClient(url_rewrites={}, hedge_percentile=None)
+    yield client
+    client.close()
+
+
+def results(*markets):
+    """Results table with one row per (title, rating, score)."""
+    return pd.DataFrame([
+        {
+            "Market ID": f"0x{i}",
+            "Market Title": title,
+            "Outcomes": "Team A (2)",
+            "Total Wallets": 2,
+            "Max Rating": rating,
+            "Score": score,
+        }
+        for i, (title, rating, score) in enumerate(markets)
+    ])
+
+
+def make_dispatcher(bot_api, http, subscribers, **kwargs):
+    kwargs.setdefault("global_rate", 100)
+    kwargs.setdefault("chat_interval", 0.0)
+    return NotificationDispatcher("TEST", subscribers, http=http, api_base=bot_api.url, **kwargs)
+
+
+def test_subscribers_get_only_matching_markets(bot_api, http):
+    df = results(
+        ("Dota 2: Team A vs Team B", 5, 1.0),
+        ("NBA: Lakers vs Celtics", 9, 3.0),
+        ("Valorant: Team C vs Team D", None, 2.0),
+    )
+    subscribers = [
+        Subscriber("dota", categories=["dota"]),
+        Subscriber("rated", min_rating=8),
+        Subscriber("top", max_markets=1),
+    ]
+    delivered = make_dispatcher(bot_api, http, subscribers).dispatch(df, timeout=10)
+
+    assert delivered == {"dota": 1, "rated": 1, "top": 1}
+    (dota,) = bot_api.sent("dota")
+    assert "Dota 2" in dota and "NBA" not in dota and "Valorant" not in dota
+    (rated,) = bot_api.sent("rated")
+    assert "NBA" in rated and "Dota 2" not in rated
+    (top,) = bot_api.sent("top")
+    assert "NBA" in top and "Valorant" not in top
+
+
+def test_per_chat_interval_and_global_rate(bot_api, http):
+    df = results(*[(f"Match {i}: Team A vs Team B", None, float(i)) for i in range(3)])
+    # Room for one market per message, so each chat gets three messages
+    subscribers = [Subscriber(f"chat{i}", max_markets=3) for i in range(3)]
+    dispatcher = make_dispatcher(bot_api, http, subscribers, chat_interval=0.2, global_rate=6,
+                                 max_message_length=120)
+    started = time.monotonic()
+    delivered = dispatcher.dispatch(df, timeout=10)
+    elapsed = time.monotonic() - started
+
+    assert delivered == {"chat0": 3, "chat1": 3, "chat2": 3}
+    assert len(bot_api.requests) == 9
+    for i in range(3):
+        times = [r["at"] for r in bot_api.requests if r["chat_id"] == f"chat{i}"]
+        assert all(b - a >= 0.15 for a, b in zip(times, times[1:]))
+    # Nine sends at 6/s with a burst of 6 take at least half a second
+    assert elapsed >= 0.45
+
+
+def test_rate_limited_send_is_retried_after_retry_after():
+    api = FakeBotApi(rate_limited={"chat": 1}, retry_after=0.3)
+    client = HttpClient(url_rewrites={}, hedge_percentile=None)
+    try:
+        df = results(("Dota 2: Team A vs Team B", 5, 1.0), ("NBA: Lakers vs Celtics", 9, 2.0))
+        delivered = make_dispatcher(api, client, [Subscriber("chat")]).dispatch(df, timeout=10)
+
+        assert delivered == {"chat": 2}
+        first, second = api.requests
+        assert (first["status"], second["status"]) == (429, 200)
+        assert second["text"] == first["text"]
+        assert second["at"] - first["at"] >= 0.25
+    finally:
+        client.close()
+        api.stop()
+
+
+def test_rate_limit_retries_are_capped():
+    api = FakeBotApi(rate_limited={"stuck": 1000, "chat": 1}, retry_after=0.05)
+    client = HttpClient(url_rewrites={}, hedge_percentile=None)
+    try:
+        df = results(("Dota 2: Team A vs Team B", 5, 1.0))
+        dispatcher = make_dispatcher(api, client, [Subscriber("stuck"), Subscriber("chat")],
+                                     max_rate_limit_retries=2)
+        delivered = dispatcher.dispatch(df, timeout=None)
+
+        assert delivered == {"stuck": 0, "chat": 1}
+        # The first send and two retries, then the market is given up on
+        assert [r["status"] for r in api.requests if r["chat_id"] == "stuck"] == [429] * 3
+        assert not dispatcher.queues["stuck"]
+        assert dispatcher.delivered == set()
+    finally:
+        client.close()
+        api.stop()
+
+
+def test_delivered_markets_exclude_failed_chats():
+    api = FakeBotApi(failing={"down"})
+    client = HttpClient(url_rewrites={}, hedge_percentile=None)
+    try:
+        df = results(("Dota 2: Team A vs Team B", 5, 1.0), ("NBA: Lakers vs Celtics", 9, 2.0))
+        subscribers = [Subscriber("up"), Subscriber("down", categories=["basketball"])]
+        dispatcher = make_dispatcher(api, client, subscribers)
+        delivered = dispatcher.dispatch(df, timeout=10)
+
+        assert delivered == {"up": 2, "down": 0}
+        assert dispatcher.routed == {"0x0", "0x1"}
+        # The NBA market still has to reach "down", so it isn't marked delivered
+        assert dispatcher.delivered == {"0x0"}
+    finally:
+        client.close()
+        api.stop()
+
+
+def test_long_market_is_cut_without_breaking_html(bot_api, http):
+    title = "Dota 2: Team &amp; Friends vs Others " * 20
+    df = results((title, 5, 1.0))
+    make_dispatcher(bot_api, http, [Subscriber("chat")], max_message_length=200).dispatch(df, timeout=10)
+
+    (text,) = bot_api.sent("chat")
+    assert len(text) <= 200
+    assert text.count("<b>") == text.count("</b>")
+    cut_title = re.search(r"<b>1\. (.*)…</b>", text).group(1)
+    assert not re.search(r"&[#\w]*$", cut_title)
+    for budget in range(20, 120):
+        part = fit_market_part(1, title, "   📊 Team A (2)\n   👥 2 traders\n", budget)
+        assert len(part) <= max(budget, len("<b>1. …</b>\n   …\n\n"))
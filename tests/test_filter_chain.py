@@ -0,0 +1,103 @@
+"""FilterChain verdict recording and the saved verdict table."""
+
+import pytest
+
+from filter_chain import FilterChain, FilterStage, FilterVerdicts
+
+TRADERS = "outcome_traders_detailed"
+
+
+def market(title, traders):
+    """Market entry with {outcome: {trader: size}}."""
+    return {"market_title": title, TRADERS: {o: dict(t) for o, t in traders.items()}}
+
+
+@pytest.fixture
+def market_data():
+    return {
+        "m1": market("Kept", {"A": {"alice": 100, "bob": 5}, "B": {"carol": 50}}),
+        "m2": market("Too small", {"A": {"dave": 5}}),
+        "m3": market("Few traders", {"A": {"erin": 100}}),
+    }
+
+
+def drop_small_traders(data):
+    """Trader-level stage: removes entries under 10, and markets left empty."""
+    result = {}
+    for market_id, entry in data.items():
+        traders = {
+            outcome: {t: size for t, size in sizes.items() if size >= 10}
+            for outcome, sizes in entry[TRADERS].items()
+        }
+        traders = {outcome: sizes for outcome, sizes in traders.items() if sizes}
+        if traders:
+            result[market_id] = {**entry, TRADERS: traders}
+    return result
+
+
+def min_traders(data):
+    """Market-level stage: keeps markets with at least two traders."""
+    return {mid: e for mid, e in data.items() if sum(len(t) for t in e[TRADERS].values()) >= 2}
+
+
+@pytest.fixture
+def chain():
+    return FilterChain([
+        FilterStage("drop_small_traders", drop_small_traders, reads={TRADERS}, writes={TRADERS}),
+        FilterStage("min_traders", min_traders, reads={TRADERS}),
+    ], adaptive=False, pair_field=TRADERS)
+
+
+def test_record_marks_markets_and_trader_entries(chain, market_data):
+    result = chain.run(market_data)
+    assert list(result) == ["m1"]
+    verdicts = chain.verdicts
+
+    kept = verdicts.explain("m1")
+    assert kept["kept"] and kept["rejected_by"] == []
+    assert {(t["trader"], t["kept"]) for t in kept["traders"]} == {("alice", True), ("bob", False), ("carol", True)}
+    assert [t["rejected_by"] for t in kept["traders"] if t["trader"] == "bob"] == [["drop_small_traders"]]
+
+    # A trader-level stage dropping a whole market also rejects its entries
+    emptied = verdicts.explain("m2")
+    assert emptied["rejected_by"] == ["drop_small_traders"]
+    assert emptied["traders"] == [
+        {"outcome": "A", "trader": "dave", "kept": False, "rejected_by": ["drop_small_traders"]}
+    ]
+
+    # A market-level stage only marks the market
+    few = verdicts.explain("m3")
+    assert few["rejected_by"] == ["min_traders"]
+    assert [t["kept"] for t in few["traders"]] == [True]
+
+    assert verdicts.counts() == {"drop_small_traders": 1, "min_traders": 1}
+    assert verdicts.explain("unknown") is None
+
+
+def test_save_and_load_round_trip(chain, market_data, tmp_path):
+    chain.run(market_data)
+    path = str(tmp_path / "verdicts.npz")
+    chain.verdicts.save(path)
+    loaded = FilterVerdicts.load(path)
+
+    assert loaded.stage_names == chain.verdicts.stage_names
+    assert loaded.created_at == chain.verdicts.created_at
+    for market_id in market_data:
+        assert loaded.explain(market_id) == chain.verdicts.explain(market_id)
+    assert loaded.counts() == chain.verdicts.counts()
+    assert [p.name for p in tmp_path.iterdir()] == ["verdicts.npz"]
+
+
+def test_adaptive_order_keeps_declared_bits(market_data):
+    stages = [
+        FilterStage("drop_small_traders", drop_small_traders, reads={TRADERS}, writes={TRADERS}),
+        FilterStage("titled", lambda data: {m: e for m, e in data.items() if e["market_title"] != "Kept"}),
+    ]
+    # Make the second stage look cheap and selective so it runs first
+    stages[1].cost, stages[1].pass_rate = 1e-9, 0.1
+    chain = FilterChain(stages, adaptive=True, pair_field=TRADERS)
+    assert [s.name for s in chain.plan()] == ["titled", "drop_small_traders"]
+
+    chain.run(market_data)
+    assert chain.verdicts.explain("m1")["rejected_by"] == ["titled"]
+    assert chain.verdicts.explain("m2")["rejected_by"] == ["drop_small_traders"]
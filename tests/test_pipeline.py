@@ -0,0 +1,63 @@
+"""TradePipeline fetching and folding against the mock Polymarket server."""
+
+import asyncio
+
+import pytest
+
+from mock_server import mock_wallets
+from pipeline import TradePipeline
+from stats import RunningStats
+
+# Set when the market's newest trade was folded, so it differs between runs
+FETCH_FIELDS = {"latest_fetched_at"}
+
+
+def comparable(market_data):
+    """Market data without fetch times, with arrival-ordered lists sorted."""
+    def plain(value):
+        if isinstance(value, RunningStats):
+            return [round(number, 9) for number in value.export_state()]
+        if isinstance(value, dict):
+            return {key: plain(item) for key, item in value.items()}
+        return value
+
+    return {
+        market_id: {
+            **plain({field: value for field, value in data.items() if field not in FETCH_FIELDS}),
+            "outcome_traders": {o: sorted(names) for o, names in data["outcome_traders"].items()},
+        }
+        for market_id, data in market_data.items()
+    }
+
+
+def run(api, processor, wallets, **settings):
+    pipeline = TradePipeline(api, processor, max_recent_trades=150, max_trades_per_wallet=100, **settings)
+    results = asyncio.run(pipeline.run(wallets))
+    return pipeline, results
+
+
+@pytest.mark.parametrize("page_size", [7, 50])
+def test_paged_fetch_matches_unpaged(mock_polymarket, page_size):
+    # More trades per wallet than the fetch depth, and a window much smaller
+    # than all trades, so older pages mostly hold trades outside the window
+    mock, api, processor = mock_polymarket(trades_per_wallet=160, markets=12)
+    wallets = mock_wallets(10)
+
+    unpaged, expected = run(api, processor, wallets)
+    paged, results = run(api, processor, wallets, page_size=page_size, concurrency=3)
+
+    assert unpaged.total_trades == paged.total_trades == len(wallets) * 100
+    assert paged.pages_fetched == len(wallets) * -(-100 // page_size)
+    assert paged.window_condition_ids() == unpaged.window_condition_ids()
+    assert expected
+    assert comparable(results) == comparable(expected)
+    assert comparable(paged.windowed_markets()) == comparable(unpaged.windowed_markets())
+
+
+def test_failed_wallet_is_reported_without_stopping_the_rest(mock_polymarket):
+    mock, api, processor = mock_polymarket(trades_per_wallet=30, markets=4, error_rate=1.0)
+    wallets = mock_wallets(4)
+    pipeline, _ = run(api, processor, wallets, page_size=10, concurrency=2)
+    assert pipeline.failed_wallets == wallets
+    assert pipeline.missing_wallets == wallets
+    assert pipeline.total_trades == 0
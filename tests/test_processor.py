@@ -0,0 +1,39 @@
+"""TradeProcessor aggregation and filter stages on hand-built trades."""
+
+import pytest
+
+from processor import TradeProcessor
+
+
+@pytest.fixture
+def processor():
+    return TradeProcessor(http=None)
+
+
+def fold(processor, fills):
+    """One market entry from (trader, outcome, price) fills, in order."""
+    entry = processor.new_market_entry()
+    for trader, outcome, price in fills:
+        trade = {"conditionId": "m", "outcome": outcome, "price": price, "size": 50, "name": trader}
+        processor.add_trade_to_market(entry, f"0x{trader}", trade, {"title": "Match"})
+    return entry
+
+
+def volatile(processor, entry, max_spread=0.1, min_prices=2):
+    return "m" not in processor.filter_by_outcome_price_volatility({"m": entry}, max_spread, min_prices)
+
+
+def test_volatility_uses_each_traders_latest_price(processor):
+    # One trader averaging in at very different prices is one price, not two
+    assert not volatile(processor, fold(processor, [("alice", "A", 0.30), ("alice", "A", 0.70)]))
+    # Only the latest fill of each trader counts
+    assert not volatile(processor, fold(processor, [
+        ("alice", "A", 0.20), ("alice", "A", 0.50), ("bob", "A", 0.52),
+    ]))
+    assert volatile(processor, fold(processor, [("alice", "A", 0.40), ("bob", "A", 0.60)]))
+
+
+def test_volatility_min_prices_counts_traders(processor):
+    entry = fold(processor, [("alice", "A", 0.40), ("bob", "A", 0.60), ("alice", "B", 0.1), ("alice", "B", 0.9)])
+    assert volatile(processor, entry, min_prices=2)
+    assert not volatile(processor, entry, min_prices=3)
@@ -0,0 +1,139 @@
+"""WalletScheduler intervals and AdaptivePoller against the mock Polymarket server."""
+
+import asyncio
+import threading
+import time
+
+from mock_server import mock_wallets
+from pipeline import TradePipeline
+from scheduler import AdaptivePoller, WalletScheduler
+from stats import RunningStats
+
+# Per-fetch bookkeeping that legitimately differs between the two paths
+FETCH_FIELDS = {"latest_fetched_at"}
+# Last folded fill per trader: depends on which wallet answered first
+FOLD_ORDER_FIELDS = {"price"}
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def new_trade(server, wallet, number):
+    """A fresh fill by `wallet` on a market it already traded."""
+    trade = dict(server.wallet_trades(wallet)[number % 3])
+    trade.update(timestamp=int(time.time()), size=100, transactionHash=f"0xpoll{number:059x}")
+    return trade
+
+
+def comparable(market_data):
+    """Market data without what depends on fetch time or on fold order."""
+    def plain(value):
+        if isinstance(value, RunningStats):
+            return [round(number, 9) for number in value.export_state()]
+        if isinstance(value, dict):
+            return {key: plain(item) for key, item in value.items() if key not in FOLD_ORDER_FIELDS}
+        return value
+
+    return {
+        market_id: {
+            **plain({field: value for field, value in data.items() if field not in FETCH_FIELDS}),
+            "outcome_traders": {o: sorted(names) for o, names in data["outcome_traders"].items()},
+        }
+        for market_id, data in market_data.items()
+    }
+
+
+def test_intervals_follow_activity_and_stay_within_budget():
+    wallets = [f"0x{i:040x}" for i in range(20)]
+    scheduler = WalletScheduler(wallets, base_interval=100, budget=0.1, min_interval=1, max_interval=1000)
+    now = time.time()
+    scheduler.record_poll(wallets[0], [{"timestamp": now - i} for i in range(50)], now=now)
+    scheduler.record_poll(wallets[1], [], now=now)
+
+    assert scheduler.interval(wallets[0]) < scheduler.interval(wallets[1])
+    # Twenty wallets at 100s each want 0.2 polls/s; the stretch halves that
+    assert scheduler.stretch > 1
+    assert sum(1 / scheduler.interval(w) for w in wallets) <= scheduler.budget + 1e-9
+
+    # Surfacing a wallet shortens its interval and brings its next poll forward
+    before = scheduler.interval(wallets[1])
+    scheduler.set_surfaced([wallets[1]], now=now)
+    assert scheduler.interval(wallets[1]) < before
+    assert scheduler.due[wallets[1]] <= now + scheduler.interval(wallets[1])
+
+
+def start_poller(api, processor, wallets):
+    scheduler = WalletScheduler(wallets, base_interval=0.2, budget=1000, min_interval=0.05, max_interval=0.5)
+    pipeline = TradePipeline(api, processor)
+    poller = AdaptivePoller(pipeline, wallets, scheduler=scheduler, budget_burst=100, resync_seconds=None)
+    poller.start()
+    assert poller.ready.wait(10)
+    return pipeline, poller
+
+
+def test_polled_trades_match_a_full_poll(mock_polymarket):
+    mock, api, processor = mock_polymarket(trades_per_wallet=20, markets=4)
+    wallets = mock_wallets(6)
+    pipeline, poller = start_poller(api, processor, wallets)
+    try:
+        seeded = len(wallets) * 20
+        assert pipeline.total_trades == seeded
+        for i in range(5):
+            mock.add_trade(new_trade(mock, wallets[i], i))
+        wait_for(lambda: pipeline.total_trades == seeded + 5)
+
+        polled = TradePipeline(api, processor)
+        expected = asyncio.run(polled.run(wallets))
+        assert expected
+        assert comparable(poller.finalize()) == comparable(expected)
+        assert poller.stats["folded"] == 5
+
+        # A resync rebuilds the same state from a full poll
+        asyncio.run(poller.resync())
+        assert pipeline.total_trades == seeded + 5
+        assert comparable(poller.finalize()) == comparable(expected)
+    finally:
+        poller.stop()
+
+
+def test_finalize_filters_a_copy_while_polling_continues(mock_polymarket, monkeypatch):
+    mock, api, processor = mock_polymarket(trades_per_wallet=20, markets=4)
+    wallets = mock_wallets(6)
+    pipeline, poller = start_poller(api, processor, wallets)
+    filtering, release = threading.Event(), threading.Event()
+    filter_markets = processor.filter_markets
+
+    def blocking_filter(*args, **kwargs):
+        filtering.set()
+        assert release.wait(10)
+        return filter_markets(*args, **kwargs)
+
+    monkeypatch.setattr(processor, "filter_markets", blocking_filter)
+    try:
+        before = comparable(pipeline.market_data)
+        results = {}
+        finalizing = threading.Thread(target=lambda: results.update(data=poller.finalize()))
+        finalizing.start()
+        assert filtering.wait(10)
+
+        # Polling folds new trades while finalize() is still filtering
+        seeded = pipeline.total_trades
+        trade = new_trade(mock, wallets[0], 0)
+        mock.add_trade(trade)
+        wait_for(lambda: pipeline.total_trades == seeded + 1)
+        release.set()
+        finalizing.join(10)
+
+        assert results["data"]
+        # Filtering left the folded aggregates untouched, apart from the new trade
+        poller.stop()
+        after = comparable(pipeline.market_data)
+        changed = {m for m in before if before[m] != after.get(m)}
+        assert changed <= {trade["conditionId"]}
+    finally:
+        release.set()
+        poller.stop()
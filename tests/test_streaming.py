@@ -0,0 +1,99 @@
+"""StreamingIngest against a local replay feed and the mock Polymarket server."""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+pytest.importorskip("websockets")
+
+from mock_server import mock_wallets
+from pipeline import TradePipeline
+from stats import RunningStats
+from streaming import StreamingIngest, TradeReplayServer
+
+# Per-fetch bookkeeping that legitimately differs between the two paths
+FETCH_FIELDS = {"latest_fetched_at"}
+# Last folded fill per trader: depends on which wallet answered first, even
+# between two polled runs
+FOLD_ORDER_FIELDS = {"price"}
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+def new_trade(server, wallet, number):
+    """A fresh fill by `wallet` on a market it already traded."""
+    trade = dict(server.wallet_trades(wallet)[number % 3])
+    trade.update(timestamp=int(time.time()), size=100, transactionHash=f"0xnew{number:060x}")
+    return trade
+
+
+def comparable(market_data):
+    """Market data without what depends on fetch time or on fold order."""
+    def plain(value):
+        if isinstance(value, RunningStats):
+            # Sums differ in the last bits with the order fills were added in
+            return [round(number, 9) for number in value.export_state()]
+        if isinstance(value, dict):
+            return {key: plain(item) for key, item in value.items() if key not in FOLD_ORDER_FIELDS}
+        return value
+
+    return {
+        market_id: {
+            **plain({field: value for field, value in data.items() if field not in FETCH_FIELDS}),
+            "outcome_traders": {o: sorted(names) for o, names in data["outcome_traders"].items()},
+        }
+        for market_id, data in market_data.items()
+    }
+
+
+def test_stream_with_gap_matches_polling(mock_polymarket, tmp_path):
+    mock, api, processor = mock_polymarket(trades_per_wallet=20, markets=4)
+    wallets = mock_wallets(8)
+    streamed = [new_trade(mock, wallets[i % 4], i) for i in range(6)]
+    missed = [new_trade(mock, wallets[4 + i], 10 + i) for i in range(3)]
+    feed = tmp_path / "feed.jsonl"
+    feed.write_text("".join(
+        json.dumps({"topic": "activity", "type": "trades", "payload": trade}) + "\n" for trade in streamed
+    ))
+
+    # The first connection drops after three trades; the rest arrive on the next
+    replay = TradeReplayServer(str(feed), disconnect_after=3)
+    replay.start()
+    pipeline = TradePipeline(api, processor)
+    ingest = StreamingIngest(pipeline, wallets, url=replay.url, subscription=None,
+                             reconnect_delay=1.5, resync_seconds=None)
+    ingest.start()
+    try:
+        assert ingest.ready.wait(10)
+        seeded = len(wallets) * 20
+        wait_for(lambda: replay.sent == 3 and pipeline.total_trades == seeded + 3)
+        # Trades made while the feed is down only show up on the polled API
+        for trade in missed:
+            mock.add_trade(trade)
+        wait_for(lambda: replay.sent == len(streamed) and pipeline.total_trades == seeded + 9)
+        assert ingest.stats["reconnects"] == 1
+        assert ingest.stats["gap_trades"] == len(missed)
+
+        for trade in streamed:
+            mock.add_trade(trade)
+        polled = TradePipeline(api, processor)
+        expected = asyncio.run(polled.run(wallets))
+        assert set(pipeline.market_data) == set(polled.market_data)
+        assert expected
+        assert comparable(ingest.finalize()) == comparable(expected)
+
+        # A resync rebuilds the same state from a full poll
+        asyncio.run(ingest.resync())
+        assert ingest.stats["resyncs"] == 2
+        assert pipeline.total_trades == seeded + 9
+        assert comparable(ingest.finalize()) == comparable(expected)
+    finally:
+        ingest.stop()
+        replay.stop()
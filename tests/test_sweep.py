@@ -0,0 +1,40 @@
+"""Threshold sweep against full filter chain runs at each grid point."""
+
+import asyncio
+import itertools
+
+from filter_profiles import FilterProfile
+from mock_server import mock_wallets
+from pipeline import TradePipeline
+from sweep import SWEEP_PARAMETERS, sweep_thresholds
+
+GRID = {
+    "max_price_spread": [0.02, 0.06, 0.1, 1.0],
+    "min_prices_for_volatility": [2, 4, 8, 16],
+    "majority_threshold": [0.6, 0.8, 0.9, 1.0],
+}
+
+
+def test_sweep_matches_filter_chain_runs(mock_polymarket):
+    # Few trades per wallet, so most traders stay on one side of a market
+    mock, api, processor = mock_polymarket(trades_per_wallet=3, markets=10)
+    pipeline = TradePipeline(api, processor)
+    # Also builds the trader stats the bet size stage uses
+    asyncio.run(pipeline.run(mock_wallets(40)))
+
+    table = sweep_thresholds(processor, pipeline.windowed_markets(), GRID)
+    assert len(table) == 4 * 4 * 4
+    # Every swept threshold changes the outcome somewhere on the grid
+    for name in SWEEP_PARAMETERS:
+        others = [other for other in SWEEP_PARAMETERS if other != name]
+        assert (table.groupby(others)["markets"].nunique() > 1).any(), name
+
+    for values in itertools.product(*(GRID[name] for name in SWEEP_PARAMETERS)):
+        point = dict(zip(SWEEP_PARAMETERS, values))
+        profile = FilterProfile(min_wallets=processor.min_wallets, **point)
+        kept = processor.build_filter_chain(profile).run(pipeline.windowed_markets())
+        signals = sum(max(len(t) for t in m["outcome_traders_detailed"].values()) for m in kept.values())
+
+        row = table.loc[(table[list(point)] == list(values)).all(axis=1)]
+        assert len(row) == 1, point
+        assert (row["markets"].item(), row["signals"].item()) == (len(kept), signals), point
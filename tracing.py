@@ -0,0 +1,197 @@
+"""Run tracing: nested spans exported as Chrome trace JSON (main.py --trace)."""
+
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Any, Optional
+
+from config import TRACE_MAX_EVENTS, TRACE_KEEP_FILES
+
+logger = logging.getLogger(__name__)
+
+_active: Optional["Tracer"] = None
+
+
+def trace_span(name: str, category: str = "run", **args):
+    """
+    Context manager recording a span in the active trace. Does nothing
+    unless a Tracer is running.
+
+    Spans opened inside each other on the same thread nest. The context
+    yields the span's args dict (or None when not tracing), so results
+    known only at the end, like a status code, can be added to it.
+
+    Args:
+        name: Span name
+        category: Trace category (run, fetch, http, filter, status, notify)
+        **args: Extra fields shown with the span
+    """
+    if _active is None:
+        return nullcontext()
+    return _active.span(name, category, args)
+
+
+class Tracer:
+    """
+    Collects spans from all threads of one run.
+
+    Each span becomes a Chrome trace "complete" event (ph "X") with a start
+    timestamp and duration in microseconds on its thread's row; the viewer
+    nests spans of the same thread by time. Thread names are written as
+    metadata events.
+    """
+
+    def __init__(self, max_events: int = TRACE_MAX_EVENTS):
+        """
+        Initialize the tracer.
+
+        Args:
+            max_events: Most spans kept (later ones are counted and dropped)
+        """
+        self.max_events = max_events
+        self.events: List[Dict[str, Any]] = []
+        self.dropped = 0
+        self.thread_names: Dict[int, str] = {}
+        self.pid = os.getpid()
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Make this the active tracer."""
+        global _active
+        _active = self
+
+    def stop(self):
+        """Stop recording (spans still open are recorded when they close)."""
+        global _active
+        if _active is self:
+            _active = None
+
+    @contextmanager
+    def span(self, name: str, category: str = "run", args: Optional[Dict[str, Any]] = None):
+        """Record the enclosed block as a span (see trace_span)."""
+        args = dict(args or {})
+        thread = threading.current_thread()
+        start = time.perf_counter()
+        try:
+            yield args
+        except BaseException as e:
+            args["error"] = type(e).__name__
+            raise
+        finally:
+            end = time.perf_counter()
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": round((start - self._origin) * 1e6, 1),
+                "dur": round((end - start) * 1e6, 1),
+                "pid": self.pid,
+                "tid": thread.ident,
+            }
+            if args:
+                event["args"] = args
+            with self._lock:
+                self.thread_names.setdefault(thread.ident, thread.name)
+                if len(self.events) < self.max_events:
+                    self.events.append(event)
+                else:
+                    self.dropped += 1
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """The trace as a Chrome trace JSON document."""
+        with self._lock:
+            events = sorted(self.events, key=lambda e: e["ts"])
+            metadata = [
+                {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+                for tid, name in self.thread_names.items()
+            ]
+            dropped = self.dropped
+        return {
+            "traceEvents": metadata + events,
+            "displayTimeUnit": "ms",
+            "otherData": {"started_at": self.started_at, "dropped_spans": dropped},
+        }
+
+    def summary(self, top_n: int = 10) -> List[Dict[str, Any]]:
+        """
+        Slowest span names by total time.
+
+        Returns:
+            List of {name, category, count, total_ms, max_ms}, slowest first
+        """
+        totals: Dict[tuple, Dict[str, Any]] = {}
+        with self._lock:
+            for event in self.events:
+                key = (event["cat"], event["name"])
+                entry = totals.setdefault(key, {
+                    "name": event["name"], "category": event["cat"], "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                })
+                entry["count"] += 1
+                entry["total_ms"] += event["dur"] / 1000
+                entry["max_ms"] = max(entry["max_ms"], event["dur"] / 1000)
+        return sorted(totals.values(), key=lambda e: -e["total_ms"])[:top_n]
+
+    def export(self, path: str):
+        """
+        Atomically write the trace to a JSON file.
+
+        Args:
+            path: Output file path
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".trace-", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.to_chrome(), f)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+
+@contextmanager
+def traced_run(output_dir: Optional[str], name: str = "run", keep_files: int = TRACE_KEEP_FILES):
+    """
+    Trace one run into output_dir/trace-<time>-<pid>.json, keeping the newest
+    `keep_files` traces. Does nothing when output_dir is None.
+
+    Args:
+        output_dir: Directory for trace files
+        name: Name of the root span
+        keep_files: Trace files kept in output_dir
+    """
+    if not output_dir:
+        yield None
+        return
+    tracer = Tracer()
+    tracer.start()
+    try:
+        with tracer.span(name, "run"):
+            yield tracer
+    finally:
+        tracer.stop()
+        # Milliseconds and pid keep runs started in the same second apart
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(tracer.started_at))
+        millis = int(tracer.started_at * 1000) % 1000
+        path = os.path.join(output_dir, f"trace-{stamp}-{millis:03d}-{os.getpid()}.json")
+        try:
+            tracer.export(path)
+        except OSError as e:
+            logger.warning(f"Could not write trace {path}: {e}")
+        else:
+            slowest = ", ".join(
+                f"{s['name']} {s['total_ms']:.0f}ms/{s['count']}"
+                for s in tracer.summary(6) if s["category"] != "run"
+            )
+            logger.info(f"Trace written to {path} ({len(tracer.events)} spans; slowest: {slowest})")
+            for old in sorted(glob.glob(os.path.join(output_dir, "trace-*.json")))[:-max(1, keep_files)]:
+                os.unlink(old)
@@ -0,0 +1,304 @@
+"""Fast follow-up polling of surfaced markets by condition id (main.py --serve --watch)."""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Callable, Dict, List, Any, Optional
+
+import pandas as pd
+
+from config import (
+    WATCH_INTERVAL_SECONDS,
+    WATCH_TRADES_LIMIT,
+    WATCH_PRICE_MOVE,
+    WATCH_QUIET_SECONDS,
+    WATCH_MAX_MARKETS,
+    WATCH_CONCURRENCY,
+    WATCH_MAX_EVENTS,
+)
+from pipeline import trade_key
+from processor import is_expired
+from scoring import top_markets
+from tracing import trace_span
+
+logger = logging.getLogger(__name__)
+
+
+def format_events(events: List[Dict[str, Any]]) -> str:
+    """
+    Watch events as a Telegram HTML message, grouped by market.
+
+    Args:
+        events: Events from MarketWatcher.poll_once
+
+    Returns:
+        Message text
+    """
+    lines = ["👀 <b>Watched markets</b>"]
+    by_market: Dict[str, List[Dict[str, Any]]] = {}
+    for event in events:
+        by_market.setdefault(event["title"], []).append(event)
+    for title, market_events in by_market.items():
+        lines.append(f"\n<b>{title}</b>")
+        for event in market_events:
+            if event["kind"] == "price_move":
+                lines.append(f"  {event['outcome']}: ${event['from']:.3f} → ${event['to']:.3f}")
+            else:
+                verb = "entered" if event["kind"] == "entry" else "exited"
+                lines.append(
+                    f"  {event['trader']} {verb} {event['outcome']} "
+                    f"(${event['size'] * event['price']:.0f} @ ${event['price']:.3f})"
+                )
+    return "\n".join(lines)
+
+
+class MarketWatcher:
+    """
+    Polls the surfaced markets' trades by condition id and applies what
+    tracked wallets do there to the pipeline's market aggregates.
+
+    Each poll asks for a market's newest trades (as
+    PolymarketAPI.fetch_current_market_price does). Trades not seen before
+    that are by tracked wallets are folded in through
+    TradePipeline.fold_wallet_trades and reported as "entry" (BUY) or "exit"
+    (SELL) events; the newest price of each outcome is stored in the
+    aggregate's current_prices and reported as a "price_move" event when it
+    has moved `price_move` or more since the last report. The first poll of
+    a market treats trades newer than the analysis had as new.
+
+    Markets join the watch set from update() after each analysis cycle and
+    leave it when their metadata says they resolved or closed, or after
+    `quiet_seconds` without any trade.
+    """
+
+    def __init__(
+        self,
+        api,
+        pipeline,
+        wallets: List[str],
+        lock: Optional[threading.Lock] = None,
+        on_events: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+        interval: float = WATCH_INTERVAL_SECONDS,
+        trades_limit: int = WATCH_TRADES_LIMIT,
+        price_move: float = WATCH_PRICE_MOVE,
+        quiet_seconds: float = WATCH_QUIET_SECONDS,
+        max_markets: int = WATCH_MAX_MARKETS,
+        concurrency: int = WATCH_CONCURRENCY,
+    ):
+        """
+        Initialize the watcher.
+
+        Args:
+            api: PolymarketAPI instance
+            pipeline: TradePipeline whose aggregates to update
+            wallets: Tracked wallet addresses
+            lock: Lock guarding the pipeline (e.g. StreamingIngest.lock)
+            on_events: Called with each poll's events, if any
+            interval: Seconds between polls of the watch set
+            trades_limit: Newest trades fetched per market and poll
+            price_move: Smallest last-price change reported
+            quiet_seconds: Drop markets without a trade for this long
+            max_markets: Most markets watched at once
+            concurrency: Markets polled at once
+        """
+        self.api = api
+        self.pipeline = pipeline
+        self.wallets = list(wallets)
+        self.wallet_index = {wallet.lower(): i for i, wallet in enumerate(self.wallets)}
+        self.lock = lock
+        self.on_events = on_events
+        self.interval = interval
+        self.trades_limit = trades_limit
+        self.price_move = price_move
+        self.quiet_seconds = quiet_seconds
+        self.max_markets = max_markets
+        self.concurrency = max(1, concurrency)
+
+        # condition_id -> {title, added_at, baseline, last_trade, seen, prices, reported}
+        self.markets: Dict[str, Dict[str, Any]] = {}
+        self.events = deque(maxlen=WATCH_MAX_EVENTS)
+        self.stats = {"polls": 0, "requests": 0, "folded": 0, "events": 0, "dropped": 0}
+        # Watch trades rank as newer than everything fetched before them
+        self._next_position = 0
+
+    def update(self, results_df: pd.DataFrame):
+        """
+        Add the best markets of an analysis cycle to the watch set.
+
+        Markets already watched stay; when the set is full, the markets
+        watched longest that are no longer in the results make room.
+
+        Args:
+            results_df: DataFrame returned by PolymarketAnalyzer.analyze
+        """
+        if len(results_df) == 0 or "Market ID" not in results_df.columns:
+            return
+        surfaced = top_markets(results_df, self.max_markets)
+        current = set(surfaced["Market ID"])
+        now = time.time()
+        for row in surfaced.to_dict(orient="records"):
+            condition_id = row["Market ID"]
+            if condition_id in self.markets:
+                continue
+            if len(self.markets) >= self.max_markets:
+                evictable = [cid for cid in self.markets if cid not in current]
+                if not evictable:
+                    break
+                self._drop(min(evictable, key=lambda cid: self.markets[cid]["added_at"]), "replaced")
+            self.markets[condition_id] = {
+                "title": row.get("Market Title", condition_id),
+                "added_at": now,
+                # Newest trade the analysis had for the market
+                "baseline": float(row.get("Latest Trade") or 0),
+                "last_trade": float(row.get("Latest Trade") or now),
+                "seen": None,
+                "prices": {},
+                "reported": {},
+            }
+            logger.info(f"Watching {row.get('Market Title', condition_id)}")
+
+    def _drop(self, condition_id: str, reason: str):
+        market = self.markets.pop(condition_id)
+        self.stats["dropped"] += 1
+        logger.info(f"Stopped watching {market['title']} ({reason})")
+
+    def run_until(self, until: float, on_poll: Optional[Callable[[], None]] = None):
+        """
+        Poll the watch set every `interval` seconds until the given time.
+
+        Args:
+            until: Unix time to return at
+            on_poll: Called after each poll (e.g. to republish /watch)
+        """
+        while True:
+            started = time.time()
+            if started >= until:
+                return
+            if self.markets:
+                try:
+                    self.poll_once()
+                    if on_poll is not None:
+                        on_poll()
+                except Exception as e:
+                    logger.error(f"Market watch poll failed: {e}", exc_info=True)
+            time.sleep(max(0.0, min(until, started + self.interval) - time.time()))
+
+    def poll_once(self) -> List[Dict[str, Any]]:
+        """
+        Poll every watched market once, fold tracked-wallet trades and
+        report events. Resolved, closed and quiet markets are dropped first.
+
+        Returns:
+            Events of this poll (also passed to on_events)
+        """
+        self.stats["polls"] += 1
+        self._drop_finished()
+        condition_ids = list(self.markets)
+        if not condition_ids:
+            return []
+        with trace_span("watch_poll", "fetch", markets=len(condition_ids)):
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(condition_ids))) as executor:
+                pages = list(executor.map(
+                    lambda cid: self.api.fetch_market_trades(cid, limit=self.trades_limit), condition_ids
+                ))
+        self.stats["requests"] += len(condition_ids)
+
+        events = []
+        with self.lock or nullcontext():
+            for condition_id, trades in zip(condition_ids, pages):
+                events.extend(self._apply(condition_id, trades))
+        if events:
+            self.stats["events"] += len(events)
+            self.events.extend(events)
+            if self.on_events is not None:
+                self.on_events(events)
+        return events
+
+    def _drop_finished(self):
+        """Drop markets that resolved, closed or went quiet."""
+        now = time.time()
+        for condition_id in [cid for cid, m in self.markets.items() if now - m["last_trade"] > self.quiet_seconds]:
+            self._drop(condition_id, "quiet")
+        if not self.markets:
+            return
+        metadata = self.api.fetch_market_metadata(list(self.markets))
+        for condition_id, meta in metadata.items():
+            if meta.get("resolved") or meta.get("closed") or is_expired(meta, now):
+                self._drop(condition_id, "resolved" if meta.get("resolved") else "closed")
+
+    def _apply(self, condition_id: str, trades: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fold a market's new trades and collect its events (caller holds the lock)."""
+        market = self.markets[condition_id]
+        keys = [trade_key(trade) for trade in trades]
+        seen = market["seen"]
+        if seen is None:
+            # First poll: only trades newer than the analysis are new
+            seen = {key for key, trade in zip(keys, trades) if trade.get("timestamp", 0) <= market["baseline"]}
+        # Only the latest page's keys are kept: older trades can't come back
+        market["seen"] = set(keys)
+        events = []
+
+        # Oldest first, so newer trades end up with smaller positions
+        for key, trade in reversed(list(zip(keys, trades))):
+            market["last_trade"] = max(market["last_trade"], trade.get("timestamp", 0))
+            market["prices"][trade.get("outcome", "")] = float(trade.get("price", 0.5))
+            if key in seen:
+                continue
+            index = self.wallet_index.get((trade.get("proxyWallet") or "").lower())
+            if index is None:
+                continue
+            self._next_position -= 1
+            before = self.pipeline.total_trades
+            self.pipeline.fold_wallet_trades(index, self.wallets[index], [trade], offset=self._next_position)
+            if self.pipeline.total_trades == before:
+                continue  # Already folded by another source
+            self.stats["folded"] += 1
+            events.append({
+                "kind": "exit" if trade.get("side") == "SELL" else "entry",
+                "market_id": condition_id,
+                "title": market["title"],
+                "trader": trade.get("name") or trade.get("pseudonym") or self.wallets[index][:8],
+                "wallet": self.wallets[index],
+                "outcome": trade.get("outcome", ""),
+                "size": trade.get("size", 0),
+                "price": trade.get("price", 0.5),
+                "timestamp": trade.get("timestamp", 0),
+            })
+
+        entry = self.pipeline.market_data.get(condition_id)
+        if entry is not None:
+            entry["current_prices"].update(market["prices"])
+        for outcome, price in market["prices"].items():
+            reported = market["reported"].setdefault(outcome, price)
+            if abs(price - reported) >= self.price_move:
+                market["reported"][outcome] = price
+                events.append({
+                    "kind": "price_move",
+                    "market_id": condition_id,
+                    "title": market["title"],
+                    "outcome": outcome,
+                    "from": reported,
+                    "to": price,
+                    "timestamp": time.time(),
+                })
+        return events
+
+    def document(self) -> Dict[str, Any]:
+        """The watch set and recent events, for the /watch endpoint."""
+        return {
+            "markets": [
+                {
+                    "market_id": condition_id,
+                    "title": market["title"],
+                    "watched_since": market["added_at"],
+                    "last_trade": market["last_trade"],
+                    "prices": dict(market["prices"]),
+                }
+                for condition_id, market in self.markets.items()
+            ],
+            "events": list(self.events),
+            "stats": dict(self.stats),
+        }